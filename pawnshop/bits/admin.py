@@ -1,10 +1,243 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.utils import timezone
+from django.utils.functional import cached_property
 from .models import *
+from . import archive, counts, ranking
 
-admin.site.register(Person)
-admin.site.register(Hostel)
-admin.site.register(Item)
-admin.site.register(Image)
-admin.site.register(Feedback)
-admin.site.register(FeedbackImage)
-admin.site.register(Category)
\ No newline at end of file
+
+def estimated_rows(queryset):
+    """Cheap row estimate for an unfiltered table, or None when there is none."""
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] > 0 else None
+    if queryset.model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+        # Ids are only ever appended, so the highest one is a close upper bound.
+        return queryset.model._default_manager.using(queryset.db).aggregate(top=Max('pk'))['top']
+    return None
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Estimates the count of an unfiltered changelist from the table once it
+    is past ADMIN_EXACT_COUNT_LIMIT rows, so browsing a large table doesn't
+    scan it on every page. Filtered and searched changelists are counted
+    exactly, a capped count would hide their later pages.
+    """
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimated_rows(self.object_list)
+            if estimate is not None and estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return self.object_list.order_by().count()
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    paginator = ApproximateCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    search_help_text = "Exact match only."
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Exact lookups on search_fields, so each one is an index seek. Django's
+        own search turns every field into a LIKE, which scans the table.
+        """
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        query = Q()
+        for path in self.search_fields:
+            field = get_fields_from_path(self.model, path)[-1]
+            # Validating drops fields the term can't be, an id never ORs with an email.
+            try:
+                value = field.clean(term, None)
+            except ValidationError:
+                continue
+            query |= Q(**{path: value})
+            if isinstance(value, str) and value != value.lower():
+                query |= Q(**{path: value.lower()})
+        # Only forward relations are searched, so rows can't repeat.
+        return queryset.filter(query) if query else queryset.none(), False
+
+
+@admin.register(Person)
+class PersonAdmin(ScalableAdmin):
+    list_display = ('id', 'name', 'email', 'campus', 'hostel', 'registered_at')
+    list_select_related = ('hostel',)
+    list_filter = ('campus',)
+    search_fields = ('id', 'email')
+    search_help_text = "Exact id or email."
+    raw_id_fields = ('hostel',)
+
+
+@admin.register(Hostel)
+class HostelAdmin(admin.ModelAdmin):
+    list_display = ('name', 'campus')
+    list_filter = ('campus',)
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'icon_class', 'added_at')
+
+
+@admin.register(Item)
+class ItemAdmin(ScalableAdmin):
+    list_display = ('id', 'name', 'seller', 'price', 'category', 'hostel', 'is_sold', 'is_archived', 'view_count', 'score', 'added_at')
+    list_select_related = ('seller', 'category', 'hostel')
+    list_filter = ('seller__campus', 'is_sold', 'is_archived', 'category')
+    search_fields = ('id', 'seller__email')
+    search_help_text = "Exact item id or seller email."
+    raw_id_fields = ('seller', 'hostel')
+    actions = ('mark_sold', 'mark_available', 'archive_items', 'restore_items')
+
+    # Bulk updates skip the Item signals and save(), so the category counters
+    # are rebuilt and the scores recomputed afterwards.
+    @admin.action(description="Mark selected items as sold")
+    def mark_sold(self, request, queryset):
+        ids = list(queryset.values_list('id', flat=True))
+        updated = Item.objects.filter(id__in=ids).update(is_sold=True, **Item.touched())
+        counts.rebuild()
+        ranking.rescore(Item.objects.filter(id__in=ids))
+        self.message_user(request, f"Marked {updated} item(s) as sold.")
+
+    @admin.action(description="Mark selected items as available")
+    def mark_available(self, request, queryset):
+        ids = list(queryset.values_list('id', flat=True))
+        updated = Item.objects.filter(id__in=ids).update(is_sold=False, **Item.touched())
+        counts.rebuild()
+        ranking.rescore(Item.objects.filter(id__in=ids))
+        self.message_user(request, f"Marked {updated} item(s) as available.")
+
+    @admin.action(description="Archive selected items")
+    def archive_items(self, request, queryset):
+        updated = queryset.filter(is_archived=False).update(is_archived=True, archived_at=timezone.now(), **Item.touched())
+        counts.rebuild()
+        self.message_user(request, f"Archived {updated} item(s).")
+
+    @admin.action(description="Restore selected archived items")
+    def restore_items(self, request, queryset):
+        restored = archive.restore_items(queryset)
+        self.message_user(request, f"Restored {restored} item(s).")
+
+
+@admin.register(Image)
+class ImageAdmin(ScalableAdmin):
+    list_display = ('id', 'item', 'image', 'display_order', 'added_at')
+    list_select_related = ('item__seller',)
+    search_fields = ('id', 'item__id')
+    raw_id_fields = ('item',)
+
+
+@admin.register(Feedback)
+class FeedbackAdmin(ScalableAdmin):
+    list_display = ('id', 'person', 'message', 'added_at')
+    list_select_related = ('person',)
+    list_filter = ('person__campus',)
+    search_fields = ('id', 'person__email')
+    raw_id_fields = ('person',)
+
+
+@admin.register(FeedbackImage)
+class FeedbackImageAdmin(ScalableAdmin):
+    list_display = ('id', 'feedback', 'image', 'added_at')
+    list_select_related = ('feedback__person',)
+    raw_id_fields = ('feedback',)
+
+
+@admin.register(MediaBlob)
+class MediaBlobAdmin(ScalableAdmin):
+    list_display = ('name', 'size', 'refcount', 'added_at')
+    search_fields = ('name', 'digest')
+
+
+@admin.register(CategoryCount)
+class CategoryCountAdmin(admin.ModelAdmin):
+    list_display = ('category', 'campus', 'count')
+    list_select_related = ('category',)
+    list_filter = ('campus',)
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(ScalableAdmin):
+    list_display = ('id', 'person', 'query', 'category', 'campus', 'min_price', 'max_price', 'last_item_id')
+    list_select_related = ('person', 'category')
+    search_fields = ('id', 'person__email')
+    raw_id_fields = ('person',)
+
+
+@admin.register(SavedSearchMatch)
+class SavedSearchMatchAdmin(ScalableAdmin):
+    list_display = ('id', 'saved_search', 'item', 'is_seen', 'added_at')
+    list_select_related = ('saved_search__person', 'saved_search__category', 'item__seller')
+    list_filter = ('is_seen',)
+    search_fields = ('person__email',)
+    raw_id_fields = ('saved_search', 'person', 'item')
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(ScalableAdmin):
+    list_display = ('fingerprint', 'call_site', 'count', 'total_ms', 'max_ms', 'alias', 'last_seen')
+    list_filter = ('alias',)
+    search_fields = ('=fingerprint', 'call_site', 'sql')
+    # One row per query shape, small enough for Django's substring search.
+    get_search_results = admin.ModelAdmin.get_search_results
+    search_help_text = None
+    ordering = ('-total_ms',)
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('id', 'method', 'path', 'status', 'user', 'total_ms', 'sql_ms', 'query_count', 'template_ms', 'added_at')
+    list_filter = ('method', 'status')
+    search_fields = ('path', '=user')
+    exclude = ('stats', 'queries', 'report')
+    readonly_fields = ('method', 'path', 'status', 'user', 'total_ms', 'sql_ms', 'query_count', 'template_ms',
+                       'python_ms', 'added_at', 'download', 'report_display', 'queries_display')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Profile")
+    def download(self, obj):
+        url = reverse('admin:bits_requestprofile_download', args=[obj.id])
+        return format_html('<a href="{}">profile-{}.prof</a> (open with pstats or snakeviz)', url, obj.id)
+
+    @admin.display(description="Slowest functions (cumulative)")
+    def report_display(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto">{}</pre>', obj.report)
+
+    @admin.display(description="SQL queries")
+    def queries_display(self, obj):
+        return format_html('<pre style="white-space: pre-wrap">{}</pre>', obj.queries)
+
+    def get_urls(self):
+        return [
+            path('<int:id>/download/', self.admin_site.admin_view(self.download_view), name='bits_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, id):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(RequestProfile, id=id)
+        response = HttpResponse(bytes(profile.stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.id}.prof"'
+        return response
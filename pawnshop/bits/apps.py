@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class BitsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'bits'
\ No newline at end of file
+    name = 'bits'
+
+    def ready(self):
+        from . import signals, slowqueries
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Item
+from . import counts
+
+
+def stale_items(now=None):
+    now = now or timezone.now()
+    sold_cutoff = now - timezone.timedelta(days=settings.ARCHIVE_SOLD_AFTER_DAYS)
+    inactive_cutoff = now - timezone.timedelta(days=settings.ARCHIVE_INACTIVE_AFTER_DAYS)
+    return Item.objects.filter(is_archived=False).filter(
+        Q(is_sold=True, added_at__lt=sold_cutoff) | Q(added_at__lt=inactive_cutoff)
+    )
+
+
+def archive_stale_items(batch_size=None, now=None):
+    """
+    Flag sold/inactive listings as archived in short batches so the writer
+    lock on SQLite is never held for long. Returns the number archived.
+    """
+    batch_size = batch_size or settings.ARCHIVE_BATCH_SIZE
+    now = now or timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(stale_items(now).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            total += Item.objects.filter(id__in=ids).update(is_archived=True, archived_at=now, **Item.touched())
+    if total:
+        counts.rebuild()
+    return total
+
+
+def restore_items(items):
+    restored = items.filter(is_archived=True).update(is_archived=False, archived_at=None, **Item.touched())
+    if restored:
+        counts.rebuild()
+    return restored
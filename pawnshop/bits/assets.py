@@ -0,0 +1,113 @@
+import functools
+import hashlib
+import re
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.base import ContentFile
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+LAYOUT_ASSETS = ['bits/layout.css', 'bits/layout.js']
+
+# Page specific assets, in load order after the layout ones. The bundle is
+# picked from the name of the template being rendered (bits/<page>.html).
+PAGE_ASSETS = {
+    'home': ['bits/home.css'],
+    'item_detail': ['bits/item_detail.css', 'bits/item_detail.js'],
+    'listings': ['bits/listings.css', 'bits/listings.js'],
+    'add_product': ['bits/add_product.css', 'bits/add_product.js'],
+    'categories': ['bits/categories.css', 'bits/categories.js'],
+    'feedback': ['bits/feedback.css', 'bits/feedback.js'],
+    'saved_searches': ['bits/saved_searches.css'],
+    'import_items': ['bits/import_items.css'],
+}
+
+BUNDLES = {'layout': LAYOUT_ASSETS}
+BUNDLES.update({page: LAYOUT_ASSETS + assets for page, assets in PAGE_ASSETS.items()})
+KINDS = ('css', 'js')
+
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+CSS_IMPORT = re.compile(r'@import\s+(?:url\([^)]*\)|"[^"]*"|\'[^\']*\')[^;]*;')
+CSS_SPACE_AROUND = re.compile(r'\s*([{};,>])\s*')
+JS_LINE_COMMENT = re.compile(r'^\s*//.*$', re.M)
+
+
+def bundle_for_template(template_name):
+    page = (template_name or '').rsplit('/', 1)[-1].rsplit('.', 1)[0]
+    return page if page in PAGE_ASSETS else 'layout'
+
+
+def bundle_name(bundle, kind):
+    return f"bits/{bundle}.bundle.{kind}"
+
+
+def bundle_sources(bundle, kind):
+    return [name for name in BUNDLES[bundle] if name.endswith(f".{kind}")]
+
+
+def minify_css(text):
+    text = CSS_COMMENT.sub('', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = CSS_SPACE_AROUND.sub(r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    # Deliberately conservative, without a parser only whole-line comments,
+    # indentation and blank lines are safe to drop.
+    text = JS_LINE_COMMENT.sub('', text)
+    return '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def build_bundle(sources, kind):
+    """Concatenate and minify (name, text) pairs, keeping CSS @imports at the top where they still apply."""
+    if kind == 'css':
+        imports = []
+        bodies = []
+        for name, text in sources:
+            text = CSS_COMMENT.sub('', text)
+            imports.extend(CSS_IMPORT.findall(text))
+            bodies.append(CSS_IMPORT.sub('', text))
+        return '\n'.join(imports) + '\n' + minify_css('\n'.join(bodies))
+    # Each file runs as if it were its own <script>, so a missing semicolon can't merge two statements.
+    return '\n;'.join(minify_js(text) for name, text in sources) + '\n'
+
+
+@functools.cache
+def static_version():
+    """A hash of the static manifest, so a deploy that changed any static file changes it."""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None) or {}
+    return hashlib.md5(repr(sorted(hashed_files.items())).encode()).hexdigest()[:12]
+
+
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Builds one CSS and one JS bundle per page during collectstatic, before
+    the manifest step hashes them and WhiteNoise writes the gzip/brotli
+    variants alongside.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for bundle in BUNDLES:
+                for kind in KINDS:
+                    names = bundle_sources(bundle, kind)
+                    if not names:
+                        continue
+                    sources = []
+                    for name in names:
+                        storage, path = paths[name]
+                        with storage.open(path) as f:
+                            sources.append((name, f.read().decode('utf-8')))
+                    target = bundle_name(bundle, kind)
+                    if self.exists(target):
+                        self.delete(target)
+                    self._save(target, ContentFile(build_bundle(sources, kind).encode('utf-8')))
+                    paths[target] = (self, target)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # No manifest entry yet (collectstatic hasn't run with this
+            # storage), serve the plain file as before.
+            return name
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class StepsAbandoned(Exception):
+    pass
+
+
+def sha256_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def backup_root():
+    return str(settings.BACKUP_DIR)
+
+
+def manifest_dir():
+    return os.path.join(backup_root(), 'manifests')
+
+
+def object_path(digest):
+    return os.path.join(backup_root(), 'media', digest[:2], digest)
+
+
+def manifest_path(name):
+    return os.path.join(manifest_dir(), f"{name}.json")
+
+
+def list_snapshots():
+    if not os.path.isdir(manifest_dir()):
+        return []
+    return sorted(name[:-5] for name in os.listdir(manifest_dir()) if name.endswith('.json'))
+
+
+def load_manifest(name):
+    with open(manifest_path(name)) as f:
+        return json.load(f)
+
+
+def database_path(alias='default'):
+    database = connections[alias].settings_dict
+    if database['ENGINE'] != 'django.db.backends.sqlite3':
+        raise ValueError("Online backups are only supported for SQLite databases.")
+    return str(database['NAME'])
+
+
+def backup_database(target, pages=None, sleep=None, progress=None):
+    """
+    Copy the live database to `target` with SQLite's online backup API.
+
+    The copy advances `pages` pages per step and sleeps in between, so
+    writers only ever wait for one short step. A write from any other
+    connection between two steps makes SQLite start the whole copy over, so
+    on a busy database it may never finish. After BACKUP_MAX_RESTARTS such
+    restarts, or BACKUP_MAX_SECONDS, the copy is redone in a single step
+    that keeps its read lock until the end. Either way the result is a
+    consistent snapshot. Returns the number of restarts seen.
+    """
+    pages = pages or settings.BACKUP_PAGES_PER_STEP
+    sleep = settings.BACKUP_STEP_SLEEP if sleep is None else sleep
+    deadline = time.monotonic() + settings.BACKUP_MAX_SECONDS
+    state = {'remaining': None, 'restarts': 0}
+
+    def step(status, remaining, total):
+        # A restart shows up as a step that left as much to copy as the one before.
+        if state['remaining'] is not None and remaining >= state['remaining']:
+            state['restarts'] += 1
+        state['remaining'] = remaining
+        if progress:
+            progress(status, remaining, total)
+        if state['restarts'] > settings.BACKUP_MAX_RESTARTS or time.monotonic() > deadline:
+            raise StepsAbandoned()
+
+    source = sqlite3.connect(database_path(), timeout=30)
+    destination = sqlite3.connect(target)
+    try:
+        try:
+            source.backup(destination, pages=pages, sleep=sleep, progress=step)
+        except StepsAbandoned:
+            source.backup(destination, pages=-1)
+    finally:
+        destination.close()
+        source.close()
+    return state['restarts']
+
+
+def check_database(path):
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return connection.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def snapshot_media(previous=None):
+    """
+    Copy every media file that is not in the object pool yet and return the
+    manifest entries {relative path: {sha256, size, mtime}}. Files whose size
+    and mtime match the previous manifest are not hashed again.
+    """
+    known = (previous or {}).get('media', {})
+    entries = {}
+    copied = 0
+    copied_bytes = 0
+    media_root = str(settings.MEDIA_ROOT)
+    for directory, _, files in os.walk(media_root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            relative = os.path.relpath(path, media_root).replace(os.sep, '/')
+            stat = os.stat(path)
+            entry = known.get(relative)
+            if not entry or entry['size'] != stat.st_size or entry['mtime'] != int(stat.st_mtime):
+                entry = {'sha256': sha256_file(path), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+            target = object_path(entry['sha256'])
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                partial = f"{target}.partial"
+                shutil.copyfile(path, partial)
+                os.replace(partial, target)
+                copied += 1
+                copied_bytes += entry['size']
+            entries[relative] = entry
+    return entries, copied, copied_bytes
+
+
+def create_snapshot(pages=None, sleep=None, progress=None):
+    name = timezone.now().strftime('%Y%m%d-%H%M%S')
+    os.makedirs(os.path.join(backup_root(), 'db'), exist_ok=True)
+    os.makedirs(manifest_dir(), exist_ok=True)
+
+    db_file = os.path.join('db', f"{name}.sqlite3")
+    db_target = os.path.join(backup_root(), db_file)
+    backup_database(f"{db_target}.partial", pages=pages, sleep=sleep, progress=progress)
+    os.replace(f"{db_target}.partial", db_target)
+
+    snapshots = list_snapshots()
+    previous = load_manifest(snapshots[-1]) if snapshots else None
+    media, copied, copied_bytes = snapshot_media(previous)
+
+    manifest = {
+        'name': name,
+        'created_at': timezone.now().isoformat(),
+        'database': {'file': db_file, 'sha256': sha256_file(db_target), 'size': os.path.getsize(db_target)},
+        'media': media,
+    }
+    # The manifest is written last, so a snapshot only exists once it is complete.
+    with open(f"{manifest_path(name)}.partial", 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f"{manifest_path(name)}.partial", manifest_path(name))
+    return manifest, copied, copied_bytes
+
+
+def verify_snapshot(name, deep=False):
+    """Return a list of problems with a snapshot, empty when it is intact."""
+    manifest = load_manifest(name)
+    problems = []
+    database = manifest['database']
+    db_path = os.path.join(backup_root(), database['file'])
+    if not os.path.exists(db_path):
+        problems.append(f"database copy {database['file']} is missing")
+    elif sha256_file(db_path) != database['sha256']:
+        problems.append(f"database copy {database['file']} does not match its checksum")
+    else:
+        result = check_database(db_path)
+        if result != 'ok':
+            problems.append(f"database integrity check failed: {result}")
+
+    for relative, entry in manifest['media'].items():
+        path = object_path(entry['sha256'])
+        if not os.path.exists(path):
+            problems.append(f"{relative} is missing from the media pool")
+        elif os.path.getsize(path) != entry['size'] or (deep and sha256_file(path) != entry['sha256']):
+            problems.append(f"{relative} is damaged in the media pool")
+    return problems
+
+
+def restore_snapshot(name):
+    """
+    Put the database back in one atomic rename and copy back every media
+    file that is missing or differs. Files added to media/ after the
+    snapshot are left alone.
+    """
+    manifest = load_manifest(name)
+    live_db = database_path()
+    connections['default'].close()
+    fd, staged = tempfile.mkstemp(dir=os.path.dirname(live_db), suffix='.restore')
+    os.close(fd)
+    shutil.copyfile(os.path.join(backup_root(), manifest['database']['file']), staged)
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(live_db + suffix):
+            os.remove(live_db + suffix)
+    os.replace(staged, live_db)
+
+    restored = 0
+    media_root = str(settings.MEDIA_ROOT)
+    for relative, entry in manifest['media'].items():
+        path = os.path.join(media_root, *relative.split('/'))
+        if os.path.exists(path) and os.path.getsize(path) == entry['size']:
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(object_path(entry['sha256']), path)
+        restored += 1
+    return restored
+
+
+def prune_snapshots(keep):
+    """Drop all but the newest `keep` snapshots and the pool objects only they referenced."""
+    snapshots = list_snapshots()
+    dropped = snapshots[:-keep] if keep else snapshots
+    for name in dropped:
+        manifest = load_manifest(name)
+        db_path = os.path.join(backup_root(), manifest['database']['file'])
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        os.remove(manifest_path(name))
+
+    referenced = set()
+    for name in list_snapshots():
+        referenced.update(entry['sha256'] for entry in load_manifest(name)['media'].values())
+    removed = 0
+    pool = os.path.join(backup_root(), 'media')
+    for directory, _, files in os.walk(pool):
+        for filename in files:
+            if filename not in referenced:
+                os.remove(os.path.join(directory, filename))
+                removed += 1
+    return len(dropped), removed
@@ -0,0 +1,230 @@
+import csv
+import io
+import json
+import posixpath
+import shutil
+import tempfile
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from .forms import ItemForm
+from .models import ChangeCounter, Image, Item
+from .storage import content_storage
+from . import counts, lookups, ranking, storage, uploads
+
+IMPORT_FIELDS = ['name', 'description', 'price', 'category', 'hostel', 'phone', 'images']
+EXPORT_FIELDS = ['id', 'name', 'description', 'price', 'category', 'hostel', 'phone', 'seller',
+                 'is_sold', 'is_archived', 'added_at', 'images']
+MAX_REPORTED_ERRORS = 50
+
+
+def guess_format(name):
+    return 'jsonl' if name.lower().endswith(('.jsonl', '.json', '.ndjson')) else 'csv'
+
+
+def read_rows(fileobj, fmt):
+    """Yield (line number, row dict) from a CSV or JSON-lines file without loading it whole."""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    if fmt == 'jsonl':
+        for number, line in enumerate(text, 1):
+            if line.strip():
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield number, row if isinstance(row, dict) else None
+    else:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def split_images(value):
+    if isinstance(value, list):
+        return [str(name).strip() for name in value if str(name).strip()]
+    return [name.strip() for name in (value or '').split(';') if name.strip()]
+
+
+def archive_member(archive, name):
+    try:
+        info = archive.getinfo(name)
+    except KeyError:
+        raise ValidationError(f"'{name}' is not in the image archive.")
+    if info.file_size > settings.UPLOAD_MAX_FILE_SIZE:
+        raise ValidationError(f"'{name}' is larger than the upload limit.")
+    return info
+
+
+def store_archive_image(archive, info):
+    """
+    Copy one member of the image zip to a temporary file, run it through the
+    upload pipeline and store it. Returns the storage name.
+    """
+    with tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR) as raw:
+        with archive.open(info) as member:
+            shutil.copyfileobj(member, raw)
+        processed = uploads.process_image(File(raw, name=posixpath.basename(info.filename)))
+    with processed:
+        field = Image._meta.get_field('image')
+        return content_storage.save(field.generate_filename(None, processed.name), processed)
+
+
+def _flush(pending, person):
+    # bulk_create skips Image.save() and the signals that keep blob refcounts
+    # and category counters. Placeholders are read before the transaction so
+    # it stays short.
+    images = [
+        (item, Image(image=name, display_order=order))
+        for item, names in pending
+        for order, name in enumerate(names)
+    ]
+    for item, image in images:
+        image.fill_placeholder()
+    with transaction.atomic():
+        change_seq = ChangeCounter.next()
+        now = timezone.now()
+        for item, names in pending:
+            item.change_seq = change_seq
+            item.updated_at = now
+        Item.objects.bulk_create([item for item, names in pending])
+        for item, image in images:
+            image.item = item
+        Image.objects.bulk_create([image for item, image in images])
+        for item, image in images:
+            storage.retain(image.image.name)
+        for category_id, n in Counter(item.category_id for item, names in pending).items():
+            counts.adjust(person.campus, category_id, n)
+    return len(pending)
+
+
+def import_items(rows, person, archive=None, batch_size=None, max_rows=None):
+    """
+    Validate every row with ItemForm and insert the valid ones for `person`
+    in batches of IMPORT_BATCH_SIZE. `rows` is an iterable of (line, dict),
+    `archive` an optional zipfile.ZipFile holding the images the rows name.
+
+    Returns (created, errors); invalid rows are skipped and reported, and an
+    unreadable file ends the import with the rows before it kept.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    categories = {}
+    for category in lookups.categories():
+        categories[str(category.id)] = category.id
+        categories[category.name.casefold()] = category.id
+
+    created = 0
+    errors = []
+    pending = []
+
+    def error(line, message):
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append(f"Row {line}: {message}")
+
+    # A decoding error only surfaces when the rows are read, after earlier
+    # batches are already in, so it ends the import like max_rows does.
+    line = 0
+    try:
+        for count, (line, row) in enumerate(rows, 1):
+            if max_rows and count > max_rows:
+                error(line, f"stopped, at most {max_rows} rows can be imported at once.")
+                break
+            if row is None:
+                error(line, "could not be parsed.")
+                continue
+
+            data = {field: str(row.get(field) or '').strip() for field in IMPORT_FIELDS if field != 'images'}
+            data['category'] = categories.get(data['category'].casefold(), data['category'])
+            form = ItemForm(data, user=person)
+            if not form.is_valid():
+                error(line, "; ".join(f"{field}: {' '.join(messages)}" for field, messages in form.errors.items()))
+                continue
+
+            names = split_images(row.get('images'))
+            if names and archive is None:
+                error(line, "names images but no image archive was uploaded.")
+                continue
+            if len(names) > settings.UPLOAD_MAX_FILES:
+                error(line, f"at most {settings.UPLOAD_MAX_FILES} images per item.")
+                continue
+            try:
+                members = [archive_member(archive, name) for name in names]
+                stored = [store_archive_image(archive, info) for info in members]
+            except ValidationError as e:
+                error(line, " ".join(e.messages))
+                continue
+
+            item = form.save(commit=False)
+            item.seller = person
+            item.hostel = form.cleaned_data.get('hostel') or person.hostel
+            item.fill_derived_fields()
+            pending.append((item, stored))
+            if len(pending) >= batch_size:
+                created += _flush(pending, person)
+                pending = []
+    except (UnicodeDecodeError, csv.Error):
+        errors.append(f"The file could not be read after row {line}, save it as UTF-8 CSV or JSON lines.")
+
+    if pending:
+        created += _flush(pending, person)
+    if created:
+        # bulk_create skips save(), so the new items and the seller's other
+        # listings (a big import counts towards the repost penalty) are scored here.
+        ranking.rescore(Item.objects.filter(seller=person))
+    return created, errors
+
+
+def export_rows(items, batch_size=None):
+    """Yield one dict per item, walking the table by id so memory stays flat."""
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    fields = ('id', 'name', 'description', 'price', 'category__name', 'hostel_id', 'phone',
+              'seller__email', 'is_sold', 'is_archived', 'added_at')
+    last_id = 0
+    while True:
+        batch = list(items.filter(id__gt=last_id).order_by('id').values_list(*fields)[:batch_size])
+        if not batch:
+            return
+        images = defaultdict(list)
+        for item_id, name in (Image.objects.filter(item_id__in=[row[0] for row in batch])
+                              .order_by('item_id', 'display_order').values_list('item_id', 'image')):
+            images[item_id].append(name)
+        for row in batch:
+            values = dict(zip(EXPORT_FIELDS, row))
+            values['images'] = ';'.join(images[row[0]])
+            yield values
+        last_id = batch[-1][0]
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, default=str) + '\n'
+
+
+def export_lines(items, fmt):
+    rows = export_rows(items)
+    return jsonl_lines(rows) if fmt == 'jsonl' else csv_lines(rows)
+
+
+def write_image_archive(archive, items):
+    """Add every image of `items` to an open zipfile under its storage name, so the export can be re-imported."""
+    written = 0
+    names = Image.objects.filter(item__in=items).order_by('image').values_list('image', flat=True).distinct()
+    for name in names.iterator(chunk_size=1000):
+        if content_storage.exists(name):
+            archive.write(content_storage.path(name), name)
+            written += 1
+    return written
@@ -0,0 +1,116 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q, Value
+from django.db.models.functions import Greatest
+from django.urls import reverse
+from django.utils import timezone
+from .models import ChangeCounter, Item, ItemTombstone
+
+# A sync token is "<change_seq>.<id>" of the last change the client has seen.
+# Rows that share a change_seq (bulk updates) are ordered by id, so a page can
+# end anywhere without skipping or repeating rows.
+
+
+def parse_token(token):
+    """(change_seq, id) of a sync token, (0, 0) for none. Raises ValueError for a malformed one."""
+    if not token:
+        return (0, 0)
+    seq, _, pk = token.partition('.')
+    position = (int(seq), int(pk or 0))
+    if position[0] < 0 or position[1] < 0:
+        raise ValueError(token)
+    return position
+
+
+def format_token(position):
+    return f"{position[0]}.{position[1]}"
+
+
+def item_data(item):
+    image = next(iter(item.images.all()), None)
+    return {
+        'id': item.id,
+        'name': item.name,
+        'description': item.description,
+        'price': str(item.price),
+        'category_id': item.category_id,
+        'category': item.category.name,
+        'hostel': item.hostel_id,
+        'campus': item.seller.campus,
+        'is_sold': item.is_sold,
+        'added_at': item.added_at.isoformat(),
+        'updated_at': item.updated_at.isoformat(),
+        'score': item.score,
+        'url': reverse('item_detail', args=[item.id]),
+        'image': image and {
+            'url': image.image.url,
+            'width': image.width,
+            'height': image.height,
+            'placeholder': image.placeholder,
+            'color': image.color,
+        },
+    }
+
+
+def changes_since(token, campus, limit=None):
+    """
+    The listings of a campus ('ALL' for every campus) that changed after the
+    sync token, as {'token', 'reset', 'more', 'items', 'deleted'}. Archived
+    and deleted listings come back as ids in 'deleted'.
+
+    Changes newer than CHANGEFEED_SETTLE_SECONDS are held back: change_seq is
+    taken just before the row is written, so a younger change can commit
+    before an older one and a token past it would skip the older change.
+    """
+    limit = limit or settings.CHANGEFEED_PAGE_SIZE
+    position = parse_token(token)
+    pruned = ChangeCounter.objects.filter(pk=1).values_list('pruned', flat=True).first() or 0
+    # The tombstones this client still needs are gone, it has to start over.
+    reset = 0 < position[0] < pruned
+    if reset:
+        position = (0, 0)
+
+    items = Item.objects.filter(Q(change_seq__gt=position[0]) | Q(change_seq=position[0], id__gt=position[1]))
+    tombstones = ItemTombstone.objects.filter(Q(change_seq__gt=position[0]) | Q(change_seq=position[0], item_id__gt=position[1]))
+    if position == (0, 0):
+        # A fresh copy has nothing to delete.
+        items = items.filter(is_archived=False)
+        tombstones = tombstones.none()
+    if campus != 'ALL':
+        items = items.filter(seller__campus=campus)
+        tombstones = tombstones.filter(campus=campus)
+    items = (items.select_related('category', 'seller').prefetch_related('images')
+             .order_by('change_seq', 'id')[:limit + 1])
+    tombstones = tombstones.order_by('change_seq', 'item_id').values_list('change_seq', 'item_id', 'deleted_at')[:limit + 1]
+
+    rows = [((item.change_seq, item.id), item.updated_at, item) for item in items]
+    rows += [((seq, item_id), deleted_at, None) for seq, item_id, deleted_at in tombstones]
+    rows.sort(key=lambda row: row[0])
+
+    settled = timezone.now() - timedelta(seconds=settings.CHANGEFEED_SETTLE_SECONDS)
+    feed = {'token': format_token(position), 'reset': reset, 'more': False, 'items': [], 'deleted': []}
+    for count, (row_position, changed_at, item) in enumerate(rows):
+        if changed_at > settled:
+            break
+        if count == limit:
+            feed['more'] = True
+            break
+        if item is None or item.is_archived:
+            feed['deleted'].append(row_position[1])
+        else:
+            feed['items'].append(item_data(item))
+        feed['token'] = format_token(row_position)
+    return feed
+
+
+def prune_tombstones(days=None, now=None):
+    """Delete tombstones older than CHANGEFEED_TOMBSTONE_DAYS, returns how many."""
+    days = settings.CHANGEFEED_TOMBSTONE_DAYS if days is None else days
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    with transaction.atomic():
+        newest = ItemTombstone.objects.filter(deleted_at__lt=cutoff).aggregate(seq=Max('change_seq'))['seq']
+        if newest is None:
+            return 0
+        ChangeCounter.objects.filter(pk=1).update(pruned=Greatest('pruned', Value(newest)))
+        return ItemTombstone.objects.filter(change_seq__lte=newest).delete()[0]
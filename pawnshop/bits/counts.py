@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from .models import Campus, CategoryCount, Item, Person
+
+LIVE_CAMPUSES = [Campus.GOA, Campus.HYDERABAD, Campus.PILANI]
+KEY_FIELDS = ('is_sold', 'is_archived', 'seller_id', 'category_id')
+UNKNOWN = object()
+
+
+def live_key(item):
+    """(seller_id, category_id) when the item counts towards its category, else None."""
+    if item.is_sold or item.is_archived or item.seller_id is None or item.category_id is None:
+        return None
+    return (item.seller_id, item.category_id)
+
+
+def seller_campus(item):
+    if Item.seller.is_cached(item):
+        return item.seller.campus
+    return Person.objects.filter(id=item.seller_id).values_list('campus', flat=True).first()
+
+
+def adjust(campus, category_id, delta):
+    if campus is None:
+        return
+    updated = CategoryCount.objects.filter(campus=campus, category_id=category_id).update(count=F('count') + delta)
+    # A missing counter is never created to take a decrement: when a category
+    # is deleted its counters go before the items that release them.
+    if not updated and delta > 0:
+        counter, created = CategoryCount.objects.get_or_create(
+            campus=campus, category_id=category_id, defaults={'count': delta}
+        )
+        if not created:
+            CategoryCount.objects.filter(pk=counter.pk).update(count=F('count') + delta)
+
+
+def rebuild():
+    """Recompute every counter from Item, for use after bulk updates that bypass signals."""
+    rows = (Item.objects.filter(is_sold=False, is_archived=False)
+            .values_list('seller__campus', 'category_id')
+            .annotate(n=Count('id')))
+    with transaction.atomic():
+        CategoryCount.objects.all().delete()
+        CategoryCount.objects.bulk_create([
+            CategoryCount(campus=campus, category_id=category_id, count=n) for campus, category_id, n in rows
+        ])
+    return len(rows)
+
+
+def campus_counts(campus):
+    """Return {category_id: live item count} for a campus, or across all campuses."""
+    if campus in LIVE_CAMPUSES:
+        return dict(CategoryCount.objects.filter(campus=campus).values_list('category_id', 'count'))
+    return dict(CategoryCount.objects.values_list('category_id').annotate(total=Sum('count')))
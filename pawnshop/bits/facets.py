@@ -0,0 +1,93 @@
+import hashlib
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Value, When
+
+# (key, label, lower bound inclusive, upper bound exclusive)
+PRICE_BUCKETS = [
+    ('u200', 'Under ₹200', None, 200),
+    ('200-500', '₹200 - ₹499', 200, 500),
+    ('500-1000', '₹500 - ₹999', 500, 1000),
+    ('1000-5000', '₹1,000 - ₹4,999', 1000, 5000),
+    ('5000+', '₹5,000 and above', 5000, None),
+]
+PRICE_BUCKET_KEYS = [bucket[0] for bucket in PRICE_BUCKETS]
+
+
+def filter_price_bucket(items_query, key):
+    for bucket_key, label, low, high in PRICE_BUCKETS:
+        if bucket_key == key:
+            if low is not None:
+                items_query = items_query.filter(price__gte=low)
+            if high is not None:
+                items_query = items_query.filter(price__lt=high)
+    return items_query
+
+
+def _bucket_expression():
+    whens = [When(price__lt=high, then=Value(index)) for index, (key, label, low, high) in enumerate(PRICE_BUCKETS) if high is not None]
+    return Case(*whens, default=Value(len(PRICE_BUCKETS) - 1), output_field=IntegerField())
+
+
+def compute_facets(items_query):
+    """
+    Count the filtered feed by category, hostel, price bucket and sold state
+    with a single GROUP BY over all four, then fold the combinations.
+    """
+    rows = (items_query.order_by()
+            .annotate(price_bucket=_bucket_expression())
+            .values_list('category_id', 'category__name', 'hostel_id', 'price_bucket', 'is_sold')
+            .annotate(n=Count('id')))
+
+    categories = defaultdict(int)
+    category_names = {}
+    hostels = defaultdict(int)
+    prices = defaultdict(int)
+    status = {'available': 0, 'sold': 0}
+    for category_id, category_name, hostel_id, price_bucket, is_sold, n in rows:
+        categories[category_id] += n
+        category_names[category_id] = category_name
+        hostels[hostel_id] += n
+        prices[PRICE_BUCKETS[price_bucket][0]] += n
+        status['sold' if is_sold else 'available'] += n
+
+    return {
+        'total': status['available'] + status['sold'],
+        'categories': sorted(((cid, category_names[cid], n) for cid, n in categories.items()), key=lambda row: (-row[2], row[1])),
+        'hostels': sorted(hostels.items(), key=lambda row: (-row[1], row[0])),
+        'prices': [(key, label, prices[key]) for key, label, low, high in PRICE_BUCKETS if prices[key]],
+        'status': status,
+    }
+
+
+def feed_facets(items_query):
+    sql, params = items_query.order_by().query.sql_with_params()
+    key = 'facets:' + hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(items_query)
+        cache.set(key, facets, settings.FEED_FACET_CACHE_SECONDS)
+    return facets
+
+
+def facet_links(params, facets):
+    """Attach a toggle URL to every facet value, based on the current query parameters."""
+    def link(name, value):
+        linked = params.copy()
+        linked.pop('page', None)
+        active = linked.get(name) == str(value)
+        if active:
+            linked.pop(name)
+        else:
+            linked[name] = value
+        return {'url': '?' + linked.urlencode(), 'active': active}
+
+    return {
+        'total': facets['total'],
+        'categories': [dict(label=name, count=n, **link('c', cid)) for cid, name, n in facets['categories']],
+        'hostels': [dict(label=name, count=n, **link('hostel', name)) for name, n in facets['hostels']],
+        'prices': [dict(label=label, count=n, **link('pb', key)) for key, label, n in facets['prices']],
+        'status': [dict(label=label, count=facets['status'][key], **link('status', key))
+                   for key, label in (('available', 'Available'), ('sold', 'Sold')) if facets['status'][key]],
+    }
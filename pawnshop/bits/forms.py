@@ -1,5 +1,6 @@
 from django import forms
 from .models import *
+from . import lookups
 
 class ItemForm(forms.ModelForm):
     class Meta:
@@ -7,7 +8,6 @@ class ItemForm(forms.ModelForm):
         fields = ['name', 'description', 'price', 'category', 'hostel', 'phone']
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}),
-            'category': forms.Select(choices=[(category.id, category.name) for category in Category.objects.all()]),
             'phone': forms.TextInput(attrs={'placeholder': '(WhatsApp) Required if not provided one before'})
         }
         labels = {
@@ -18,11 +18,11 @@ class ItemForm(forms.ModelForm):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         
+        self.fields['category'].widget.choices = lookups.category_choices()
         if self.user and self.user.campus:
-            campus_hostels = Hostel.objects.filter(campus=self.user.campus)
-            self.fields['hostel'].widget.choices = [(hostel.name, hostel.name) for hostel in campus_hostels]
+            self.fields['hostel'].widget.choices = lookups.hostel_choices(self.user.campus)
         else:
-            self.fields['hostel'].widget.choices = [(hostel.name, hostel.name) for hostel in Hostel.objects.all()]
+            self.fields['hostel'].widget.choices = lookups.hostel_choices()
         
         self.fields['hostel'].required = not self.user.hostel
         self.fields['phone'].required = not self.user.phone
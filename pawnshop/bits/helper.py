@@ -2,8 +2,7 @@ import os
 from dotenv import load_dotenv
 from twilio.rest import Client
 import urllib.parse
-from django.db.models import Case, When, IntegerField, BooleanField, Value
-from django.utils import timezone
+from decimal import Decimal, InvalidOperation
 
 load_dotenv()
 
@@ -29,10 +28,19 @@ def verify_phone_number(phone_number):
 
 
 
-def items_sort(items_list):
-    items_list = list(items_list)
-    for item in items_list:
-        item.is_recent = item.added_at >= timezone.now() - timezone.timedelta(days=3)
-        item.relevance_score = 1000 if not item.is_sold and item.is_recent else 500 if not item.is_sold else 0
-    
-    return sorted(items_list, key=lambda x: (x.relevance_score, x.added_at), reverse=True)
\ No newline at end of file
+# Each order, including the id tie-breaker, is the exact scan order of one of
+# the partial indexes on Item (the rowid trails every SQLite index).
+# 'relevance' is the materialized Item.score, see ranking.py.
+FEED_ORDERINGS = {
+    'relevance': ('-score', 'id'),
+    'newest': ('-added_at', 'id'),
+    'price_asc': ('price', 'id'),
+    'price_desc': ('-price', '-id'),
+}
+
+def parse_price(value):
+    try:
+        price = Decimal(value)
+    except (TypeError, InvalidOperation):
+        return None
+    return abs(price) if price.is_finite() else None
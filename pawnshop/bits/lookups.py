@@ -0,0 +1,38 @@
+import threading
+import time
+from django.conf import settings
+from .models import Category, Hostel
+
+# Categories and hostels change a few times a year, so each worker keeps its
+# own copy. Saving one clears the copy in that worker and the others pick the
+# change up within LOOKUP_CACHE_SECONDS.
+_lock = threading.Lock()
+_cache = {}
+
+
+def _cached(key, load):
+    now = time.monotonic()
+    entry = _cache.get(key)
+    if entry is None or now - entry[0] > settings.LOOKUP_CACHE_SECONDS:
+        with _lock:
+            entry = (now, load())
+            _cache[key] = entry
+    return entry[1]
+
+
+def clear(**kwargs):
+    _cache.clear()
+
+
+def categories():
+    """Every Category, shared by all requests of the worker, so treat them as read-only."""
+    return _cached('categories', lambda: tuple(Category.objects.order_by('id')))
+
+
+def category_choices():
+    return [(category.id, category.name) for category in categories()]
+
+
+def hostel_choices(campus=None):
+    hostels = _cached('hostels', lambda: tuple(Hostel.objects.order_by('name').values_list('name', 'campus')))
+    return [(name, name) for name, hostel_campus in hostels if not campus or hostel_campus == campus]
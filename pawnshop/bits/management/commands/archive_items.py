@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from bits import archive
+from bits.models import Item
+
+
+class Command(BaseCommand):
+    help = "Archive sold and inactive listings so the feed only scans live items, or restore archived ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--dry-run', action='store_true', help="Only count the listings that would be archived.")
+        parser.add_argument('--restore', nargs='+', type=int, metavar='ID', help="Restore the given item ids.")
+        parser.add_argument('--restore-seller', metavar='EMAIL', help="Restore every archived listing of a seller.")
+
+    def handle(self, *args, **options):
+        if options['restore'] or options['restore_seller']:
+            items = Item.objects.all()
+            if options['restore']:
+                items = items.filter(id__in=options['restore'])
+            if options['restore_seller']:
+                items = items.filter(seller__email=options['restore_seller'])
+            restored = archive.restore_items(items)
+            self.stdout.write(self.style.SUCCESS(f"Restored {restored} item(s)."))
+            return
+
+        if options['batch_size'] is not None and options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be positive.")
+
+        if options['dry_run']:
+            self.stdout.write(f"{archive.stale_items().count()} item(s) would be archived.")
+            return
+
+        archived = archive.archive_stale_items(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} item(s)."))
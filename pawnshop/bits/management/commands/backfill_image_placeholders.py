@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from bits.models import Image, Item
+
+FIELDS = ['width', 'height', 'placeholder', 'color']
+
+
+class Command(BaseCommand):
+    help = "Store the size, placeholder and dominant colour of images uploaded before they were computed at upload."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--all', action='store_true', help="Recompute every image, not only the missing ones.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be positive.")
+        images = Image.objects.all() if options['all'] else Image.objects.filter(width__isnull=True)
+        filled = 0
+        unreadable = 0
+        last_id = 0
+        while True:
+            batch = list(images.filter(id__gt=last_id).order_by('id')[:options['batch_size']])
+            if not batch:
+                break
+            done = [image for image in batch if image.fill_placeholder()]
+            unreadable += len(batch) - len(done)
+            Image.objects.bulk_update(done, FIELDS)
+            # The detail pages' ETags follow the item version, so they pick up the new markup.
+            Item.objects.filter(id__in={image.item_id for image in done}).update(**Item.touched())
+            filled += len(done)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(f"Filled in {filled} image(s), {unreadable} could not be read."))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+from bits import backup
+
+
+class Command(BaseCommand):
+    help = ("Take a consistent online snapshot of the SQLite database and an incremental copy of media/, "
+            "or list, verify, restore and prune snapshots. Restore with the site stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=None, help="Database pages copied per backup step.")
+        parser.add_argument('--list', action='store_true', help="List the snapshots.")
+        parser.add_argument('--verify', metavar='SNAPSHOT', help="Check a snapshot, 'latest' for the newest.")
+        parser.add_argument('--deep', action='store_true', help="With --verify, also rehash every media file.")
+        parser.add_argument('--restore', metavar='SNAPSHOT', help="Restore a snapshot, 'latest' for the newest.")
+        parser.add_argument('--keep', type=int, metavar='N', help="Delete all but the newest N snapshots.")
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def snapshot_name(self, name):
+        snapshots = backup.list_snapshots()
+        if name == 'latest' and snapshots:
+            return snapshots[-1]
+        if name not in snapshots:
+            raise CommandError(f"No snapshot named {name}.")
+        return name
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name in backup.list_snapshots():
+                manifest = backup.load_manifest(name)
+                self.stdout.write(f"{name}  db {filesizeformat(manifest['database']['size'])}  {len(manifest['media'])} media file(s)")
+            return
+
+        if options['verify']:
+            name = self.snapshot_name(options['verify'])
+            problems = backup.verify_snapshot(name, deep=options['deep'])
+            for problem in problems:
+                self.stderr.write(problem)
+            if problems:
+                raise CommandError(f"Snapshot {name} has {len(problems)} problem(s).")
+            self.stdout.write(self.style.SUCCESS(f"Snapshot {name} is intact."))
+            return
+
+        if options['restore']:
+            name = self.snapshot_name(options['restore'])
+            problems = backup.verify_snapshot(name)
+            if problems:
+                raise CommandError(f"Refusing to restore {name}: {problems[0]}")
+            if options['interactive']:
+                answer = input(f"This replaces the live database with snapshot {name}. Type 'yes' to continue: ")
+                if answer != 'yes':
+                    self.stdout.write("Restore cancelled.")
+                    return
+            restored = backup.restore_snapshot(name)
+            self.stdout.write(self.style.SUCCESS(f"Restored database and {restored} media file(s) from {name}."))
+            return
+
+        if options['keep'] is not None:
+            if options['keep'] < 1:
+                raise CommandError("--keep must be at least 1.")
+            dropped, removed = backup.prune_snapshots(options['keep'])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {dropped} snapshot(s) and {removed} unused media object(s)."))
+            return
+
+        manifest, copied, copied_bytes = backup.create_snapshot(pages=options['pages'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {manifest['name']}: database {filesizeformat(manifest['database']['size'])}, "
+            f"{len(manifest['media'])} media file(s), {copied} new ({filesizeformat(copied_bytes)})."
+        ))
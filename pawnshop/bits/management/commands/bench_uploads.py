@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image as PILImage
+
+
+def _peak_rss_kb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure(path, mode, queue):
+    import django
+    django.setup()
+    from bits import uploads
+
+    before = _peak_rss_kb()
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        if mode == 'pipeline':
+            output = uploads.process_image(f)
+            output.close()
+        else:
+            with PILImage.open(f) as img:
+                img.load()
+    elapsed = time.perf_counter() - start
+    after = _peak_rss_kb()
+    queue.put(((after - before) / 1024, elapsed))
+
+
+class Command(BaseCommand):
+    help = "Measure peak memory of the upload pipeline against a naive full decode, failing if it is higher."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='4000x3000,6000x4000,7200x5400',
+                            help="Comma separated WIDTHxHEIGHT list of synthetic photos.")
+        parser.add_argument('--format', default='JPEG', choices=['JPEG', 'PNG', 'WEBP'])
+        parser.add_argument('--budget-mb', type=float, default=None,
+                            help="Fail if the pipeline's peak memory exceeds this many MB for any size.")
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('spawn')
+        worst = 0
+        over = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for size in options['sizes'].split(','):
+                width, height = (int(part) for part in size.lower().split('x'))
+                path = os.path.join(tmp, f"{size}.{options['format'].lower()}")
+                exif = PILImage.Exif()
+                exif[0x0112] = 6
+                PILImage.effect_noise((width, height), 64).convert('RGB').save(path, format=options['format'], exif=exif.tobytes())
+
+                results = {}
+                for mode in ('naive', 'pipeline'):
+                    queue = context.Queue()
+                    process = context.Process(target=_measure, args=(path, mode, queue))
+                    process.start()
+                    process.join()
+                    if process.exitcode != 0:
+                        raise CommandError(f"{mode} run for {size} exited with code {process.exitcode}.")
+                    results[mode] = queue.get()
+
+                worst = max(worst, results['pipeline'][0])
+                if results['pipeline'][0] > results['naive'][0]:
+                    over.append(size)
+                self.stdout.write(
+                    f"{size:>12} {os.path.getsize(path) / 1024 / 1024:7.1f} MB on disk | "
+                    f"naive {results['naive'][0]:7.1f} MB {results['naive'][1] * 1000:7.0f} ms | "
+                    f"pipeline {results['pipeline'][0]:7.1f} MB {results['pipeline'][1] * 1000:7.0f} ms"
+                )
+
+        if over:
+            raise CommandError(f"Pipeline peak exceeds a naive full decode for {', '.join(over)}.")
+        if options['budget_mb'] is not None and worst > options['budget_mb']:
+            raise CommandError(f"Pipeline peak {worst:.1f} MB exceeds budget of {options['budget_mb']} MB.")
+        self.stdout.write(self.style.SUCCESS(f"Pipeline peak: {worst:.1f} MB"))
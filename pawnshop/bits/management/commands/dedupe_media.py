@@ -0,0 +1,64 @@
+from collections import Counter
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template.defaultfilters import filesizeformat
+from bits.models import Image, FeedbackImage, Item, MediaBlob
+from bits.storage import content_storage, content_name, digest_from_name, file_digest
+
+
+class Command(BaseCommand):
+    help = "Rehash existing media into content-addressed names, drop duplicate copies and rebuild reference counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report what would be saved.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        stored = {}
+        unique = {}
+        legacy = set()
+        missing = 0
+
+        for model in (Image, FeedbackImage):
+            for pk, name in list(model.objects.values_list('pk', 'image')):
+                if not name or not content_storage.exists(name):
+                    missing += 1
+                    continue
+
+                size = stored.setdefault(name, content_storage.size(name))
+                if digest_from_name(name):
+                    unique.setdefault(name, size)
+                    continue
+
+                with content_storage.open(name, 'rb') as f:
+                    target = content_name(name, file_digest(File(f)))
+                    if not dry_run and not content_storage.exists(target):
+                        content_storage.save(name, File(f))
+                unique.setdefault(target, size)
+                legacy.add(name)
+                if not dry_run:
+                    model.objects.filter(pk=pk).update(image=target)
+                    if model is Image:
+                        Item.objects.filter(images__pk=pk).update(**Item.touched())
+
+        total_bytes = sum(stored.values())
+        saved = total_bytes - sum(unique.values())
+        if not dry_run:
+            with transaction.atomic():
+                refs = Counter(Image.objects.values_list('image', flat=True))
+                refs.update(FeedbackImage.objects.values_list('image', flat=True))
+                MediaBlob.objects.all().delete()
+                MediaBlob.objects.bulk_create([
+                    MediaBlob(name=name, digest=digest_from_name(name) or '', size=unique.get(name, 0), refcount=count)
+                    for name, count in refs.items() if name
+                ], batch_size=500)
+            for name in legacy:
+                if content_storage.exists(name):
+                    content_storage.delete(name)
+
+        self.stdout.write(
+            f"{len(legacy)} file(s) rehashed, {len(unique)} distinct blob(s), {missing} missing. "
+            f"{filesizeformat(total_bytes)} stored before, {filesizeformat(saved)} saved"
+            f"{' (dry run)' if dry_run else ''}."
+        )
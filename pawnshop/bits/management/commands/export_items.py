@@ -0,0 +1,33 @@
+import sys
+import zipfile
+from django.core.management.base import BaseCommand
+from bits import bulk
+from bits.models import Item
+
+
+class Command(BaseCommand):
+    help = "Stream every listing to CSV or JSON lines, optionally with a zip of their images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--output', metavar='PATH', help="Defaults to stdout.")
+        parser.add_argument('--seller', metavar='EMAIL')
+        parser.add_argument('--images', metavar='ZIP', help="Also write the images to this zip.")
+
+    def handle(self, *args, **options):
+        items = Item.objects.all()
+        if options['seller']:
+            items = items.filter(seller__email=options['seller'])
+
+        output = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in bulk.export_lines(items, options['format']):
+                output.write(line)
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['images']:
+            with zipfile.ZipFile(options['images'], 'w', zipfile.ZIP_STORED) as archive:
+                written = bulk.write_image_archive(archive, items)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} image(s) to {options['images']}."))
@@ -0,0 +1,34 @@
+import zipfile
+from django.core.management.base import BaseCommand, CommandError
+from bits import bulk
+from bits.models import Person
+
+
+class Command(BaseCommand):
+    help = "Import listings for one seller from a CSV or JSON-lines file, with an optional zip of images."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or JSON-lines file.")
+        parser.add_argument('--seller', required=True, metavar='EMAIL')
+        parser.add_argument('--images', metavar='ZIP', help="Zip holding the images named in the file.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        person = Person.objects.filter(email=options['seller']).first()
+        if person is None:
+            raise CommandError(f"No person with email {options['seller']}.")
+
+        fmt = options['format'] or bulk.guess_format(options['path'])
+        archive = zipfile.ZipFile(options['images']) if options['images'] else None
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                created, errors = bulk.import_items(bulk.read_rows(fileobj, fmt), person, archive=archive,
+                                                    batch_size=options['batch_size'])
+        finally:
+            if archive:
+                archive.close()
+
+        for error in errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(f"Imported {created} item(s)."))
@@ -0,0 +1,230 @@
+import io
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from PIL import Image as PILImage
+from bits import lookups
+from bits.models import Item, Person
+
+DEFAULT_MIX = 'home=40,search=20,item_detail=30,add_product=5,bulk_action=5'
+CAMPUS_DOMAINS = {
+    'GOA': 'goa.bits-pilani.ac.in',
+    'HYD': 'hyderabad.bits-pilani.ac.in',
+    'PIL': 'pilani.bits-pilani.ac.in',
+}
+EMAIL_PREFIX = 'loadtest-'
+LISTING_ID = re.compile(r'class="item-card[^"]*" data-id="(\d+)"')
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in VirtualUser.ENDPOINTS:
+            raise CommandError(f"Unknown endpoint '{name}' in --mix, choose from {', '.join(VirtualUser.ENDPOINTS)}.")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f"Bad weight for '{name}' in --mix.")
+    return mix
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def sample_photo():
+    buffer = io.BytesIO()
+    PILImage.effect_noise((1280, 960), 48).convert('RGB').save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(Counter)
+
+    def add(self, endpoint, elapsed, error=None):
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            if error:
+                self.errors[endpoint][error] += 1
+
+
+class VirtualUser(threading.Thread):
+    ENDPOINTS = ('home', 'search', 'item_detail', 'add_product', 'bulk_action')
+    # Requested on the way to an endpoint rather than picked from --mix.
+    SUPPORTING = ('my_listings',)
+    CAMPUS_FILTERS = ('GOA', 'HYD', 'PIL', 'ALL')
+
+    def __init__(self, number, campus, fixtures, options, results, deadline):
+        super().__init__(daemon=True)
+        self.email = f"{EMAIL_PREFIX}{number}@{CAMPUS_DOMAINS[campus]}"
+        self.fixtures = fixtures
+        self.options = options
+        self.results = results
+        self.deadline = deadline
+        self.random = random.Random(number)
+        self.session = requests.Session()
+        self.base = options['url'].rstrip('/')
+        self.sign_in_path = reverse('sign_in')
+        self.signed_in = False
+
+    def request(self, endpoint, method, path, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base + path, allow_redirects=False,
+                                            timeout=self.options['timeout'], **kwargs)
+        except requests.RequestException as e:
+            self.results.add(endpoint, time.perf_counter() - start, type(e).__name__)
+            return None
+        elapsed = time.perf_counter() - start
+        error = None
+        if response.headers.get('X-Error-Kind'):
+            error = response.headers['X-Error-Kind']
+        elif response.status_code == 429:
+            error = 'rate-limited'
+        elif response.status_code >= 400:
+            error = f"http-{response.status_code}"
+        elif response.headers.get('Location', '').endswith(self.sign_in_path):
+            error = 'signed-out'
+        self.results.add(endpoint, elapsed, error)
+        return response
+
+    def sign_in(self):
+        response = self.session.post(self.base + reverse('loadtest_sign_in'), data={'email': self.email},
+                                     headers={'X-Loadtest-Token': self.options['token']}, timeout=self.options['timeout'])
+        if response.status_code != 204:
+            raise CommandError(f"Test sign-in returned {response.status_code}, is LOADTEST_AUTH_TOKEN set on the server?")
+        # The add form sets the CSRF cookie the upload needs.
+        self.session.get(self.base + reverse('add_product'), timeout=self.options['timeout'])
+        self.signed_in = True
+
+    def home(self):
+        campus = self.random.choice(self.CAMPUS_FILTERS)
+        page = self.random.choice((1, 1, 1, 2, 3))
+        self.request('home', 'GET', f"/?campus={campus}&page={page}")
+
+    def search(self):
+        word = self.random.choice(self.fixtures['words'])
+        campus = self.random.choice(self.CAMPUS_FILTERS)
+        self.request('search', 'GET', f"/?q={word}&campus={campus}")
+
+    def item_detail(self):
+        self.request('item_detail', 'GET', reverse('item_detail', args=[self.random.choice(self.fixtures['items'])]))
+
+    def add_product(self):
+        data = {
+            'name': f"Load test item {self.random.randrange(10 ** 6)}",
+            'description': "Created by the loadtest command.",
+            'price': str(self.random.randrange(50, 5000)),
+            'category': str(self.random.choice(self.fixtures['categories'])),
+        }
+        files = [('images', ('photo.jpg', self.fixtures['photo'], 'image/jpeg'))]
+        self.request('add_product', 'POST', reverse('add_product'), data=data, files=files,
+                     headers={'X-CSRFToken': self.session.cookies.get('csrftoken', '')})
+
+    def bulk_action(self):
+        # Picked from the page like a user would, the database is not this thread's to query.
+        response = self.request('my_listings', 'GET', reverse('my_listings'))
+        ids = LISTING_ID.findall(response.text)[:5] if response is not None and response.status_code == 200 else []
+        if not ids:
+            return self.add_product()
+        self.request('bulk_action', 'POST', reverse('bulk_action', args=['toggle_sold']),
+                     data={'selected_items': ','.join(ids)})
+
+    def run(self):
+        endpoints = list(self.options['mix'])
+        weights = list(self.options['mix'].values())
+        while time.monotonic() < self.deadline:
+            getattr(self, self.random.choices(endpoints, weights)[0])()
+            if self.options['think_ms']:
+                time.sleep(self.random.uniform(0, 2 * self.options['think_ms']) / 1000)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive a running server with concurrent signed-in users and report throughput, "
+        "latency percentiles and errors per endpoint. The server needs LOADTEST_AUTH_TOKEN "
+        "set, and usually RATELIMIT_ENABLED=0 unless the limits are what is being tested."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--users', type=int, default=20, help="Concurrent virtual users.")
+        parser.add_argument('--duration', type=int, default=60, help="Seconds to run for.")
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Endpoint weights, default {DEFAULT_MIX}.")
+        parser.add_argument('--campuses', default='GOA,HYD,PIL', help="Campuses the users are spread across.")
+        parser.add_argument('--think-ms', type=int, default=0, help="Mean pause between a user's requests.")
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--token', default=None, help="Defaults to LOADTEST_AUTH_TOKEN.")
+        parser.add_argument('--cleanup', action='store_true', help="Delete the load test users and their items, then exit.")
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = Person.objects.filter(email__startswith=EMAIL_PREFIX).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} load test row(s)."))
+            return
+
+        options['token'] = options['token'] or settings.LOADTEST_AUTH_TOKEN
+        if not options['token']:
+            raise CommandError("Pass --token or set LOADTEST_AUTH_TOKEN, matching the server's.")
+        if options['users'] <= 0 or options['duration'] <= 0:
+            raise CommandError("--users and --duration must be positive.")
+        options['mix'] = parse_mix(options['mix'])
+        campuses = [campus for campus in options['campuses'].split(',') if campus]
+        if not campuses or set(campuses) - set(CAMPUS_DOMAINS):
+            raise CommandError(f"--campuses must be a list of {', '.join(CAMPUS_DOMAINS)}.")
+
+        items = list(Item.objects.filter(is_archived=False).values_list('id', 'name')[:2000])
+        if not items:
+            raise CommandError("There are no live items to browse.")
+        fixtures = {
+            'items': [item_id for item_id, name in items],
+            'words': sorted({word.lower() for item_id, name in items for word in name.split() if len(word) > 3 and word.isalpha()}) or ['book'],
+            'categories': [category.id for category in lookups.categories()],
+            'photo': sample_photo(),
+        }
+
+        results = Results()
+        users = [VirtualUser(n, campuses[n % len(campuses)], fixtures, options, results, 0) for n in range(options['users'])]
+        for user in users:
+            user.sign_in()
+        self.stdout.write(f"Signed in {len(users)} users, running for {options['duration']}s against {options['url']}")
+
+        start = time.monotonic()
+        for user in users:
+            user.deadline = start + options['duration']
+            user.start()
+        for user in users:
+            user.join()
+        self.report(results, time.monotonic() - start)
+
+    def report(self, results, elapsed):
+        self.stdout.write(f"\n{'endpoint':<12} {'requests':>8} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        total = 0
+        failed = 0
+        for endpoint in VirtualUser.ENDPOINTS + VirtualUser.SUPPORTING:
+            latencies = sorted(results.latencies.get(endpoint, []))
+            if not latencies:
+                continue
+            errors = sum(results.errors[endpoint].values())
+            total += len(latencies)
+            failed += errors
+            self.stdout.write(
+                f"{endpoint:<12} {len(latencies):>8} {len(latencies) / elapsed:>7.1f} "
+                f"{percentile(latencies, 0.50) * 1000:>8.0f} {percentile(latencies, 0.95) * 1000:>8.0f} "
+                f"{percentile(latencies, 0.99) * 1000:>8.0f} {errors / len(latencies):>7.1%}"
+            )
+            for kind, count in results.errors[endpoint].most_common():
+                self.stdout.write(f"{'':<14}{kind}: {count}")
+        self.stdout.write(f"{'total':<12} {total:>8} {total / elapsed:>7.1f} {'':>26} {failed / max(total, 1):>7.1%}")
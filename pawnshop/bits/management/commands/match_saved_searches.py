@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from bits import saved_searches
+
+
+class Command(BaseCommand):
+    help = "Match listings added since the last run against every saved search and notify the owners."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        created = saved_searches.match_new_items(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Recorded {created} new match(es)."))
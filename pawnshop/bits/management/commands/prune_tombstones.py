@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from bits import changefeed
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete changefeed tombstones of deleted items. Clients that last synced "
+        "before the newest pruned tombstone are told to fetch a fresh copy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.CHANGEFEED_TOMBSTONE_DAYS,
+                            help="Keep tombstones younger than this many days.")
+
+    def handle(self, *args, **options):
+        deleted = changefeed.prune_tombstones(options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tombstone(s)."))
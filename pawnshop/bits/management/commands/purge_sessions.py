@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete expired session rows in small batches so SQLite writers are not blocked."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE.endswith('signed_cookies'):
+            self.stdout.write("Signed cookie sessions keep no rows, nothing to purge.")
+            return
+
+        now = timezone.now()
+        total = 0
+        while True:
+            with transaction.atomic():
+                keys = list(Session.objects.filter(expire_date__lt=now).values_list('session_key', flat=True)[:options['batch_size']])
+                if not keys:
+                    break
+                total += Session.objects.filter(session_key__in=keys).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f"Deleted {total} expired session(s)."))
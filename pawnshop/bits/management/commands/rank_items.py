@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from bits import ranking
+
+
+class Command(BaseCommand):
+    help = "Recompute the feed score of every live listing from its views, contact clicks and the seller's reposts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] <= 0:
+            raise CommandError("--batch-size must be positive.")
+        updated = ranking.rescore(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Updated the score of {updated} item(s)."))
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from bits import ratelimit
+
+
+class Command(BaseCommand):
+    help = "Show how many requests each rate limit scope has allowed and rejected."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Clear the counters and every bucket.")
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            ratelimit.reset()
+            self.stdout.write(self.style.SUCCESS("Rate limit counters and buckets cleared."))
+            return
+
+        rows = {scope: (allowed, denied) for scope, allowed, denied in ratelimit.stats()}
+        for scope, rate in settings.RATELIMITS.items():
+            allowed, denied = rows.get(scope, (0, 0))
+            self.stdout.write(f"{scope:<12} {rate:>6}  allowed {allowed:>8}  rejected {denied:>8}")
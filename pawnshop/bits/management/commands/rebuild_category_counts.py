@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from bits import counts
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-campus category counters from the live listings."
+
+    def handle(self, *args, **options):
+        rows = counts.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} category counter(s)."))
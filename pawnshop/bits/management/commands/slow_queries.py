@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from bits.models import SlowQuery
+
+ORDERINGS = {'total': '-total_ms', 'max': '-max_ms', 'count': '-count', 'recent': '-last_seen'}
+
+
+class Command(BaseCommand):
+    help = "Report the recorded slow queries, grouped by normalized SQL, with where they run from and their plan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--order', choices=sorted(ORDERINGS), default='total')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--sites', action='store_true', help="One row per call site instead of per query.")
+        parser.add_argument('--no-plans', action='store_true', help="Leave the query plans out.")
+        parser.add_argument('--reset', action='store_true', help="Forget every recorded query.")
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} slow query record(s)."))
+            return
+
+        if options['sites']:
+            rows = SlowQuery.objects.order_by(ORDERINGS[options['order']])[:options['limit']]
+            for row in rows:
+                self.stdout.write(
+                    f"{row.count:>7}x  total {row.total_ms:>9.0f} ms  avg {row.total_ms / row.count:>7.1f} ms  "
+                    f"max {row.max_ms:>7.1f} ms  {row.fingerprint}  {row.call_site}"
+                )
+            return
+
+        order = ORDERINGS[options['order']].lstrip('-')
+        totals = {}
+        # A query can run from several call sites, the report adds them up per fingerprint.
+        for row in SlowQuery.objects.values('fingerprint', 'count', 'total_ms', 'max_ms', 'last_seen'):
+            entry = totals.setdefault(row['fingerprint'], {'count': 0, 'total_ms': 0, 'max_ms': 0, 'last_seen': row['last_seen']})
+            entry['count'] += row['count']
+            entry['total_ms'] += row['total_ms']
+            entry['max_ms'] = max(entry['max_ms'], row['max_ms'])
+            entry['last_seen'] = max(entry['last_seen'], row['last_seen'])
+        top = sorted(totals.items(), key=lambda pair: pair[1][order], reverse=True)[:options['limit']]
+        if not top:
+            self.stdout.write("No slow queries recorded.")
+            return
+
+        for fingerprint, entry in top:
+            sites = list(SlowQuery.objects.filter(fingerprint=fingerprint).order_by('-total_ms'))
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{fingerprint}  {entry['count']}x  total {entry['total_ms']:.0f} ms  "
+                f"avg {entry['total_ms'] / entry['count']:.1f} ms  max {entry['max_ms']:.1f} ms  "
+                f"last {entry['last_seen']:%Y-%m-%d %H:%M}"
+            ))
+            self.stdout.write(f"  {sites[0].sql}")
+            for site in sites:
+                self.stdout.write(f"    {site.count:>6}x {site.total_ms:>9.0f} ms  {site.call_site}")
+            plan = next((site.plan for site in sites if site.plan), '')
+            if plan and not options['no_plans']:
+                for line in plan.splitlines():
+                    self.stdout.write(f"    | {line}")
+            self.stdout.write('')
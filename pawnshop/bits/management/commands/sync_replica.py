@@ -0,0 +1,23 @@
+import os
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from bits import backup
+from bits.routers import REPLICA_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = "Refresh a local SQLite read replica from the primary with the online backup API."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=None, help="Database pages copied per backup step.")
+
+    def handle(self, *args, **options):
+        replica = settings.DATABASES.get(REPLICA_DB_ALIAS)
+        if not replica or replica['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("No SQLite replica configured, set DATABASE_REPLICA_NAME.")
+
+        target = str(replica['NAME'])
+        # Build the new copy next to the old one and swap it in, so readers never see a half-written file.
+        backup.backup_database(f"{target}.partial", pages=options['pages'])
+        os.replace(f"{target}.partial", target)
+        self.stdout.write(self.style.SUCCESS(f"Replica {target} is up to date."))
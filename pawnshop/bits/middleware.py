@@ -0,0 +1,58 @@
+import time
+from django.conf import settings
+from django.urls import reverse
+from .routers import replica_configured, request_state
+from . import profiling
+
+PINNED_UNTIL_KEY = '_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Decides per request whether reads may go to the replica. Unsafe methods
+    and requests inside a visitor's sticky window use the primary; any
+    request that writes opens a DATABASE_REPLICA_STICKY_SECONDS window so
+    the redirect that follows a POST reads its own writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_configured():
+            # Without a replica there is nothing to route, and no session to touch.
+            return self.get_response(request)
+        now = time.time()
+        pinned = request.method not in SAFE_METHODS or request.session.get(PINNED_UNTIL_KEY, 0) > now
+        state = {'pinned': pinned, 'wrote': False}
+        token = request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_state.reset(token)
+
+        if state['wrote'] or request.method not in SAFE_METHODS:
+            request.session[PINNED_UNTIL_KEY] = now + settings.DATABASE_REPLICA_STICKY_SECONDS
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a single request for staff who add ?_profile=1 or an X-Profile
+    header. The result is kept in the admin under Request profiles, and the
+    response links to it in its X-Profile header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not profiling.wants_profile(request):
+            return self.get_response(request)
+        response, profile = profiling.profile_request(request, self.get_response)
+        if profile is None:
+            response['X-Profile'] = 'busy'
+        else:
+            response['X-Profile'] = reverse('admin:bits_requestprofile_change', args=[profile.id])
+        return response
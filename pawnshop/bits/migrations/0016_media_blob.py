@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:26
+
+import bits.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0015_alter_item_category_alter_item_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('digest', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('size', models.BigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='feedbackimage',
+            name='image',
+            field=models.ImageField(storage=bits.storage.ContentAddressedStorage(), upload_to='feedbacks/'),
+        ),
+        migrations.AlterField(
+            model_name='image',
+            name='image',
+            field=models.ImageField(storage=bits.storage.ContentAddressedStorage(), upload_to='images/'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0016_media_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='is_archived',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['-added_at'], name='item_live_added_idx'),
+        ),
+    ]
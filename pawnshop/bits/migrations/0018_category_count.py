@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_counts(apps, schema_editor):
+    Item = apps.get_model('bits', 'Item')
+    CategoryCount = apps.get_model('bits', 'CategoryCount')
+    rows = (Item.objects.filter(is_sold=False, is_archived=False)
+            .values_list('seller__campus', 'category_id')
+            .annotate(n=Count('id')))
+    CategoryCount.objects.bulk_create([
+        CategoryCount(campus=campus, category_id=category_id, count=n) for campus, category_id, n in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0017_item_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campus', models.CharField(choices=[('GOA', 'Goa'), ('HYD', 'Hyderabad'), ('PIL', 'Pilani'), ('OTH', 'Others'), ('GMAIL', 'Gmail')], max_length=5)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counts', to='bits.category')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('campus', 'category'), name='unique_campus_category_count')],
+            },
+        ),
+        migrations.RunPython(build_counts, migrations.RunPython.noop),
+    ]
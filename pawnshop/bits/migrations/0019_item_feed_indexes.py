@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0018_category_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['is_sold', '-added_at'], name='item_live_relevance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['price'], name='item_live_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['category', '-added_at'], name='item_live_cat_added_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['category', 'is_sold', '-added_at'], name='item_live_cat_relevance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['category', 'price'], name='item_live_cat_price_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0019_item_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('query', models.CharField(blank=True, default='', max_length=100)),
+                ('campus', models.CharField(blank=True, choices=[('GOA', 'Goa'), ('HYD', 'Hyderabad'), ('PIL', 'Pilani'), ('OTH', 'Others'), ('GMAIL', 'Gmail')], max_length=5, null=True)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('last_item_id', models.IntegerField(default=0)),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to='bits.category')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saved_searches', to='bits.person')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('is_seen', models.BooleanField(default=False)),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_matches', to='bits.item')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_matches', to='bits.person')),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='bits.savedsearch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['person', 'is_seen'], name='search_match_unseen_idx')],
+                'constraints': [models.UniqueConstraint(fields=('saved_search', 'item'), name='unique_saved_search_item')],
+            },
+        ),
+    ]
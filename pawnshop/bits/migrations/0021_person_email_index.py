@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0020_saved_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='person',
+            name='email',
+            field=models.EmailField(db_index=True, max_length=254),
+        ),
+    ]
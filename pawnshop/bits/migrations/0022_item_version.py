@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:44
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_from_added_at(apps, schema_editor):
+    Item = apps.get_model('bits', 'Item')
+    Item.objects.update(updated_at=F('added_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0021_person_email_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.RunPython(start_from_added_at, migrations.RunPython.noop),
+    ]
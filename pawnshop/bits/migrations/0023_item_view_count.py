@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0022_item_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:52
+
+from django.db import migrations, models
+
+
+def compute_scores(apps, schema_editor):
+    from bits import ranking
+
+    Item = apps.get_model('bits', 'Item')
+    ranking.rescore(Item.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0023_item_view_count'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_live_relevance_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_live_cat_relevance_idx',
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='contact_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='repost_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['-score'], name='item_live_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_archived', False)), fields=['category', '-score'], name='item_live_cat_score_idx'),
+        ),
+        migrations.RunPython(compute_scores, migrations.RunPython.noop),
+    ]
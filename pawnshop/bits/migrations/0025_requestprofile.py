@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-19 17:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0024_item_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=255)),
+                ('status', models.IntegerField()),
+                ('user', models.CharField(blank=True, max_length=150)),
+                ('total_ms', models.FloatField()),
+                ('sql_ms', models.FloatField()),
+                ('query_count', models.IntegerField()),
+                ('template_ms', models.FloatField()),
+                ('python_ms', models.FloatField()),
+                ('queries', models.TextField(blank=True)),
+                ('report', models.TextField(blank=True)),
+                ('stats', models.BinaryField()),
+                ('added_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 18:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0025_requestprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('fingerprint', models.CharField(max_length=16)),
+                ('call_site', models.CharField(max_length=255)),
+                ('alias', models.CharField(default='default', max_length=50)),
+                ('sql', models.TextField()),
+                ('plan', models.TextField(blank=True)),
+                ('count', models.IntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+                ('last_seen', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fingerprint', 'call_site'), name='unique_slow_query_site')],
+            },
+        ),
+    ]
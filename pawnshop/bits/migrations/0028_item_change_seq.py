@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-19 18:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def number_items(apps, schema_editor):
+    # Existing items get sequences in the order they last changed.
+    Item = apps.get_model('bits', 'Item')
+    ChangeCounter = apps.get_model('bits', 'ChangeCounter')
+    ids = list(Item.objects.order_by('updated_at', 'id').values_list('id', flat=True))
+    Item.objects.bulk_update([Item(id=item_id, change_seq=seq) for seq, item_id in enumerate(ids, 1)],
+                             ['change_seq'], batch_size=500)
+    ChangeCounter.objects.create(pk=1, value=len(ids))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0027_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+                ('pruned', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ItemTombstone',
+            fields=[
+                ('item_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('campus', models.CharField(choices=[('GOA', 'Goa'), ('HYD', 'Hyderabad'), ('PIL', 'Pilani'), ('OTH', 'Others'), ('GMAIL', 'Gmail')], max_length=5, null=True)),
+                ('change_seq', models.BigIntegerField(db_index=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='change_seq',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['change_seq', 'id'], name='item_change_seq_idx'),
+        ),
+        migrations.RunPython(number_items, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.6 on 2026-10-19 18:22
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bits', '0028_item_change_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Repost',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('reposted_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reposts', to='bits.item')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reposts', to='bits.person')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['seller', 'reposted_at'], name='repost_seller_time_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
-from django.db import models
-from . import helper
+from django.db import models, transaction
+from . import helper, ranking, uploads
+from .storage import content_storage
 from django.utils import timezone
 
 class Campus(models.TextChoices):
@@ -12,7 +13,7 @@ class Campus(models.TextChoices):
 class Person(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100, null=False)
-    email = models.EmailField(null=False)
+    email = models.EmailField(null=False, db_index=True)
     phone = models.CharField(max_length=20, null=True)
     campus = models.CharField(max_length=5, choices=Campus.choices, null=False)
     hostel = models.ForeignKey('Hostel', on_delete=models.CASCADE, related_name='residents', null=True)
@@ -25,8 +26,9 @@ class Person(models.Model):
         else:
             self.campus = Campus.OTHERS
         super().save(*args, **kwargs)
+        # Refreshes the WhatsApp links, which is not a repost.
         for item in self.items.all():
-            item.save()
+            item.save(change_time=False)
 
     @property
     def year(self):
@@ -63,8 +65,36 @@ class Item(models.Model):
     added_at = models.DateTimeField(auto_now_add=True)
     hostel = models.ForeignKey(Hostel, on_delete=models.CASCADE, related_name='items', null=False)
     phone = models.CharField(max_length=20, null=True, blank=True)
+    is_archived = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+    version = models.PositiveIntegerField(default=1)
+    view_count = models.PositiveIntegerField(default=0)
+    contact_count = models.PositiveIntegerField(default=0)
+    repost_count = models.PositiveIntegerField(default=0)
+    score = models.FloatField(default=0)
+    change_seq = models.BigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-added_at'], condition=models.Q(is_archived=False), name='item_live_added_idx'),
+            models.Index(fields=['-score'], condition=models.Q(is_archived=False), name='item_live_score_idx'),
+            models.Index(fields=['price'], condition=models.Q(is_archived=False), name='item_live_price_idx'),
+            models.Index(fields=['category', '-added_at'], condition=models.Q(is_archived=False), name='item_live_cat_added_idx'),
+            models.Index(fields=['category', '-score'], condition=models.Q(is_archived=False), name='item_live_cat_score_idx'),
+            models.Index(fields=['category', 'price'], condition=models.Q(is_archived=False), name='item_live_cat_price_idx'),
+            models.Index(fields=['change_seq', 'id'], name='item_change_seq_idx'),
+        ]
 
     def save(self, *args, change_time = True, **kwargs):
+        self.fill_derived_fields(change_time)
+        self.score = ranking.item_score(self)
+        with transaction.atomic():
+            self.change_seq = ChangeCounter.next()
+            super().save(*args, **kwargs)
+
+    def fill_derived_fields(self, change_time=True):
+        # Also called directly before bulk_create, which skips save().
         effective_phone = self.phone or self.seller.phone
         if effective_phone:
             self.whatsapp = helper.generate_whatsapp_link(
@@ -76,21 +106,125 @@ class Item(models.Model):
         self.price = abs(self.price)
         if change_time:
             self.added_at = timezone.now()
-        super().save(*args, **kwargs)
+        self.updated_at = timezone.now()
+        if self.pk:
+            self.version += 1
+
+    def repost(self, hostel=None):
+        """Bring the listing back to the top of the feed, counted towards the seller's repost penalty."""
+        self.is_sold = False
+        self.is_archived = False
+        self.archived_at = None
+        if hostel:
+            self.hostel = hostel
+        self.repost_count += 1
+        with transaction.atomic():
+            Repost.objects.create(item=self, seller_id=self.seller_id)
+            self.save()
+
+    @staticmethod
+    def touched():
+        """update() kwargs that mark items as changed, for bulk updates that bypass save()."""
+        return {'updated_at': timezone.now(), 'version': models.F('version') + 1, 'change_seq': ChangeCounter.next()}
 
     def __str__(self):
         return f"{self.name}-{self.seller}"
     
+class Repost(models.Model):
+    id = models.AutoField(primary_key=True)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='reposts')
+    seller = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='reposts')
+    reposted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['seller', 'reposted_at'], name='repost_seller_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} @ {self.reposted_at}"
+
+class ChangeCounter(models.Model):
+    """One row handing out Item.change_seq, which the changefeed syncs clients by."""
+    value = models.BigIntegerField(default=0)
+    # Tombstones up to this sequence have been pruned, older sync tokens must start over.
+    pruned = models.BigIntegerField(default=0)
+
+    @classmethod
+    def next(cls):
+        with transaction.atomic():
+            if not cls.objects.filter(pk=1).update(value=models.F('value') + 1):
+                cls.objects.get_or_create(pk=1)
+                cls.objects.filter(pk=1).update(value=models.F('value') + 1)
+            return cls.objects.values_list('value', flat=True).get(pk=1)
+
+    def __str__(self):
+        return f"{self.value}"
+
+class ItemTombstone(models.Model):
+    item_id = models.IntegerField(primary_key=True)
+    campus = models.CharField(max_length=5, choices=Campus.choices, null=True)
+    change_seq = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.item_id} @ {self.change_seq}"
+
+class CategoryCount(models.Model):
+    campus = models.CharField(max_length=5, choices=Campus.choices)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='counts')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campus', 'category'], name='unique_campus_category_count'),
+        ]
+
+    def __str__(self):
+        return f"{self.campus}-{self.category}: {self.count}"
+
 class Image(models.Model):
     id = models.AutoField(primary_key=True)
-    image = models.ImageField(upload_to='images/', null=False)
+    image = models.ImageField(upload_to='images/', storage=content_storage, null=False)
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='images', null=False)
     added_at = models.DateTimeField(auto_now_add=True)
     display_order = models.IntegerField(default=0)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    placeholder = models.TextField(blank=True, default='')
+    color = models.CharField(max_length=7, blank=True, default='')
 
     class Meta:
         ordering = ['display_order']
 
+    def save(self, *args, **kwargs):
+        if self.width is None and self.image:
+            self.fill_placeholder()
+        super().save(*args, **kwargs)
+
+    def fill_placeholder(self):
+        """Set width, height, placeholder and color from the image file, returns False if it can't be read."""
+        try:
+            if self.image._committed:
+                with self.image.storage.open(self.image.name, 'rb') as f:
+                    info = uploads.describe_image(f)
+            else:
+                info = uploads.describe_image(self.image.file)
+        except OSError:
+            info = None
+        if not info:
+            return False
+        for field, value in info.items():
+            setattr(self, field, value)
+        return True
+
+    @property
+    def placeholder_style(self):
+        # Painted behind the <img> until the real image has loaded over it.
+        if not self.placeholder:
+            return ''
+        return f"background: {self.color} url({self.placeholder}) center / cover no-repeat"
+
     def __str__(self):
         return f"{self.item}-{self.display_order}"
     
@@ -105,9 +239,92 @@ class Feedback(models.Model):
 
 class FeedbackImage(models.Model):
     id = models.AutoField(primary_key=True)
-    image = models.ImageField(upload_to='feedbacks/', null=False)
+    image = models.ImageField(upload_to='feedbacks/', storage=content_storage, null=False)
     feedback = models.ForeignKey(Feedback, on_delete=models.CASCADE, related_name='images', null=False)
     added_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.feedback}"
+
+class MediaBlob(models.Model):
+    name = models.CharField(max_length=255, primary_key=True)
+    digest = models.CharField(max_length=64, db_index=True, blank=True)
+    size = models.BigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    added_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
+
+class SavedSearch(models.Model):
+    id = models.AutoField(primary_key=True)
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='saved_searches', null=False)
+    query = models.CharField(max_length=100, blank=True, default='')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='saved_searches', null=True, blank=True)
+    campus = models.CharField(max_length=5, choices=Campus.choices, null=True, blank=True)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    last_item_id = models.IntegerField(default=0)
+    added_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.person}-{self.query or self.category or 'all'}"
+
+class SavedSearchMatch(models.Model):
+    id = models.AutoField(primary_key=True)
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches', null=False)
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='search_matches', null=False)
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='search_matches', null=False)
+    is_seen = models.BooleanField(default=False)
+    added_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'item'], name='unique_saved_search_item'),
+        ]
+        indexes = [
+            models.Index(fields=['person', 'is_seen'], name='search_match_unseen_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.saved_search}-{self.item_id}"
+
+class RequestProfile(models.Model):
+    id = models.AutoField(primary_key=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    status = models.IntegerField()
+    user = models.CharField(max_length=150, blank=True)
+    total_ms = models.FloatField()
+    sql_ms = models.FloatField()
+    query_count = models.IntegerField()
+    template_ms = models.FloatField()
+    python_ms = models.FloatField()
+    queries = models.TextField(blank=True)
+    report = models.TextField(blank=True)
+    stats = models.BinaryField()
+    added_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.total_ms:.0f} ms)"
+
+class SlowQuery(models.Model):
+    id = models.AutoField(primary_key=True)
+    fingerprint = models.CharField(max_length=16)
+    call_site = models.CharField(max_length=255)
+    alias = models.CharField(max_length=50, default='default')
+    sql = models.TextField()
+    plan = models.TextField(blank=True)
+    count = models.IntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fingerprint', 'call_site'], name='unique_slow_query_site'),
+        ]
+
+    def __str__(self):
+        return f"{self.fingerprint} at {self.call_site}"
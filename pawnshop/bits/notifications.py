@@ -0,0 +1,30 @@
+import abc
+import logging
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Filled by LocalNotifier, the same way django.core.mail.outbox works for the
+# locmem email backend. Tests switch to it with override_settings.
+outbox = []
+
+
+class BaseNotifier(abc.ABC):
+    @abc.abstractmethod
+    def send(self, person, items):
+        """Tell person about the new listings `items`."""
+
+
+class LocalNotifier(BaseNotifier):
+    def send(self, person, items):
+        outbox.append({'email': person.email, 'items': [item.id for item in items]})
+
+
+class LogNotifier(BaseNotifier):
+    def send(self, person, items):
+        logger.info("%s new listing(s) for %s: %s", len(items), person.email, ", ".join(item.name for item in items))
+
+
+def get_notifier():
+    return import_string(settings.SAVED_SEARCH_NOTIFIER)()
@@ -0,0 +1,103 @@
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+TRIGGER_PARAM = '_profile'
+TRIGGER_HEADER = 'X-Profile'
+REPORT_LINES = 60
+
+# cProfile hooks the interpreter, and two profiles at once would each see the
+# other's request, so a worker profiles one request at a time.
+_busy = threading.Lock()
+_TEMPLATE_RENDER = (Template.render.__code__.co_filename, Template.render.__code__.co_firstlineno,
+                    Template.render.__code__.co_name)
+
+
+def wants_profile(request):
+    if TRIGGER_PARAM not in request.GET and not request.headers.get(TRIGGER_HEADER):
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_active and user.is_staff)
+
+
+class QueryLog:
+    """execute_wrapper that times every query on the connections it is installed on."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((context['connection'].alias, (time.perf_counter() - start) * 1000, sql))
+
+
+def profile_request(request, get_response):
+    """
+    Run get_response(request) under cProfile and store a RequestProfile. Returns
+    (response, profile), where profile is None when another request in this
+    worker is already being profiled.
+    """
+    if not _busy.acquire(blocking=False):
+        return get_response(request), None
+    try:
+        log = QueryLog()
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(log))
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = get_response(request)
+                # Deferred template responses render here, inside the profile.
+                if hasattr(response, 'render') and callable(response.render):
+                    response.render()
+            finally:
+                profiler.disable()
+            total_ms = (time.perf_counter() - start) * 1000
+        return response, save_profile(request, response, profiler, log, total_ms)
+    finally:
+        _busy.release()
+
+
+def save_profile(request, response, profiler, log, total_ms):
+    from .models import RequestProfile
+
+    stats = pstats.Stats(profiler)
+    # The same format dump_stats() writes, so the download opens in pstats or snakeviz.
+    dump = marshal.dumps(stats.stats)
+    template_ms = stats.stats.get(_TEMPLATE_RENDER, (0, 0, 0, 0))[3] * 1000
+    sql_ms = sum(ms for alias, ms, sql in log.queries)
+
+    report = io.StringIO()
+    pstats.Stats(profiler, stream=report).strip_dirs().sort_stats('cumulative').print_stats(REPORT_LINES)
+
+    profile = RequestProfile.objects.create(
+        method=request.method,
+        path=request.get_full_path()[:255],
+        status=response.status_code,
+        user=request.user.get_username()[:150],
+        total_ms=total_ms,
+        sql_ms=sql_ms,
+        query_count=len(log.queries),
+        template_ms=template_ms,
+        python_ms=max(total_ms - sql_ms, 0),
+        queries="\n\n".join(f"[{alias}] {ms:.2f} ms\n{sql}" for alias, ms, sql in log.queries),
+        report=report.getvalue(),
+        stats=dump,
+    )
+    oldest_kept = (RequestProfile.objects.order_by('-id')
+                   .values_list('id', flat=True)[settings.PROFILE_KEEP - 1:settings.PROFILE_KEEP].first())
+    if oldest_kept:
+        RequestProfile.objects.filter(id__lt=oldest_kept).delete()
+    return profile
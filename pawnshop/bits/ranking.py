@@ -0,0 +1,105 @@
+import datetime
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+from django.utils import timezone
+
+# Scores are stored in log space against a fixed epoch:
+#
+#     score = log2(quality) + hours since EPOCH / RANKING_HALF_LIFE_HOURS
+#
+# which orders items exactly like quality * 0.5 ** (age / half life), but an
+# item's score never has to change just because time passed. Only new views,
+# contact clicks or seller activity move it, which is what rank_items picks up.
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+# Sold items keep their order among each other but always sort below unsold ones.
+SOLD_OFFSET = 1e6
+SCORE_TOLERANCE = 1e-6
+
+
+def hours_since_epoch(moments):
+    return (np.array([moment.timestamp() for moment in moments], dtype=float) - EPOCH.timestamp()) / 3600
+
+
+def repost_penalty(activity):
+    """
+    1 up to RANKING_REPOST_ALLOWANCE listings in the window, shrinking with
+    every one past it. It applies to all of the seller's items, and lifts
+    again once they stop flooding the feed.
+    """
+    excess = np.maximum(0, np.asarray(activity, dtype=float) - settings.RANKING_REPOST_ALLOWANCE)
+    return 1 / (1 + settings.RANKING_REPOST_PENALTY * excess)
+
+
+def scores(added_hours, views, contacts, penalty, sold):
+    engagement = np.asarray(views, dtype=float) + settings.RANKING_CONTACT_WEIGHT * np.asarray(contacts, dtype=float)
+    quality = np.asarray(penalty, dtype=float) * (1 + settings.RANKING_ENGAGEMENT_WEIGHT * np.log1p(engagement))
+    score = np.log2(quality) + np.asarray(added_hours, dtype=float) / settings.RANKING_HALF_LIFE_HOURS
+    return np.where(sold, score - SOLD_OFFSET, score)
+
+
+def activity_since(now):
+    return now - datetime.timedelta(hours=settings.RANKING_REPOST_WINDOW_HOURS)
+
+
+def seller_activity(model, seller_ids, since, exclude_id=None):
+    """
+    {seller id: listings the seller put up or reposted since `since`}, each
+    listing counting once plus once for every further repost of it in the window.
+    """
+    rows = model.objects.filter(seller_id__in=seller_ids, is_archived=False, added_at__gte=since)
+    if exclude_id:
+        rows = rows.exclude(id=exclude_id)
+    activity = dict(rows.order_by().values_list('seller_id').annotate(n=Count('id')))
+    try:
+        repost_model = model._meta.apps.get_model('bits', 'Repost')
+    except LookupError:
+        # Rescoring from a migration that predates reposts.
+        return activity
+    reposts = (repost_model.objects.filter(seller_id__in=seller_ids, reposted_at__gte=since)
+               .order_by().values_list('seller_id').annotate(n=Count('id'), items=Count('item_id', distinct=True)))
+    for seller_id, n, items in reposts:
+        activity[seller_id] = activity.get(seller_id, 0) + n - items
+    return activity
+
+
+def item_score(item, now=None):
+    """Score for one item about to be saved, so it lands in the right place before the next rank_items run."""
+    since = activity_since(now or timezone.now())
+    activity = seller_activity(type(item), [item.seller_id], since, exclude_id=item.pk).get(item.seller_id, 0)
+    if item.added_at >= since:
+        activity += 1
+    return float(scores(hours_since_epoch([item.added_at]), [item.view_count], [item.contact_count],
+                        repost_penalty([activity]), [item.is_sold])[0])
+
+
+def rescore(items=None, now=None, batch_size=None):
+    """
+    Recompute the score of every live item in `items` (all items by default),
+    a batch at a time, and write back only the ones that moved. Returns the
+    number of items updated.
+    """
+    if items is None:
+        from .models import Item
+        items = Item.objects.all()
+    model = items.model
+    since = activity_since(now or timezone.now())
+    batch_size = batch_size or settings.RANKING_BATCH_SIZE
+    live = items.filter(is_archived=False)
+    sellers = live.filter(added_at__gte=since).order_by().values_list('seller_id', flat=True).distinct()
+    activity = seller_activity(model, sellers, since)
+
+    updated = 0
+    last_id = 0
+    while True:
+        batch = list(live.filter(id__gt=last_id).order_by('id').values_list(
+            'id', 'seller_id', 'added_at', 'view_count', 'contact_count', 'is_sold', 'score')[:batch_size])
+        if not batch:
+            return updated
+        ids, seller_ids, added_at, views, contacts, sold, old = zip(*batch)
+        penalty = repost_penalty([activity.get(seller_id, 0) for seller_id in seller_ids])
+        new = scores(hours_since_epoch(added_at), views, contacts, penalty, np.array(sold))
+        moved = np.flatnonzero(~np.isclose(new, np.array(old, dtype=float), rtol=0, atol=SCORE_TOLERANCE))
+        model.objects.bulk_update([model(id=ids[i], score=float(new[i])) for i in moved], ['score'], batch_size=500)
+        updated += len(moved)
+        last_id = ids[-1]
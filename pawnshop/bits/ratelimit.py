@@ -0,0 +1,137 @@
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+from django.conf import settings
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Buckets live in a small SQLite file next to the cache so every gunicorn
+# worker on the host shares them without another service to run.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bucket (
+    key TEXT PRIMARY KEY, tokens REAL NOT NULL, ts REAL NOT NULL, allowed INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counter (
+    scope TEXT PRIMARY KEY, allowed INTEGER NOT NULL DEFAULT 0, denied INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+# One statement refills the bucket for the time that passed and takes a token
+# if there is one. SET expressions all see the old row, so allowed and tokens
+# agree with each other.
+TAKE = """
+INSERT INTO bucket (key, tokens, ts, allowed) VALUES (:key, :capacity - 1, :now, 1)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = MIN(:capacity, tokens + (:now - ts) * :rate) - (MIN(:capacity, tokens + (:now - ts) * :rate) >= 1),
+    allowed = MIN(:capacity, tokens + (:now - ts) * :rate) >= 1,
+    ts = :now
+RETURNING tokens, allowed
+"""
+
+COUNT = """
+INSERT INTO counter (scope, allowed, denied) VALUES (?, ?, ?)
+ON CONFLICT (scope) DO UPDATE SET allowed = allowed + excluded.allowed, denied = denied + excluded.denied
+"""
+
+_local = threading.local()
+
+
+def parse_rate(rate):
+    """'10/m' -> (capacity, tokens per second)."""
+    count, period = rate.split('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period]
+
+
+def connection():
+    # Connections are not shared across a fork, so they are keyed by pid as well as thread.
+    if getattr(_local, 'pid', None) != os.getpid():
+        os.makedirs(os.path.dirname(settings.RATELIMIT_STORE), exist_ok=True)
+        conn = sqlite3.connect(settings.RATELIMIT_STORE, timeout=0.05, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.executescript(SCHEMA)
+        _local.pid, _local.conn = os.getpid(), conn
+    return _local.conn
+
+
+def hit(scope, ident, now=None):
+    """Take a token for ident in scope. Returns 0 when allowed, else seconds until the next token."""
+    capacity, rate = parse_rate(settings.RATELIMITS[scope])
+    now = now or time.time()
+    try:
+        conn = connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, allowed = conn.execute(TAKE, {'key': f"{scope}:{ident}", 'capacity': capacity, 'rate': rate, 'now': now}).fetchone()
+            conn.execute(COUNT, (scope, int(allowed), int(not allowed)))
+            if random.random() < 0.001:
+                conn.execute("DELETE FROM bucket WHERE ts < ?", (now - settings.RATELIMIT_IDLE_SECONDS,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    except sqlite3.Error as e:
+        # A broken or busy store should never take the site down with it.
+        # Busy is expected under load and needs no traceback.
+        if isinstance(e, sqlite3.OperationalError) and 'locked' in str(e):
+            logger.warning("Rate limit store busy, letting request through: %s", e)
+        else:
+            logger.exception("Rate limit store unavailable, letting request through")
+        return 0
+    if allowed:
+        return 0
+    return max(1, math.ceil((1 - tokens) / rate))
+
+
+def stats():
+    return connection().execute("SELECT scope, allowed, denied FROM counter ORDER BY scope").fetchall()
+
+
+def reset():
+    conn = connection()
+    conn.execute("DELETE FROM bucket")
+    conn.execute("DELETE FROM counter")
+
+
+def client_ip(request):
+    if settings.RATELIMIT_TRUST_X_FORWARDED_FOR:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def client_key(request):
+    user_data = request.session.get('user_data')
+    if user_data and user_data.get('id'):
+        return f"person:{user_data['id']}"
+    return f"ip:{client_ip(request)}"
+
+
+def too_many_requests(request, retry_after):
+    response = render(request, 'bits/429.html', {'retry_after': retry_after}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def ratelimit(scope, methods=('POST',)):
+    """Limit a view per signed-in person, or per IP before sign-in, with the RATELIMITS[scope] bucket."""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if settings.RATELIMIT_ENABLED and request.method in methods:
+                retry_after = hit(scope, client_key(request))
+                if retry_after:
+                    return too_many_requests(request, retry_after)
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,42 @@
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+# Set by ReplicaRoutingMiddleware for the duration of a request. Outside a
+# request (management commands, shell, signals fired from them) everything
+# stays on the primary.
+request_state = ContextVar('replica_request_state', default=None)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads of the bits models to the replica during requests that have
+    not written anything, and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = request_state.get()
+        if state is None or state['pinned'] or model._meta.app_label != 'bits' or not replica_configured():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = request_state.get()
+        if state is not None:
+            # Whatever the request reads after its first write must see that write.
+            state['pinned'] = state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
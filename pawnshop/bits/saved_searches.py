@@ -0,0 +1,72 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db.models import Max
+from .models import Item, SavedSearch, SavedSearchMatch
+from .notifications import get_notifier
+
+
+def item_text(item):
+    # Same fields the home search runs icontains over; the separator keeps a
+    # query from matching across two fields.
+    return '\x00'.join([item.name, item.hostel_id or '', item.description or '', item.category.name]).casefold()
+
+
+def search_matches(search, item, text):
+    if item.id <= search.last_item_id or item.seller_id == search.person_id:
+        return False
+    if search.category_id and item.category_id != search.category_id:
+        return False
+    if search.campus and item.seller.campus != search.campus:
+        return False
+    if search.min_price is not None and item.price < search.min_price:
+        return False
+    if search.max_price is not None and item.price > search.max_price:
+        return False
+    return not search.query or search.query.casefold() in text
+
+
+def latest_item_id():
+    return Item.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def match_new_items(batch_size=None, notifier=None):
+    """
+    Run every saved search over the listings added since the lowest search
+    watermark, in one pass over Item. Matches are recorded for the "new for
+    you" badge and handed to the notifier, grouped per person.
+    """
+    batch_size = batch_size or settings.SAVED_SEARCH_BATCH_SIZE
+    searches = list(SavedSearch.objects.select_related('person'))
+    if not searches:
+        return 0
+
+    watermark = min(search.last_item_id for search in searches)
+    new_items = (Item.objects.filter(is_archived=False, is_sold=False)
+                 .select_related('seller', 'category')
+                 .order_by('id'))
+    matched = defaultdict(dict)
+    created = 0
+    while True:
+        batch = list(new_items.filter(id__gt=watermark)[:batch_size])
+        if not batch:
+            break
+        # Matches recorded by an earlier run that stopped before moving the
+        # watermarks, so a re-run neither counts nor notifies them again.
+        seen = set(SavedSearchMatch.objects.filter(item__in=batch).values_list('saved_search_id', 'item_id'))
+        matches = []
+        for item in batch:
+            text = item_text(item)
+            for search in searches:
+                if (search.id, item.id) not in seen and search_matches(search, item, text):
+                    matches.append(SavedSearchMatch(saved_search=search, person_id=search.person_id, item=item))
+                    matched[search.person][item.id] = item
+        SavedSearchMatch.objects.bulk_create(matches, ignore_conflicts=True)
+        created += len(matches)
+        watermark = batch[-1].id
+
+    SavedSearch.objects.filter(id__in=[search.id for search in searches], last_item_id__lt=watermark).update(last_item_id=watermark)
+
+    notifier = notifier or get_notifier()
+    for person, items in matched.items():
+        notifier.send(person, list(items.values()))
+    return created
@@ -0,0 +1,107 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Category, ChangeCounter, Hostel, Image, FeedbackImage, Item, ItemTombstone
+from . import counts, lookups, storage, typeahead
+
+
+@receiver(post_init, sender=Image)
+@receiver(post_init, sender=FeedbackImage)
+def remember_stored_image(sender, instance, **kwargs):
+    # Rows loaded from the database carry the stored name as a plain string,
+    # new instances carry the uploaded File and deferred loads carry nothing.
+    value = instance.__dict__.get('image')
+    instance._stored_image = value if value is None or isinstance(value, str) else ''
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_save, sender=FeedbackImage)
+def retain_stored_image(sender, instance, created, **kwargs):
+    if instance._stored_image is None and not created:
+        return
+    name = instance.image.name or ''
+    if name != instance._stored_image:
+        storage.retain(name)
+        storage.release(instance._stored_image)
+        instance._stored_image = name
+
+
+@receiver(post_delete, sender=Image)
+@receiver(post_delete, sender=FeedbackImage)
+def release_stored_image(sender, instance, **kwargs):
+    storage.release(instance.image.name if instance._stored_image is None else instance._stored_image)
+
+
+@receiver(post_init, sender=Item)
+def remember_count_key(sender, instance, **kwargs):
+    if not instance.pk:
+        instance._count_key = None
+    elif all(field in instance.__dict__ for field in counts.KEY_FIELDS):
+        instance._count_key = counts.live_key(instance)
+    else:
+        instance._count_key = counts.UNKNOWN
+
+
+@receiver(post_save, sender=Item)
+def update_category_count(sender, instance, **kwargs):
+    key = counts.live_key(instance)
+    if key == instance._count_key or instance._count_key is counts.UNKNOWN:
+        return
+    campus = counts.seller_campus(instance)
+    if instance._count_key:
+        counts.adjust(campus, instance._count_key[1], -1)
+    if key:
+        counts.adjust(campus, key[1], 1)
+    instance._count_key = key
+
+
+@receiver(post_delete, sender=Item)
+def release_category_count(sender, instance, **kwargs):
+    if instance._count_key and instance._count_key is not counts.UNKNOWN:
+        counts.adjust(counts.seller_campus(instance), instance._count_key[1], -1)
+
+
+@receiver(post_delete, sender=Item)
+def leave_tombstone(sender, instance, **kwargs):
+    # Lets changefeed clients drop the listing from their copy.
+    ItemTombstone.objects.update_or_create(item_id=instance.pk, defaults={
+        'campus': counts.seller_campus(instance),
+        'change_seq': ChangeCounter.next(),
+        'deleted_at': timezone.now(),
+    })
+
+
+@receiver(post_save, sender=Item)
+def update_typeahead(sender, instance, **kwargs):
+    item_id = instance.pk
+    transaction.on_commit(lambda: typeahead.item_changed(item_id))
+
+
+@receiver(post_delete, sender=Item)
+def remove_from_typeahead(sender, instance, **kwargs):
+    item_id = instance.pk
+    transaction.on_commit(lambda: typeahead.item_deleted(item_id))
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def touch_item(sender, instance, **kwargs):
+    # The detail page's ETag follows the item version, so gallery changes bump it too.
+    Item.objects.filter(id=instance.item_id).update(**Item.touched())
+
+
+@receiver(post_save, sender=Category)
+def touch_category_items(sender, instance, created, **kwargs):
+    # Item pages and changefeed entries show the category name.
+    if not created:
+        Item.objects.filter(category=instance).update(**Item.touched())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Hostel)
+@receiver(post_delete, sender=Hostel)
+def clear_lookups(sender, **kwargs):
+    lookups.clear()
+    typeahead.clear()
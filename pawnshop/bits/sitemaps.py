@@ -0,0 +1,236 @@
+import hashlib
+import io
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils.xmlutils import SimplerXMLGenerator
+from .models import ChangeCounter, Item
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def live_items():
+    # Pages walk the primary key, which SQLite prefers over any narrower index here.
+    return Item.objects.filter(is_sold=False, is_archived=False).order_by('id')
+
+
+class KeysetPaginator:
+    """
+    Pages of a queryset ordered by id, each an id range [start, end) instead
+    of an OFFSET, so the last page of 500k rows costs the same as the first.
+    """
+
+    def __init__(self, queryset, per_page, bounds):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.bounds = list(bounds)
+
+    @property
+    def num_pages(self):
+        return max(len(self.bounds), 1)
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1 or number > self.num_pages:
+            raise EmptyPage("That page contains no results")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        queryset = self.queryset
+        if self.bounds:
+            start, end = self.bounds[number - 1]
+            queryset = queryset.filter(id__gte=start)
+            if end is not None:
+                queryset = queryset.filter(id__lt=end)
+        return Page(queryset[:self.per_page].iterator(chunk_size=2000), number, self)
+
+
+class ItemSitemap(Sitemap):
+    changefreq = 'daily'
+
+    def __init__(self):
+        self.limit = settings.SITEMAP_PAGE_SIZE
+        self.layout = layout(self.limit)
+
+    def items(self):
+        return live_items().values_list('id', 'updated_at')
+
+    def location(self, item):
+        return reverse('item_detail', args=[item[0]])
+
+    def lastmod(self, item):
+        return item[1]
+
+    @property
+    def paginator(self):
+        return KeysetPaginator(self.items(), self.limit, [(page['start'], page['end']) for page in self.layout])
+
+    def get_latest_lastmod(self):
+        return max((page['lastmod'] for page in self.layout), default=None)
+
+    def page_lastmod(self, number):
+        return self.layout[number - 1]['lastmod'] if self.layout else None
+
+    def page_key(self, number):
+        """Changes whenever a listing on the page is added, edited, sold or removed."""
+        if not self.layout:
+            return 'empty'
+        page = self.layout[number - 1]
+        return f"{page['start']}-{page['end']}:{page['seq']}:{page['count']}"
+
+
+SITEMAPS = {'items': ItemSitemap}
+
+
+def version():
+    """Bumped by every item change."""
+    return ChangeCounter.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+
+
+def cached(key, build):
+    key = f"sitemap:{key}"
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, settings.SITEMAP_CACHE_SECONDS)
+    return value
+
+
+def page_rows(start, end):
+    rows = live_items().filter(id__gte=start)
+    return rows if end is None else rows.filter(id__lt=end)
+
+
+def summarize(start, end):
+    return page_rows(start, end).aggregate(lastmod=Max('updated_at'), seq=Max('change_seq'), count=Count('id'))
+
+
+def build_layout(per_page, previous=()):
+    """
+    Pages are id ranges, and the ranges of the previous layout are kept so a
+    change only alters the page it falls in. A range that outgrew per_page is
+    split, empty ones are dropped and neighbours that fit in half a page
+    together are merged.
+    """
+    starts = [page['start'] for page in previous] or [0]
+    starts[0] = 0
+    pages = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1] if index + 1 < len(starts) else None
+        while True:
+            split = page_rows(start, end).values_list('id', flat=True)[per_page:per_page + 1].first()
+            if split is None:
+                break
+            pages.append({'start': start, 'end': split, **summarize(start, split)})
+            start = split
+        summary = summarize(start, end)
+        if summary['count']:
+            pages.append({'start': start, 'end': end, **summary})
+
+    merged = []
+    for page in pages:
+        last = merged[-1] if merged else None
+        if last and last['count'] + page['count'] <= per_page // 2:
+            last.update(
+                count=last['count'] + page['count'],
+                seq=max(last['seq'], page['seq']),
+                lastmod=max(last['lastmod'], page['lastmod']),
+            )
+        else:
+            merged.append(dict(page))
+    # Each page runs up to the next, so nothing falls between two of them.
+    for page, following in zip(merged, merged[1:] + [None]):
+        page['end'] = following and following['start']
+    if merged:
+        merged[0]['start'] = 0
+    return merged
+
+
+def layout(per_page):
+    """
+    [{start, end, lastmod, seq, count}] of every page. It is rebuilt at most
+    once per version(): while one worker builds it the others keep serving
+    the layout before.
+    """
+    key = f"sitemap:layout:{per_page}"
+    current = version()
+    previous = cache.get(key)
+    if previous is not None and previous[0] == current:
+        return previous[1]
+    if previous is not None and not cache.add(f"{key}:{current}", True, settings.SITEMAP_CACHE_SECONDS):
+        return previous[1]
+    pages = build_layout(per_page, previous[1] if previous else ())
+    cache.set(key, (current, pages), settings.SITEMAP_CACHE_SECONDS)
+    return pages
+
+
+def hash_key(value):
+    return hashlib.sha256(repr(value).encode()).hexdigest()
+
+
+def w3c_date(value):
+    return value.date().isoformat() if value else None
+
+
+def render_index(base_url):
+    sitemaps = {section: sitemap_class() for section, sitemap_class in SITEMAPS.items()}
+
+    def build():
+        out = io.StringIO()
+        xml = SimplerXMLGenerator(out, 'utf-8')
+        xml.startDocument()
+        xml.startElement('sitemapindex', {'xmlns': SITEMAP_NS})
+        for section, sitemap in sitemaps.items():
+            url = base_url + reverse('sitemap_section', args=[section])
+            for number in sitemap.paginator.page_range:
+                xml.startElement('sitemap', {})
+                xml.addQuickElement('loc', url if number == 1 else f"{url}?p={number}")
+                lastmod = w3c_date(sitemap.page_lastmod(number))
+                if lastmod:
+                    xml.addQuickElement('lastmod', lastmod)
+                xml.endElement('sitemap')
+        xml.endElement('sitemapindex')
+        xml.endDocument()
+        return out.getvalue().encode()
+    # Sections and pages are in the key through the page keys.
+    pages = [(section, number, sitemap.page_key(number)) for section, sitemap in sitemaps.items()
+             for number in sitemap.paginator.page_range]
+    return cached(f"index:{hash_key(pages)}:{base_url}", build)
+
+
+def render_section(base_url, section, number):
+    """
+    The urlset of one page, written while the rows stream out of the database
+    so a full page never sits in memory as model instances. Raises KeyError
+    for an unknown section and EmptyPage or PageNotAnInteger for a bad page.
+    """
+    sitemap = SITEMAPS[section]()
+    number = sitemap.paginator.validate_number(number)
+
+    def build():
+        out = io.StringIO()
+        xml = SimplerXMLGenerator(out, 'utf-8')
+        xml.startDocument()
+        xml.startElement('urlset', {'xmlns': SITEMAP_NS})
+        for item in sitemap.paginator.page(number).object_list:
+            xml.startElement('url', {})
+            xml.addQuickElement('loc', base_url + sitemap.location(item))
+            xml.addQuickElement('lastmod', w3c_date(sitemap.lastmod(item)))
+            xml.addQuickElement('changefreq', sitemap.changefreq)
+            xml.endElement('url')
+        xml.endElement('urlset')
+        xml.endDocument()
+        return out.getvalue().encode()
+    # Keyed on the page's own rows, so a change elsewhere leaves it cached.
+    return cached(f"{section}:{sitemap.page_key(number)}:{base_url}", build), sitemap.page_lastmod(number)
@@ -0,0 +1,146 @@
+import atexit
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SKIP_FILES = (os.path.abspath(__file__),)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'(?<![\w"])\d+(?:\.\d+)?\b')
+VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+WHITESPACE = re.compile(r'\s+')
+
+# Slow queries are rare, so they are gathered per worker and written when the
+# request has finished, where the writes can't pin the visitor to the primary
+# or be rolled back with the request's transaction.
+_lock = threading.Lock()
+_local = threading.local()
+_pending = {}
+
+
+def normalize(sql):
+    """SQL with every value replaced by ?, so one query shape gets one fingerprint."""
+    sql = STRING_LITERAL.sub('?', sql.replace('%s', '?'))
+    sql = NUMBER.sub('?', sql)
+    sql = VALUE_LIST.sub('(...)', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.md5(normalized.encode()).hexdigest()[:16]
+
+
+def call_site():
+    """'views.py:190 in home' for the innermost frame of this app that is not migrations or this module."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename.startswith(APP_DIR) and filename not in SKIP_FILES and '/migrations/' not in filename:
+            return f"{os.path.relpath(filename, APP_DIR)}:{frame.lineno} in {frame.name}"
+    return 'unknown'
+
+
+def record(alias, sql, params, elapsed_ms):
+    normalized = normalize(sql)
+    key = (fingerprint(normalized), call_site())
+    with _lock:
+        entry = _pending.get(key)
+        if entry is None:
+            _pending[key] = {'alias': alias, 'sql': normalized, 'raw': (sql, params), 'count': 1,
+                             'total_ms': elapsed_ms, 'max_ms': elapsed_ms}
+        else:
+            entry['count'] += 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+
+
+def recorder(execute, sql, params, many, context):
+    if getattr(_local, 'busy', False) or settings.SLOW_QUERY_MS <= 0:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= settings.SLOW_QUERY_MS:
+            record(context['connection'].alias, sql, params, elapsed_ms)
+
+
+def explain(alias, sql, params):
+    """The plan of a SELECT, EXPLAIN QUERY PLAN on SQLite and EXPLAIN ANALYZE on PostgreSQL."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    connection = connections[alias]
+    options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+    prefix = connection.ops.explain_query_prefix(**options)
+    with connection.cursor() as cursor:
+        cursor.execute(f"{prefix} {sql}", params)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+
+def flush():
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return 0
+
+    from .models import SlowQuery
+
+    _local.busy = True
+    try:
+        now = timezone.now()
+        plans = dict(SlowQuery.objects.filter(fingerprint__in={fp for fp, site in pending})
+                     .exclude(plan='').values_list('fingerprint', 'plan'))
+        for (fp, site), entry in pending.items():
+            updated = SlowQuery.objects.filter(fingerprint=fp, call_site=site).update(
+                count=F('count') + entry['count'],
+                total_ms=F('total_ms') + entry['total_ms'],
+                max_ms=Greatest('max_ms', Value(entry['max_ms'])),
+                last_seen=now,
+            )
+            if updated:
+                continue
+            if fp not in plans:
+                try:
+                    plans[fp] = explain(entry['alias'], *entry['raw'])
+                except DatabaseError:
+                    plans[fp] = ''
+            SlowQuery.objects.get_or_create(fingerprint=fp, call_site=site, defaults={
+                'alias': entry['alias'], 'sql': entry['sql'], 'plan': plans[fp], 'count': entry['count'],
+                'total_ms': entry['total_ms'], 'max_ms': entry['max_ms'], 'last_seen': now,
+            })
+    except DatabaseError:
+        # Never let bookkeeping break a request, e.g. before the table is migrated.
+        logger.exception("Could not record slow queries")
+    finally:
+        _local.busy = False
+    return len(pending)
+
+
+def install(connection, **kwargs):
+    if recorder not in connection.execute_wrappers:
+        connection.execute_wrappers.append(recorder)
+
+
+def flush_pending(**kwargs):
+    if _pending:
+        flush()
+
+
+connection_created.connect(install, dispatch_uid='bits.slowqueries.install')
+request_finished.connect(flush_pending, dispatch_uid='bits.slowqueries.flush_pending')
+atexit.register(flush)
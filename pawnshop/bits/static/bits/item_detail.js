@@ -5,6 +5,16 @@ document.addEventListener('DOMContentLoaded', function() {
     thumbnails.forEach(thumbnail => {
         thumbnail.addEventListener('click', function() {
             const imageUrl = this.getAttribute('data-image-url');
+            // Size and placeholder first, so the box doesn't jump while the new image loads.
+            if (this.dataset.width) {
+                mainImage.width = this.dataset.width;
+                mainImage.height = this.dataset.height;
+                mainImage.style.cssText = this.dataset.placeholderStyle;
+            } else {
+                mainImage.removeAttribute('width');
+                mainImage.removeAttribute('height');
+                mainImage.removeAttribute('style');
+            }
             mainImage.src = imageUrl;
             
             thumbnails.forEach(thumb => thumb.classList.remove('active'));
@@ -20,6 +30,9 @@ document.addEventListener('DOMContentLoaded', function() {
         showContactInfoBtn.addEventListener('click', function() {
             contactModal.style.display = 'flex';
             document.body.style.overflow = 'hidden';
+            if (navigator.sendBeacon) {
+                navigator.sendBeacon(showContactInfoBtn.dataset.contactUrl);
+            }
         });
     }
     
@@ -103,4 +103,124 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         });
     });
-});
\ No newline at end of file
+});
+// Search suggestions
+const SUGGESTION_ICONS = {category: 'fa-tags', hostel: 'fa-building', item: 'fa-search'};
+
+document.querySelectorAll('form[data-suggest-url]').forEach(form => {
+    const input = form.querySelector('input[name="q"]');
+    const list = form.querySelector('.search-suggestions');
+    let timer = null;
+    let controller = null;
+    let active = -1;
+
+    function close() {
+        list.hidden = true;
+        list.innerHTML = '';
+        active = -1;
+    }
+
+    function show(suggestions) {
+        list.innerHTML = '';
+        active = -1;
+        suggestions.forEach(suggestion => {
+            const link = document.createElement('a');
+            link.href = suggestion.url;
+            const icon = document.createElement('i');
+            icon.className = 'fas ' + (SUGGESTION_ICONS[suggestion.kind] || 'fa-search');
+            const label = document.createElement('span');
+            label.textContent = suggestion.label;
+            const count = document.createElement('span');
+            count.className = 'suggestion-count';
+            count.textContent = suggestion.count;
+            link.append(icon, label, count);
+            const row = document.createElement('li');
+            row.appendChild(link);
+            list.appendChild(row);
+        });
+        list.hidden = suggestions.length === 0;
+    }
+
+    function load() {
+        const query = input.value.trim();
+        if (!query) {
+            close();
+            return;
+        }
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        const params = new URLSearchParams({q: query});
+        if (form.dataset.campus) {
+            params.set('campus', form.dataset.campus);
+        }
+        fetch(form.dataset.suggestUrl + '?' + params, {signal: controller.signal})
+            .then(response => response.ok ? response.json() : {suggestions: []})
+            .then(data => {
+                if (input.value.trim() === query) {
+                    show(data.suggestions);
+                }
+            })
+            .catch(() => {});
+    }
+
+    input.addEventListener('input', function() {
+        clearTimeout(timer);
+        timer = setTimeout(load, 120);
+    });
+
+    input.addEventListener('keydown', function(e) {
+        const links = list.querySelectorAll('a');
+        if (list.hidden || !links.length) {
+            return;
+        }
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            if (active >= 0) {
+                links[active].classList.remove('active');
+            }
+            if (e.key === 'ArrowDown') {
+                active = (active + 1) % links.length;
+            } else {
+                active = active <= 0 ? links.length - 1 : active - 1;
+            }
+            links[active].classList.add('active');
+        } else if (e.key === 'Enter' && active >= 0) {
+            e.preventDefault();
+            window.location.href = links[active].href;
+        } else if (e.key === 'Escape') {
+            close();
+        }
+    });
+
+    document.addEventListener('click', function(e) {
+        if (!form.contains(e.target)) {
+            close();
+        }
+    });
+});
+
+// Keep the service worker's offline copy of the feed current
+if ('serviceWorker' in navigator && navigator.serviceWorker.controller) {
+    const searchForm = document.querySelector('form[data-campus]');
+    navigator.serviceWorker.controller.postMessage({
+        type: 'sync-feed',
+        campus: searchForm ? searchForm.dataset.campus : ''
+    });
+}
+
+// Let the browser refresh it now and then while the site is closed, where
+// periodic background sync exists and the site may use it (installed PWAs).
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.ready.then(registration => {
+        if (!('periodicSync' in registration) || !navigator.permissions) {
+            return;
+        }
+        return navigator.permissions.query({ name: 'periodic-background-sync' }).then(status => {
+            if (status.state === 'granted') {
+                return registration.periodicSync.register('sync-feed', { minInterval: 12 * 60 * 60 * 1000 });
+            }
+        });
+    }).catch(() => {});
+}
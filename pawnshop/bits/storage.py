@@ -0,0 +1,102 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+def file_digest(content):
+    sha = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(HASH_CHUNK_SIZE):
+        sha.update(chunk)
+    content.seek(0)
+    return sha.hexdigest()
+
+
+def content_name(name, digest):
+    directory = posixpath.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return posixpath.join(directory, digest[:2], f"{digest}{extension}")
+
+
+def digest_from_name(name):
+    """Return the sha256 digest encoded in a content-addressed name, or None."""
+    stem = os.path.splitext(posixpath.basename(name or ''))[0]
+    if len(stem) == 64 and posixpath.basename(posixpath.dirname(name)) == stem[:2]:
+        return stem
+    return None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file under `<upload_to>/<sha[:2]>/<sha256><ext>` so that
+    identical uploads share one file on disk. Files are only removed once no
+    Image/FeedbackImage row references them any more (see MediaBlob).
+    """
+
+    def _save(self, name, content):
+        name = content_name(name, file_digest(content))
+        if self.exists(name):
+            return name
+        # FileSystemStorage._save asks get_available_name for another name
+        # when the file appears under it, which here is the same name again.
+        # The blob is written aside and linked into place instead, so it is
+        # never seen half written either.
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, partial = tempfile.mkstemp(dir=directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(partial, self.file_permissions_mode)
+            os.link(partial, full_path)
+        except FileExistsError:
+            # Someone stored the same blob between our exists() check and the link.
+            pass
+        finally:
+            os.remove(partial)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def delete(self, name):
+        MediaBlob = apps.get_model('bits', 'MediaBlob')
+        if MediaBlob.objects.filter(name=name, refcount__gt=0).exists():
+            return
+        super().delete(name)
+
+
+content_storage = ContentAddressedStorage()
+
+
+def retain(name):
+    if not name:
+        return
+    MediaBlob = apps.get_model('bits', 'MediaBlob')
+    blob, created = MediaBlob.objects.get_or_create(name=name, defaults={
+        'digest': digest_from_name(name) or '',
+        'size': content_storage.size(name) if content_storage.exists(name) else 0,
+        'refcount': 1,
+    })
+    if not created:
+        MediaBlob.objects.filter(name=name).update(refcount=F('refcount') + 1)
+
+
+def release(name):
+    if not name:
+        return
+    MediaBlob = apps.get_model('bits', 'MediaBlob')
+    MediaBlob.objects.filter(name=name).update(refcount=F('refcount') - 1)
+    if MediaBlob.objects.filter(name=name, refcount__lte=0).delete()[0]:
+        content_storage.delete(name)
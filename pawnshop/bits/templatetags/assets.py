@@ -0,0 +1,36 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+from bits import assets
+
+register = template.Library()
+
+
+def page_bundle(context):
+    return assets.bundle_for_template(context.template.name if context.template else None)
+
+
+def asset_urls(bundle, kind):
+    """The bundle when collectstatic has built it, otherwise the files it is made of."""
+    name = assets.bundle_name(bundle, kind)
+    if settings.STATIC_BUNDLES and name in getattr(staticfiles_storage, 'hashed_files', {}):
+        return [static(name)]
+    return [static(source) for source in assets.bundle_sources(bundle, kind)]
+
+
+@register.simple_tag(takes_context=True)
+def bundle_css(context):
+    return format_html_join('\n    ', '<link rel="stylesheet" href="{}">', ((url,) for url in asset_urls(page_bundle(context), 'css')))
+
+
+@register.simple_tag(takes_context=True)
+def bundle_js(context):
+    return format_html_join('\n    ', '<script src="{}"></script>', ((url,) for url in asset_urls(page_bundle(context), 'js')))
+
+
+@register.simple_tag(takes_context=True)
+def bundle_preload(context):
+    # Scripts sit at the end of <body>, so hint them early to download alongside the CSS.
+    return format_html_join('\n    ', '<link rel="preload" href="{}" as="script">', ((url,) for url in asset_urls(page_bundle(context), 'js')))
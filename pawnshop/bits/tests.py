@@ -1,3 +1,904 @@
-from django.test import TestCase
+import datetime
+import io
+import os
+import re
+import sqlite3
+import tempfile
+from contextlib import closing
+from decimal import Decimal
+from unittest import mock
+from django.contrib import admin as admin_site
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.paginator import EmptyPage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image as PILImage
+from . import (
+    archive, assets, backup, bulk, changefeed, counts, facets, helper, notifications, profiling, ranking,
+    ratelimit, saved_searches, sitemaps, slowqueries, storage, typeahead, uploads, viewcounts,
+)
+from .admin import ApproximateCountPaginator
+from .middleware import PINNED_UNTIL_KEY, ReplicaRoutingMiddleware
+from .models import (
+    Category, CategoryCount, ChangeCounter, Hostel, Image, Item, MediaBlob, Person, Repost, RequestProfile,
+    SavedSearch, SlowQuery,
+)
 
-# Create your tests here.
+
+def make_person(email='f20200001@goa.bits-pilani.ac.in', hostel=None):
+    return Person.objects.create(name=email.split('@')[0], email=email, phone='9000000000', hostel=hostel)
+
+
+def make_item(seller, category, **fields):
+    fields.setdefault('name', 'Desk lamp')
+    fields.setdefault('price', 100)
+    return Item.objects.create(seller=seller, category=category, hostel=seller.hostel, **fields)
+
+
+class FixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.hostel = Hostel.objects.create(name='AH1', campus='GOA')
+        cls.category = Category.objects.create(name='Electronics')
+        cls.seller = make_person(hostel=cls.hostel)
+
+
+@override_settings(RANKING_REPOST_ALLOWANCE=2, RANKING_REPOST_PENALTY=0.5, RANKING_REPOST_WINDOW_HOURS=24)
+class RankingTests(FixtureMixin, TestCase):
+    def test_penalty_starts_past_the_allowance(self):
+        self.assertEqual(list(ranking.repost_penalty([0, 2])), [1, 1])
+        self.assertAlmostEqual(float(ranking.repost_penalty([4])[0]), 1 / (1 + 0.5 * 2))
+
+    def test_saving_the_seller_is_not_a_repost(self):
+        items = [make_item(self.seller, self.category, name=f"Item {n}") for n in range(3)]
+        added = {item.id: item.added_at for item in items}
+        self.seller.phone = '9111111111'
+        self.seller.save()
+        for item in Item.objects.filter(seller=self.seller):
+            self.assertEqual(item.repost_count, 0)
+            self.assertEqual(item.added_at, added[item.id])
+        since = ranking.activity_since(timezone.now())
+        self.assertEqual(ranking.seller_activity(Item, [self.seller.id], since)[self.seller.id], 3)
+
+    def test_reposts_count_inside_the_window_only(self):
+        item = make_item(self.seller, self.category)
+        item.repost()
+        item.repost()
+        since = ranking.activity_since(timezone.now())
+        # One listing, reposted twice: the listing plus one further repost.
+        self.assertEqual(ranking.seller_activity(Item, [self.seller.id], since)[self.seller.id], 2)
+
+        Repost.objects.update(reposted_at=timezone.now() - datetime.timedelta(hours=48))
+        self.assertEqual(ranking.seller_activity(Item, [self.seller.id], since)[self.seller.id], 1)
+        self.assertEqual(Item.objects.get(id=item.id).repost_count, 2)
+
+    def test_flooding_lowers_every_listing_of_the_seller(self):
+        items = [make_item(self.seller, self.category, name=f"Item {n}") for n in range(5)]
+        other = make_person('f20200002@goa.bits-pilani.ac.in', hostel=self.hostel)
+        single = make_item(other, self.category)
+        ranking.rescore()
+        scores = dict(Item.objects.values_list('id', 'score'))
+        self.assertTrue(all(scores[item.id] < scores[single.id] for item in items))
+
+
+class TypeaheadTests(FixtureMixin, TestCase):
+    def tearDown(self):
+        typeahead._indexes.clear()
+        typeahead._items.clear()
+        typeahead._state.update(built=None, synced=None, seq=None, refreshing=False)
+
+    def test_built_index_matches_one_built_by_adds(self):
+        added = typeahead.PrefixIndex()
+        for label in ['Table lamp', 'Lamp shade', 'Study table', 'Table lamp']:
+            added.add('item', label, label, 1)
+        built = typeahead.PrefixIndex({key: list(entry) for key, entry in added.entries.items()})
+        self.assertEqual(built.terms, added.terms)
+        self.assertEqual(built.search('lamp', 5), added.search('lamp', 5))
+
+    def test_rebuild_counts_live_items_per_campus(self):
+        make_item(self.seller, self.category, name='Table lamp')
+        make_item(self.seller, self.category, name='Table lamp')
+        make_item(self.seller, self.category, name='Study table', is_sold=True)
+        self.assertEqual(typeahead.rebuild(), 2)
+        suggestions = typeahead.suggest('tab', 'GOA')
+        self.assertEqual([(s['kind'], s['label'], s['count']) for s in suggestions], [('item', 'Table lamp', 2)])
+        self.assertEqual(typeahead.suggest('tab', 'HYD'), [])
+
+    def test_suggest_never_builds_in_the_request(self):
+        make_item(self.seller, self.category, name='Table lamp')
+        typeahead.rebuild()
+        typeahead.clear()
+        with mock.patch.object(typeahead, 'refresh') as refresh, mock.patch.object(typeahead, 'rebuild') as rebuild:
+            suggestions = typeahead.suggest('lamp')
+        refresh.assert_called_once_with()
+        rebuild.assert_not_called()
+        self.assertEqual([s['label'] for s in suggestions], ['Table lamp'])
+
+    @override_settings(CHANGEFEED_SETTLE_SECONDS=60)
+    def test_sync_picks_up_changes_by_change_seq(self):
+        lamp = make_item(self.seller, self.category, name='Table lamp')
+        typeahead.rebuild()
+        built_seq = typeahead._state['seq']
+        Item.objects.filter(id=lamp.id).update(name='Desk lamp', **Item.touched())
+        typeahead.sync()
+        self.assertEqual([s['label'] for s in typeahead.suggest('lamp')], ['Desk lamp'])
+        # Too young to be settled, the next sync reads it again.
+        self.assertEqual(typeahead._state['seq'], built_seq)
+        with override_settings(CHANGEFEED_SETTLE_SECONDS=0):
+            typeahead.sync()
+        self.assertEqual(typeahead._state['seq'], Item.objects.get(id=lamp.id).change_seq)
+
+
+@override_settings(ARCHIVE_SOLD_AFTER_DAYS=30, ARCHIVE_INACTIVE_AFTER_DAYS=120)
+class ArchiveTests(FixtureMixin, TestCase):
+    def make_aged(self, days, **fields):
+        item = make_item(self.seller, self.category, **fields)
+        Item.objects.filter(id=item.id).update(added_at=timezone.now() - datetime.timedelta(days=days))
+        return item
+
+    def test_archives_old_sold_and_long_inactive_items(self):
+        self.make_aged(1)
+        self.make_aged(5, is_sold=True)
+        old_sold = self.make_aged(40, is_sold=True)
+        self.make_aged(60)
+        inactive = self.make_aged(130)
+        self.assertEqual(archive.archive_stale_items(batch_size=1), 2)
+        archived = Item.objects.filter(is_archived=True)
+        self.assertEqual(sorted(archived.values_list('id', flat=True)), [old_sold.id, inactive.id])
+        self.assertTrue(all(item.archived_at and item.change_seq > inactive.change_seq for item in archived))
+        self.assertEqual(counts.campus_counts('GOA'), {self.category.id: 2})
+        self.assertEqual(archive.archive_stale_items(), 0)
+
+    def test_restore_brings_items_back(self):
+        inactive = self.make_aged(130)
+        archive.archive_stale_items()
+        self.assertEqual(archive.restore_items(Item.objects.all()), 1)
+        inactive.refresh_from_db()
+        self.assertFalse(inactive.is_archived)
+        self.assertIsNone(inactive.archived_at)
+        self.assertEqual(counts.campus_counts('GOA'), {self.category.id: 1})
+
+
+class CategoryCountTests(FixtureMixin, TestCase):
+    def counts(self):
+        return dict(CategoryCount.objects.filter(campus='GOA').values_list('category_id', 'count'))
+
+    def test_create_sell_and_delete(self):
+        item = make_item(self.seller, self.category)
+        make_item(self.seller, self.category)
+        self.assertEqual(self.counts(), {self.category.id: 2})
+        item.is_sold = True
+        item.save()
+        self.assertEqual(self.counts(), {self.category.id: 1})
+        Item.objects.get(id=item.id).delete()
+        self.assertEqual(self.counts(), {self.category.id: 1})
+        Item.objects.exclude(id=item.id).get().delete()
+        self.assertEqual(self.counts(), {self.category.id: 0})
+
+    def test_move_between_categories(self):
+        books = Category.objects.create(name='Books')
+        item = make_item(self.seller, self.category)
+        item.category = books
+        item.save()
+        self.assertEqual(self.counts(), {self.category.id: 0, books.id: 1})
+        self.assertEqual(counts.campus_counts('ALL'), {self.category.id: 0, books.id: 1})
+
+    def test_rebuild_matches_the_signal_counts(self):
+        hyd = Hostel.objects.create(name='VK', campus='HYD')
+        other = make_person('f20200002@hyderabad.bits-pilani.ac.in', hostel=hyd)
+        items = [make_item(seller, self.category) for seller in (self.seller, self.seller, other)]
+        items[0].is_archived = True
+        items[0].save()
+        items[2].delete()
+        before = sorted(CategoryCount.objects.filter(count__gt=0).values_list('campus', 'category_id', 'count'))
+        counts.rebuild()
+        self.assertEqual(sorted(CategoryCount.objects.values_list('campus', 'category_id', 'count')), before)
+
+    def test_delete_category_with_items(self):
+        books = Category.objects.create(name='Books')
+        make_item(self.seller, books)
+        make_item(self.seller, books)
+        make_item(self.seller, self.category)
+        books.delete()
+        self.assertFalse(Item.objects.filter(category_id=books.id).exists())
+        self.assertEqual(self.counts(), {self.category.id: 1})
+
+
+class AssetBundleTests(TestCase):
+    def test_bundle_for_template(self):
+        self.assertEqual(assets.bundle_for_template('bits/item_detail.html'), 'item_detail')
+        self.assertEqual(assets.bundle_for_template('bits/about.html'), 'layout')
+        self.assertEqual(assets.bundle_sources('home', 'js'), ['bits/layout.js'])
+
+    def test_css_imports_move_to_the_top(self):
+        sources = [
+            ('a.css', "/* base */\nbody {\n  color: red;\n}\n"),
+            ('b.css', "@import url(\"https://fonts.example/x.css\");\n.card > a { margin : 0 ; }\n"),
+        ]
+        self.assertEqual(assets.build_bundle(sources, 'css'),
+                         '@import url("https://fonts.example/x.css");\nbody{color: red}.card>a{margin : 0}')
+
+    def test_js_files_stay_separate_statements(self):
+        sources = [('a.js', "// setup\nvar a = 1\n\n"), ('b.js', "  (function () {})()\n")]
+        self.assertEqual(assets.build_bundle(sources, 'js'), "var a = 1\n;(function () {})()\n")
+
+
+@override_settings(UPLOAD_MAX_DIMENSION=400)
+class ProcessImageTests(TestCase):
+    def upload(self, size, image_format='JPEG', orientation=1):
+        exif = PILImage.Exif()
+        exif[uploads.EXIF_ORIENTATION] = orientation
+        data = io.BytesIO()
+        PILImage.new('RGB', size, 'red').save(data, format=image_format, exif=exif.tobytes())
+        return SimpleUploadedFile(f"photo.{image_format.lower()}", data.getvalue())
+
+    def test_large_photo_is_reduced_then_rotated(self):
+        with PILImage.open(uploads.process_image(self.upload((1600, 1200), orientation=6))) as img:
+            self.assertEqual(img.format, 'JPEG')
+            self.assertEqual(img.size, (300, 400))
+            self.assertNotIn(uploads.EXIF_ORIENTATION, img.getexif())
+
+    def test_reduction_stays_within_min_scale(self):
+        for image_format in ('JPEG', 'PNG'):
+            with PILImage.open(uploads.process_image(self.upload((1250, 500), image_format))) as img:
+                self.assertLessEqual(max(img.size), 400)
+                self.assertGreaterEqual(max(img.size), 400 * uploads.MIN_SCALE)
+
+    def test_small_photo_keeps_its_size(self):
+        with PILImage.open(uploads.process_image(self.upload((300, 200)))) as img:
+            self.assertEqual(img.size, (300, 200))
+
+    def test_describe_image_as_the_browser_shows_it(self):
+        info = uploads.describe_image(self.upload((160, 120), 'PNG', orientation=6))
+        self.assertEqual((info['width'], info['height']), (120, 160))
+        self.assertEqual(info['color'], '#ff0000')
+        self.assertTrue(info['placeholder'].startswith('data:image/webp;base64,'))
+        self.assertIsNone(uploads.describe_image(io.BytesIO(b'not an image')))
+
+
+class ContentAddressedStorageTests(FixtureMixin, TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.item = make_item(self.seller, self.category)
+
+    def photo(self, color='red'):
+        data = io.BytesIO()
+        PILImage.new('RGB', (8, 8), color).save(data, format='PNG')
+        return ContentFile(data.getvalue(), name='photo.png')
+
+    def test_same_content_is_stored_once(self):
+        first = Image.objects.create(item=self.item, image=self.photo())
+        second = Image.objects.create(item=self.item, image=self.photo())
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(storage.digest_from_name(first.image.name), storage.file_digest(self.photo()))
+        self.assertEqual(MediaBlob.objects.get(name=first.image.name).refcount, 2)
+
+    def test_saved_image_gets_its_placeholder(self):
+        image = Image.objects.create(item=self.item, image=self.photo('blue'))
+        self.assertEqual((image.width, image.height, image.color), (8, 8, '#0000ff'))
+        self.assertIn(image.placeholder, image.placeholder_style)
+
+    def test_file_goes_with_the_last_reference(self):
+        first = Image.objects.create(item=self.item, image=self.photo())
+        second = Image.objects.create(item=self.item, image=self.photo())
+        name = first.image.name
+        first.delete()
+        self.assertTrue(storage.content_storage.exists(name))
+        second.delete()
+        self.assertFalse(storage.content_storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_replaced_image_releases_the_old_file(self):
+        image = Image.objects.create(item=self.item, image=self.photo('red'))
+        old = image.image.name
+        image.image = self.photo('blue')
+        image.save()
+        self.assertNotEqual(image.image.name, old)
+        self.assertFalse(storage.content_storage.exists(old))
+        self.assertEqual(MediaBlob.objects.get(name=image.image.name).refcount, 1)
+
+    def test_concurrent_store_of_the_same_blob(self):
+        name = storage.content_storage.save('images/photo.png', self.photo())
+        # The other writer linked the blob in after our exists() check.
+        with mock.patch.object(storage.ContentAddressedStorage, 'exists', return_value=False):
+            self.assertEqual(storage.content_storage.save('images/photo.png', self.photo()), name)
+        self.assertEqual(os.listdir(os.path.dirname(storage.content_storage.path(name))), [os.path.basename(name)])
+        with storage.content_storage.open(name) as f:
+            self.assertEqual(f.read(), self.photo().read())
+
+
+class ReplicaRoutingMiddlewareTests(TestCase):
+    def request(self, method):
+        request = getattr(RequestFactory(), method)('/')
+        request.session = SessionStore()
+        ReplicaRoutingMiddleware(lambda request: HttpResponse())(request)
+        return request
+
+    def test_session_is_untouched_without_a_replica(self):
+        with mock.patch('bits.middleware.replica_configured', return_value=False):
+            request = self.request('post')
+        self.assertNotIn(PINNED_UNTIL_KEY, request.session)
+        self.assertFalse(request.session.modified)
+
+    def test_write_pins_the_session_with_a_replica(self):
+        with mock.patch('bits.middleware.replica_configured', return_value=True):
+            self.assertIn(PINNED_UNTIL_KEY, self.request('post').session)
+            self.assertNotIn(PINNED_UNTIL_KEY, self.request('get').session)
+
+
+@override_settings(
+    SITEMAP_PAGE_SIZE=4,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sitemap-tests'}},
+)
+class SitemapTests(FixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.items = [make_item(self.seller, self.category, name=f"Item {n}") for n in range(10)]
+
+    def urls(self, number):
+        content, lastmod = sitemaps.render_section('http://testserver', 'items', number)
+        return re.findall(r'<loc>http://testserver/item/(\d+)/?</loc>', content.decode())
+
+    def keys(self):
+        sitemap = sitemaps.ItemSitemap()
+        return [sitemap.page_key(number) for number in sitemap.paginator.page_range]
+
+    def test_pages_cover_every_live_item_once(self):
+        self.items[3].is_sold = True
+        self.items[3].save()
+        urls = [url for number in range(1, 4) for url in self.urls(number)]
+        self.assertEqual(sorted(map(int, urls)), sorted(item.id for item in self.items if item.id != self.items[3].id))
+        with self.assertRaises(EmptyPage):
+            self.urls(4)
+        index = sitemaps.render_index('http://testserver').decode()
+        self.assertEqual(index.count('<sitemap>'), 3)
+
+    def test_change_only_rekeys_its_page(self):
+        before = self.keys()
+        self.urls(1)
+        self.items[9].name = 'Renamed'
+        self.items[9].save()
+        after = self.keys()
+        self.assertEqual(after[:2], before[:2])
+        self.assertNotEqual(after[2], before[2])
+        with self.assertNumQueries(0):
+            sitemaps.cached(f"items:{after[0]}:http://testserver", lambda: self.fail('page 1 was rebuilt'))
+
+    def test_views(self):
+        response = self.client.get(reverse('sitemap_index'), HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'sitemap-items.xml?p=3', response.content)
+        response = self.client.get(reverse('sitemap_section', args=['items']), {'p': 2}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        for section, page in (('items', 4), ('items', 'x'), ('people', 1)):
+            response = self.client.get(reverse('sitemap_section', args=[section]), {'p': page}, HTTP_HOST='localhost')
+            self.assertEqual(response.status_code, 404)
+
+    def test_layout_is_built_once_per_version(self):
+        self.keys()
+        with mock.patch.object(sitemaps, 'build_layout') as build_layout:
+            self.keys()
+            self.keys()
+        build_layout.assert_not_called()
+
+    def test_full_page_splits_and_sold_pages_merge(self):
+        self.keys()
+        for n in range(3):
+            make_item(self.seller, self.category, name=f"New {n}")
+        layout = sitemaps.layout(4)
+        self.assertEqual([page['count'] for page in layout], [4, 4, 4, 1])
+        Item.objects.filter(id__in=[item.id for item in self.items[:7]]).update(is_sold=True)
+        ChangeCounter.next()
+        self.assertEqual([page['count'] for page in sitemaps.layout(4)], [1, 4, 1])
+
+
+class ItemDetailETagTests(FixtureMixin, TestCase):
+    def setUp(self):
+        self.item = make_item(self.seller, self.category)
+        self.url = reverse('item_detail', args=[self.item.id])
+        # Write the buffered view counts while the test database is still there.
+        self.addCleanup(viewcounts.flush)
+
+    def etag(self):
+        response = self.client.get(self.url, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Cookie', response['Vary'])
+        return response['ETag']
+
+    def test_unchanged_page_is_not_modified(self):
+        etag = self.etag()
+        response = self.client.get(self.url, HTTP_HOST='localhost', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_related_changes_change_the_etag(self):
+        etag = self.etag()
+        self.category.name = 'Gadgets'
+        self.category.save()
+        self.assertNotEqual(self.etag(), etag)
+
+        etag = self.etag()
+        self.seller.phone = '9111111111'
+        self.seller.save()
+        self.assertNotEqual(self.etag(), etag)
+
+    def test_viewer_and_deploy_change_the_etag(self):
+        etag = self.etag()
+        session = self.client.session
+        session['user_data'] = {'id': self.seller.id, 'email': self.seller.email}
+        session.save()
+        signed_in = self.etag()
+        self.assertNotEqual(signed_in, etag)
+        with override_settings(DEPLOY_ID='next'):
+            self.assertNotEqual(self.etag(), signed_in)
+
+
+
+class HomeFeedTests(FixtureMixin, TestCase):
+    def setUp(self):
+        session = self.client.session
+        session['user_data'] = {'id': self.seller.id, 'email': self.seller.email}
+        session.save()
+        for price in (50, 100, 300, 900):
+            make_item(self.seller, self.category, name=f"Item {price}", price=price)
+
+    def prices(self, **params):
+        response = self.client.get(reverse('home'), params, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        return [int(item.price) for item in response.context['items']]
+
+    def test_price_range_and_sort(self):
+        self.assertEqual(self.prices(min_price='60', max_price='400', sort='price_asc'), [100, 300])
+        self.assertEqual(self.prices(min_price='100', sort='price_desc'), [900, 300, 100])
+        self.assertEqual(self.prices(max_price='abc', sort='price_asc'), [50, 100, 300, 900])
+
+    def test_unknown_sort_falls_back_to_relevance(self):
+        response = self.client.get(reverse('home'), {'sort': 'cheapest'}, HTTP_HOST='localhost')
+        self.assertEqual(response.context['sort'], 'relevance')
+
+    def test_parse_price(self):
+        self.assertEqual(helper.parse_price('-250.5'), Decimal('250.5'))
+        self.assertIsNone(helper.parse_price('NaN'))
+        self.assertIsNone(helper.parse_price(''))
+
+
+class FacetTests(FixtureMixin, TestCase):
+    def test_counts_fold_into_each_facet(self):
+        books = Category.objects.create(name='Books')
+        make_item(self.seller, self.category, price=150)
+        make_item(self.seller, self.category, price=150, is_sold=True)
+        make_item(self.seller, books, price=700)
+        result = facets.compute_facets(Item.objects.all())
+        self.assertEqual(result['total'], 3)
+        self.assertEqual(result['categories'], [(self.category.id, 'Electronics', 2), (books.id, 'Books', 1)])
+        self.assertEqual(result['hostels'], [('AH1', 3)])
+        self.assertEqual([(key, n) for key, label, n in result['prices']], [('u200', 2), ('500-1000', 1)])
+        self.assertEqual(result['status'], {'available': 2, 'sold': 1})
+        self.assertEqual(list(facets.filter_price_bucket(Item.objects.all(), '500-1000').values_list('price', flat=True)), [700])
+
+    def test_links_toggle_their_filter(self):
+        make_item(self.seller, self.category, price=150)
+        links = facets.facet_links(QueryDict('pb=u200&page=3'), facets.compute_facets(Item.objects.all()))
+        self.assertEqual(links['prices'], [{'label': 'Under ₹200', 'count': 1, 'url': '?', 'active': True}])
+        self.assertEqual(links['categories'][0]['url'], f"?pb=u200&c={self.category.id}")
+
+
+class CurrentPersonTests(FixtureMixin, TestCase):
+    def sign_in(self, person):
+        session = self.client.session
+        session['user_data'] = {'id': person.id, 'email': person.email}
+        session.save()
+
+    def test_views_find_the_person_by_session_id(self):
+        item = make_item(self.seller, self.category)
+        other = make_person('f20200002@goa.bits-pilani.ac.in')
+        self.sign_in(other)
+        self.client.get(reverse('delete_item', args=[item.id]), HTTP_HOST='localhost')
+        self.assertTrue(Item.objects.filter(id=item.id).exists())
+
+        self.sign_in(self.seller)
+        response = self.client.get(reverse('my_listings'), HTTP_HOST='localhost')
+        self.assertEqual(list(response.context['listings']), [item])
+        self.client.get(reverse('delete_item', args=[item.id]), HTTP_HOST='localhost')
+        self.assertFalse(Item.objects.filter(id=item.id).exists())
+
+    def test_deleted_person_is_signed_out(self):
+        self.sign_in(self.seller)
+        self.seller.delete()
+        response = self.client.get(reverse('my_listings'), HTTP_HOST='localhost')
+        self.assertRedirects(response, reverse('sign_in'), fetch_redirect_response=False)
+
+
+@override_settings(LOADTEST_AUTH_TOKEN='secret')
+class LoadtestSignInTests(FixtureMixin, TestCase):
+    def sign_in(self, email):
+        return self.client.post(reverse('loadtest_sign_in'), {'email': email}, HTTP_HOST='localhost',
+                                HTTP_X_LOADTEST_TOKEN='secret')
+
+    def test_only_loadtest_users_can_sign_in(self):
+        self.seller.phone = ''
+        self.seller.save()
+        self.assertEqual(self.sign_in(self.seller.email).status_code, 403)
+        self.assertEqual(Person.objects.get(id=self.seller.id).phone, '')
+        self.assertNotIn('user_data', self.client.session)
+
+    def test_sign_in_starts_a_new_session(self):
+        session = self.client.session
+        session['theme'] = 'dark'
+        session.save()
+        response = self.sign_in('loadtest-1@goa.bits-pilani.ac.in')
+        self.assertEqual(response.status_code, 204)
+        self.assertNotEqual(self.client.session.session_key, session.session_key)
+        self.assertEqual(self.client.session['user_data']['email'], 'loadtest-1@goa.bits-pilani.ac.in')
+
+
+class ViewCountTests(FixtureMixin, TestCase):
+    def setUp(self):
+        self.item = make_item(self.seller, self.category)
+        viewcounts.flush()
+        viewcounts._recent.clear()
+
+    def visit(self, address):
+        request = RequestFactory().get('/', REMOTE_ADDR=address)
+        request.session = SessionStore()
+        return viewcounts.record(request, self.item.id)
+
+    def view_count(self):
+        return Item.objects.values_list('view_count', flat=True).get(id=self.item.id)
+
+    def test_repeat_views_count_once_per_visitor(self):
+        self.assertTrue(self.visit('10.0.0.1'))
+        self.assertFalse(self.visit('10.0.0.1'))
+        self.assertTrue(self.visit('10.0.0.2'))
+        self.assertEqual(self.view_count(), 0)
+        self.assertEqual(viewcounts.flush(), 2)
+        self.assertEqual(self.view_count(), 2)
+        self.assertEqual(viewcounts.flush(), 0)
+
+    def test_failed_flush_keeps_the_counts(self):
+        self.visit('10.0.0.1')
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=DatabaseError), \
+                self.assertLogs('bits.viewcounts') as logs:
+            self.assertEqual(viewcounts.flush(), 0)
+            self.visit('10.0.0.2')
+            self.assertEqual(viewcounts.flush(), 0)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(viewcounts.flush(), 2)
+        self.assertEqual(self.view_count(), 2)
+        self.assertFalse(viewcounts._failing)
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = os.path.join(directory.name, 'ratelimit.sqlite3')
+        overrides = self.settings(RATELIMIT_STORE=self.store, RATELIMITS={'feedback': '2/m'})
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # The store connection is kept per thread, start from a fresh one.
+        self.addCleanup(ratelimit._local.__dict__.clear)
+        ratelimit._local.__dict__.clear()
+
+    def test_allows_up_to_capacity_then_refills(self):
+        now = 1000.0
+        self.assertEqual(ratelimit.hit('feedback', 'ip:1', now), 0)
+        self.assertEqual(ratelimit.hit('feedback', 'ip:1', now), 0)
+        self.assertEqual(ratelimit.hit('feedback', 'ip:1', now), 30)
+        self.assertEqual(ratelimit.hit('feedback', 'ip:2', now), 0)
+        self.assertEqual(ratelimit.hit('feedback', 'ip:1', now + 30), 0)
+        self.assertEqual(ratelimit.stats(), [('feedback', 4, 1)])
+
+    def test_busy_store_lets_requests_through_with_a_warning(self):
+        ratelimit.connection()
+        with closing(sqlite3.connect(self.store, isolation_level=None)) as other:
+            other.execute("BEGIN IMMEDIATE")
+            with self.assertLogs('bits.ratelimit', 'WARNING') as logs:
+                self.assertEqual(ratelimit.hit('feedback', 'ip:1'), 0)
+            other.execute("ROLLBACK")
+        self.assertEqual([(record.levelname, record.exc_info) for record in logs.records], [('WARNING', None)])
+
+    def test_broken_store_is_logged_with_the_traceback(self):
+        with mock.patch.object(ratelimit, 'connection', side_effect=sqlite3.DatabaseError('file is not a database')), \
+                self.assertLogs('bits.ratelimit') as logs:
+            self.assertEqual(ratelimit.hit('feedback', 'ip:1'), 0)
+        self.assertEqual(logs.records[0].levelname, 'ERROR')
+        self.assertIsNotNone(logs.records[0].exc_info)
+
+
+@override_settings(PROFILE_KEEP=2)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+
+    def request(self, user, **params):
+        request = RequestFactory().get('/about', params)
+        request.user = user
+        return request
+
+    def view(self, request):
+        list(Hostel.objects.all())
+        return HttpResponse('ok')
+
+    def test_only_staff_asking_for_it_are_profiled(self):
+        self.assertTrue(profiling.wants_profile(self.request(self.staff, _profile=1)))
+        self.assertFalse(profiling.wants_profile(self.request(self.staff)))
+        visitor = User.objects.create_user('visitor', password='x')
+        self.assertFalse(profiling.wants_profile(self.request(visitor, _profile=1)))
+
+    def test_profile_records_queries_and_keeps_the_newest(self):
+        for n in range(3):
+            response, profile = profiling.profile_request(self.request(self.staff, _profile=1), self.view)
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual((profile.path, profile.status, profile.user), ('/about?_profile=1', 200, 'staff'))
+        self.assertEqual(profile.query_count, 1)
+        self.assertIn('bits_hostel', profile.queries)
+        self.assertEqual(RequestProfile.objects.count(), 2)
+
+    def test_one_profile_at_a_time(self):
+        with profiling._busy:
+            response, profile = profiling.profile_request(self.request(self.staff, _profile=1), self.view)
+        self.assertIsNone(profile)
+        self.assertEqual(RequestProfile.objects.count(), 0)
+
+
+class SlowQueryTests(TestCase):
+    sql = 'SELECT "bits_hostel"."name" FROM "bits_hostel" WHERE "bits_hostel"."name" = %s'
+
+    def setUp(self):
+        slowqueries.flush()
+
+    def slow_lookup(self, name, elapsed_ms):
+        slowqueries.record('default', self.sql, (name,), elapsed_ms)
+
+    def test_normalize_replaces_values(self):
+        self.assertEqual(slowqueries.normalize("SELECT * FROM t WHERE a = 'x''y' AND b IN (1, 2.5, 3) AND c = %s"),
+                         "SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ?")
+        self.assertEqual(slowqueries.normalize('SELECT "col1"  FROM t2\nLIMIT 21'), 'SELECT "col1" FROM t2 LIMIT ?')
+
+    def test_flush_adds_up_one_row_per_shape_and_call_site(self):
+        self.slow_lookup('AH1', 150)
+        self.slow_lookup('AH2', 250)
+        self.assertEqual(slowqueries.flush(), 1)
+        self.slow_lookup('AH3', 100)
+        slowqueries.flush()
+        query = SlowQuery.objects.get()
+        self.assertEqual((query.count, query.total_ms, query.max_ms), (3, 500, 250))
+        self.assertTrue(query.call_site.endswith(' in slow_lookup'))
+        self.assertIn('bits_hostel', query.plan)
+
+
+@override_settings(BACKUP_MAX_RESTARTS=2, BACKUP_MAX_SECONDS=60)
+class BackupDatabaseTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.source = os.path.join(directory.name, 'live.sqlite3')
+        self.target = os.path.join(directory.name, 'copy.sqlite3')
+        with closing(sqlite3.connect(self.source)) as connection, connection:
+            connection.execute("CREATE TABLE t (x)")
+            connection.executemany("INSERT INTO t VALUES (?)", [('x' * 1000,)] * 2000)
+        patcher = mock.patch.object(backup, 'database_path', return_value=self.source)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def rows(self, path):
+        with closing(sqlite3.connect(path)) as connection:
+            return connection.execute("SELECT count(*) FROM t").fetchone()[0]
+
+    def test_quiet_database_is_copied_in_steps(self):
+        steps = []
+        self.assertEqual(backup.backup_database(self.target, pages=100, sleep=0, progress=lambda *args: steps.append(args)), 0)
+        self.assertGreater(len(steps), 1)
+        self.assertEqual(self.rows(self.target), 2000)
+
+    def test_busy_database_falls_back_to_one_step(self):
+        writer = sqlite3.connect(self.source)
+        self.addCleanup(writer.close)
+
+        def write(status, remaining, total):
+            with writer:
+                writer.execute("INSERT INTO t VALUES ('y')")
+
+        self.assertEqual(backup.backup_database(self.target, pages=100, sleep=0, progress=write), 3)
+        self.assertEqual(self.rows(self.target), self.rows(self.source))
+        self.assertEqual(backup.check_database(self.target), 'ok')
+
+    def test_slow_backup_falls_back_to_one_step(self):
+        with override_settings(BACKUP_MAX_SECONDS=0):
+            backup.backup_database(self.target, pages=100, sleep=0)
+        self.assertEqual(self.rows(self.target), 2000)
+
+
+@override_settings(CHANGEFEED_SETTLE_SECONDS=0)
+class ChangefeedTests(FixtureMixin, TestCase):
+    def ids(self, feed):
+        return [item['id'] for item in feed['items']]
+
+    def test_token_moves_past_every_change_once(self):
+        first = make_item(self.seller, self.category, name='First')
+        second = make_item(self.seller, self.category, name='Second')
+        feed = changefeed.changes_since('', 'ALL')
+        self.assertEqual(self.ids(feed), [first.id, second.id])
+        self.assertEqual(changefeed.changes_since(feed['token'], 'ALL')['items'], [])
+
+        first.price = 50
+        first.save()
+        later = changefeed.changes_since(feed['token'], 'ALL')
+        self.assertEqual(self.ids(later), [first.id])
+        self.assertGreater(changefeed.parse_token(later['token']), changefeed.parse_token(feed['token']))
+
+    def test_pages_split_a_bulk_change_without_gaps(self):
+        items = [make_item(self.seller, self.category, name=f"Item {n}") for n in range(5)]
+        Item.objects.filter(id__in=[item.id for item in items]).update(**Item.touched())
+        token, seen = '', []
+        while True:
+            feed = changefeed.changes_since(token, 'ALL', limit=2)
+            seen += self.ids(feed)
+            token = feed['token']
+            if not feed['more']:
+                break
+        self.assertEqual(seen, [item.id for item in items])
+
+    def test_deletes_and_archives_come_back_as_deleted(self):
+        kept = make_item(self.seller, self.category, name='Kept')
+        archived = make_item(self.seller, self.category, name='Archived')
+        deleted = make_item(self.seller, self.category, name='Deleted')
+        token = changefeed.changes_since('', 'ALL')['token']
+        archived.is_archived = True
+        archived.save()
+        deleted_id = deleted.id
+        deleted.delete()
+        feed = changefeed.changes_since(token, 'GOA')
+        self.assertEqual(feed['deleted'], [archived.id, deleted_id])
+        self.assertEqual(changefeed.changes_since(token, 'HYD')['deleted'], [])
+        # A fresh copy only gets the live listings.
+        fresh = changefeed.changes_since('', 'ALL')
+        self.assertEqual((self.ids(fresh), fresh['deleted']), ([kept.id], []))
+
+    def test_pruned_tombstones_reset_old_tokens(self):
+        item = make_item(self.seller, self.category)
+        token = changefeed.changes_since('', 'ALL')['token']
+        item.delete()
+        later = timezone.now() + datetime.timedelta(days=31)
+        self.assertEqual(changefeed.prune_tombstones(days=30, now=later), 1)
+        feed = changefeed.changes_since(token, 'ALL')
+        self.assertTrue(feed['reset'])
+        self.assertEqual(feed['deleted'], [])
+
+    def test_malformed_token(self):
+        with self.assertRaises(ValueError):
+            changefeed.parse_token('abc')
+
+    def test_view(self):
+        make_item(self.seller, self.category)
+        self.assertEqual(self.client.get(reverse('changes'), HTTP_HOST='localhost').status_code, 403)
+        session = self.client.session
+        session['user_data'] = {'id': self.seller.id, 'email': self.seller.email}
+        session.save()
+        response = self.client.get(reverse('changes'), HTTP_HOST='localhost')
+        self.assertEqual((response.status_code, len(response.json()['items'])), (200, 1))
+        response = self.client.get(reverse('changes'), {'token': 'x.y'}, HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkImportTests(FixtureMixin, TestCase):
+    def import_file(self, data, fmt='csv', **kwargs):
+        return bulk.import_items(bulk.read_rows(io.BytesIO(data), fmt), self.seller, **kwargs)
+
+    def listings(self):
+        return sorted(Item.objects.values_list('name', 'description', 'price', 'category_id', 'hostel_id'))
+
+    def test_export_imports_back(self):
+        make_item(self.seller, self.category, name='Desk lamp', description='Warm light')
+        make_item(self.seller, self.category, name='Kettle, 1L', description='Says "hot"', price=450)
+        before = self.listings()
+        for fmt in ('csv', 'jsonl'):
+            exported = ''.join(bulk.export_lines(Item.objects.all(), fmt)).encode()
+            Item.objects.all().delete()
+            self.assertEqual(self.import_file(exported, fmt), (2, []))
+            self.assertEqual(self.listings(), before)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        data = (
+            "name,description,price,category,hostel,phone,images\n"
+            "Desk lamp,Warm light,100,electronics,,,\n"
+            "Kettle,Boils,lots,Electronics,,,\n"
+            "Fan,Loud,300,Electronics,,,fan.jpg\n"
+        ).encode()
+        created, errors = self.import_file(data)
+        self.assertEqual(created, 1)
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith('Row 3: price:'))
+        self.assertEqual(errors[1], 'Row 4: names images but no image archive was uploaded.')
+        self.assertEqual([name for name, *rest in self.listings()], ['Desk lamp'])
+
+    def test_unreadable_file_keeps_the_batches_before_it(self):
+        rows = ''.join(f"Item {n},{'x' * 200},100,Electronics,,,\n" for n in range(100))
+        data = ("name,description,price,category,hostel,phone,images\n" + rows).encode() + b'\xff\xfe,oops\n'
+        created, errors = self.import_file(data, batch_size=10)
+        self.assertGreater(created, 0)
+        self.assertEqual(Item.objects.count(), created)
+        self.assertRegex(errors[-1], r'^The file could not be read after row \d+')
+
+
+@override_settings(SAVED_SEARCH_NOTIFIER='bits.notifications.LocalNotifier')
+class SavedSearchTests(FixtureMixin, TestCase):
+    def setUp(self):
+        notifications.outbox.clear()
+        self.buyer = make_person('f20200002@goa.bits-pilani.ac.in', hostel=self.hostel)
+
+    def test_new_matches_are_recorded_and_sent_once(self):
+        SavedSearch.objects.create(person=self.buyer, query='lamp', campus='GOA')
+        lamp = make_item(self.seller, self.category, name='Table lamp')
+        make_item(self.seller, self.category, name='Chair')
+        make_item(self.buyer, self.category, name='Own lamp')
+        self.assertEqual(saved_searches.match_new_items(), 1)
+        self.assertEqual(notifications.outbox, [{'email': self.buyer.email, 'items': [lamp.id]}])
+        self.assertEqual(saved_searches.match_new_items(), 0)
+        self.assertEqual(len(notifications.outbox), 1)
+
+    def test_log_notifier_only_logs(self):
+        with self.settings(SAVED_SEARCH_NOTIFIER='bits.notifications.LogNotifier'):
+            SavedSearch.objects.create(person=self.buyer, query='lamp')
+            make_item(self.seller, self.category, name='Table lamp')
+            with self.assertLogs('bits.notifications', 'INFO'):
+                saved_searches.match_new_items()
+        self.assertEqual(notifications.outbox, [])
+
+    def test_rerun_skips_matches_already_recorded(self):
+        search = SavedSearch.objects.create(person=self.buyer, query='lamp')
+        lamp = make_item(self.seller, self.category, name='Table lamp')
+        self.assertEqual(saved_searches.match_new_items(), 1)
+        # As if the run had stopped before moving the watermark.
+        SavedSearch.objects.filter(id=search.id).update(last_item_id=0)
+        desk_lamp = make_item(self.seller, self.category, name='Desk lamp')
+        self.assertEqual(saved_searches.match_new_items(), 1)
+        self.assertEqual([sent['items'] for sent in notifications.outbox], [[lamp.id], [desk_lamp.id]])
+
+
+@override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+class ApproximateCountPaginatorTests(FixtureMixin, TestCase):
+    def setUp(self):
+        self.items = [make_item(self.seller, self.category, name=f"Item {n}") for n in range(6)]
+
+    def test_unfiltered_count_is_estimated(self):
+        Item.objects.filter(id=self.items[2].id).delete()
+        paginator = ApproximateCountPaginator(Item.objects.order_by('id'), 2)
+        self.assertEqual(paginator.count, self.items[-1].id)
+
+    def test_filtered_count_is_exact(self):
+        paginator = ApproximateCountPaginator(Item.objects.filter(name__startswith='Item').order_by('id'), 2)
+        self.assertEqual(paginator.count, 6)
+        self.assertEqual(paginator.num_pages, 3)
+        self.assertEqual(len(paginator.page(3).object_list), 2)
+
+
+class AdminSearchTests(FixtureMixin, TestCase):
+    def search(self, model, term):
+        model_admin = admin_site.site._registry[model]
+        request = RequestFactory().get('/')
+        queryset, may_have_duplicates = model_admin.get_search_results(request, model.objects.all(), term)
+        self.assertFalse(may_have_duplicates)
+        if not queryset.query.is_empty():
+            self.assertNotIn(' LIKE ', str(queryset.query))
+        return list(queryset)
+
+    def test_exact_id_and_email(self):
+        item = make_item(self.seller, self.category)
+        self.assertEqual(self.search(Person, self.seller.email.upper()), [self.seller])
+        self.assertEqual(self.search(Person, str(self.seller.id)), [self.seller])
+        self.assertEqual(self.search(Person, self.seller.name), [])
+        self.assertEqual(self.search(Item, self.seller.email), [item])
+        self.assertEqual(self.search(Item, str(item.id)), [item])
@@ -0,0 +1,248 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlencode
+from django.conf import settings
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+from . import lookups
+from .models import ChangeCounter, Item
+
+ALL = 'ALL'
+WORD = re.compile(r'\w+')
+# Suggestions that are filters beat an item name that reads the same.
+KIND_ORDER = {'category': 0, 'hostel': 1, 'item': 2}
+# Bounds the work for one or two letter prefixes that match most of the index.
+SCAN_LIMIT = 1000
+
+
+def normalize(text):
+    return ' '.join(WORD.findall((text or '').casefold()))
+
+
+def terms(key):
+    """key from each of its words on, so a prefix of any word finds the suggestion."""
+    return [key[match.start():] for match in WORD.finditer(key)]
+
+
+class PrefixIndex:
+    """
+    The suggestions of one campus. terms is kept sorted, so everything that
+    starts with a prefix is one bisect and a short scan away. A build sorts
+    the terms of all its entries once, a later change is an insort.
+    """
+
+    def __init__(self, entries=None):
+        self.entries = entries or {}
+        self.terms = sorted((term, kind, key) for kind, key in self.entries for term in terms(key))
+
+    def add(self, kind, label, value, delta):
+        key = normalize(label)
+        if not key:
+            return
+        entry = self.entries.get((kind, key))
+        if entry is None:
+            if delta <= 0:
+                return
+            entry = self.entries[(kind, key)] = [label, value, 0]
+            for term in terms(key):
+                bisect.insort(self.terms, (term, kind, key))
+        entry[2] += delta
+        if entry[2] <= 0:
+            del self.entries[(kind, key)]
+            for term in terms(key):
+                del self.terms[bisect.bisect_left(self.terms, (term, kind, key))]
+
+    def search(self, prefix, limit):
+        """[(kind, label, value, weight)] of the best matches, one per normalized label."""
+        matches = {}
+        start = bisect.bisect_left(self.terms, (prefix,))
+        for term, kind, key in self.terms[start:start + SCAN_LIMIT]:
+            if not term.startswith(prefix):
+                break
+            # Matching from the first word counts double.
+            if (kind, key) not in matches or term == key:
+                matches[(kind, key)] = term == key
+        best = {}
+        for (kind, key), at_start in matches.items():
+            label, value, weight = self.entries[(kind, key)]
+            rank = (weight * (2 if at_start else 1), -KIND_ORDER[kind])
+            if key not in best or rank > best[key][0]:
+                best[key] = (rank, kind, label, value, weight)
+        top = heapq.nlargest(limit, best.values(), key=lambda match: (match[0], -len(match[2])))
+        return [(kind, label, value, weight) for rank, kind, label, value, weight in top]
+
+
+# Every worker keeps its own index. Saves in the worker update it as they
+# commit, changes made by other workers and bulk updates are picked up by
+# Item.change_seq every TYPEAHEAD_SYNC_SECONDS, and deletes by others with the
+# full rebuild every TYPEAHEAD_REBUILD_SECONDS. Both run in a background
+# thread, a request only ever searches the index it finds.
+_lock = threading.RLock()
+_indexes = {}
+_items = {}
+_state = {'built': None, 'synced': None, 'seq': None, 'refreshing': False}
+
+
+def _contribution(row):
+    item_id, name, category_id, hostel_id, campus, is_sold, is_archived = row
+    if is_sold or is_archived or campus is None:
+        return None
+    return (campus, name, category_id, hostel_id)
+
+
+def _suggestions(contribution, categories):
+    campus, name, category_id, hostel_id = contribution
+    yield 'item', name, name
+    if category_id in categories:
+        yield 'category', categories[category_id], category_id
+    yield 'hostel', hostel_id, hostel_id
+
+
+def _apply(contribution, delta, categories):
+    campus = contribution[0]
+    for index in (_indexes.setdefault(campus, PrefixIndex()), _indexes.setdefault(ALL, PrefixIndex())):
+        for kind, label, value in _suggestions(contribution, categories):
+            index.add(kind, label, value, delta)
+
+
+def _update(rows, categories):
+    for row in rows:
+        item_id = row[0]
+        new = _contribution(row)
+        old = _items.get(item_id)
+        if new == old:
+            continue
+        if old:
+            _apply(old, -1, categories)
+        if new:
+            _apply(new, 1, categories)
+            _items[item_id] = new
+        else:
+            _items.pop(item_id, None)
+
+
+def _rows(queryset):
+    return queryset.values_list('id', 'name', 'category_id', 'hostel_id', 'seller__campus', 'is_sold', 'is_archived')
+
+
+def _categories():
+    return {category.id: category.name for category in lookups.categories()}
+
+
+def rebuild():
+    """Build every index from scratch and swap them in, returns the number of items."""
+    seq = ChangeCounter.objects.filter(pk=1).values_list('value', flat=True).first() or 0
+    rows = _rows(Item.objects.filter(is_sold=False, is_archived=False)).iterator(chunk_size=5000)
+    categories = _categories()
+    items = {}
+    entries = {}
+    for row in rows:
+        contribution = _contribution(row)
+        if contribution is None:
+            continue
+        items[row[0]] = contribution
+        for campus in (contribution[0], ALL):
+            campus_entries = entries.setdefault(campus, {})
+            for kind, label, value in _suggestions(contribution, categories):
+                key = normalize(label)
+                if key:
+                    campus_entries.setdefault((kind, key), [label, value, 0])[2] += 1
+    indexes = {campus: PrefixIndex(campus_entries) for campus, campus_entries in entries.items()}
+    with _lock:
+        _indexes.clear()
+        _indexes.update(indexes)
+        _items.clear()
+        _items.update(items)
+        _state.update(built=time.monotonic(), synced=time.monotonic(), seq=seq)
+    return len(items)
+
+
+def sync():
+    """
+    Apply the items changed since the last sync, in this worker or any other.
+    As in the changefeed, the position only moves past changes older than
+    CHANGEFEED_SETTLE_SECONDS, a younger one is read again next time in case
+    an older change_seq is still to commit.
+    """
+    seq = _state['seq']
+    cutoff = timezone.now() - timedelta(seconds=settings.CHANGEFEED_SETTLE_SECONDS)
+    changed = list(Item.objects.filter(change_seq__gt=seq).order_by('change_seq')
+                   .values_list('change_seq', 'updated_at', 'id'))
+    for change_seq, updated_at, item_id in changed:
+        if updated_at >= cutoff:
+            break
+        seq = change_seq
+    rows = list(_rows(Item.objects.filter(id__in=[item_id for change_seq, updated_at, item_id in changed])))
+    categories = _categories()
+    with _lock:
+        _update(rows, categories)
+        _state.update(synced=time.monotonic(), seq=seq)
+
+
+def _refresh(full):
+    try:
+        if full:
+            rebuild()
+        else:
+            sync()
+    finally:
+        connections.close_all()
+        with _lock:
+            _state['refreshing'] = False
+
+
+def refresh():
+    """Start a rebuild or sync in a background thread when one is due."""
+    now = time.monotonic()
+    with _lock:
+        if _state['refreshing']:
+            return
+        full = _state['built'] is None or now - _state['built'] > settings.TYPEAHEAD_REBUILD_SECONDS
+        if not full and now - _state['synced'] <= settings.TYPEAHEAD_SYNC_SECONDS:
+            return
+        _state['refreshing'] = True
+    threading.Thread(target=_refresh, args=(full,), name='typeahead', daemon=True).start()
+
+
+def item_changed(item_id):
+    with _lock:
+        if _state['seq'] is not None:
+            _update(_rows(Item.objects.filter(id=item_id)), _categories())
+
+
+def item_deleted(item_id):
+    with _lock:
+        old = _items.pop(item_id, None)
+        if old:
+            _apply(old, -1, _categories())
+
+
+def clear(**kwargs):
+    # A renamed category or hostel is only right after a rebuild, the old
+    # index keeps answering until it is done.
+    with _lock:
+        _state['built'] = None
+
+
+def suggest(query, campus=ALL, limit=None):
+    """Up to limit suggestions for what has been typed, each a dict of kind, label, count and url."""
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    refresh()
+    with _lock:
+        index = _indexes.get(campus)
+        matches = index.search(prefix, limit or settings.TYPEAHEAD_LIMIT) if index else []
+
+    home = reverse('home')
+    suggestions = []
+    for kind, label, value, weight in matches:
+        params = {'c': value} if kind == 'category' else {'hostel': value} if kind == 'hostel' else {'q': label}
+        params['campus'] = campus
+        suggestions.append({'kind': kind, 'label': label, 'count': weight, 'url': f"{home}?{urlencode(params)}"})
+    return suggestions
@@ -0,0 +1,186 @@
+import base64
+import io
+import os
+import tempfile
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.uploadhandler import TemporaryFileUploadHandler, SkipFile, StopUpload
+from django.template.defaultfilters import filesizeformat
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF', 'MPO'}
+PLACEHOLDER_SIZE = 16
+EXIF_ORIENTATION = 0x0112
+# The smallest fraction of UPLOAD_MAX_DIMENSION decoding and reducing may leave.
+MIN_SCALE = 0.75
+# Image.reduce has no support for these, they go straight to thumbnail.
+UNREDUCIBLE_MODES = {'1', 'P', 'I;16'}
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams every uploaded file straight to a temporary file on disk and
+    enforces the per-file, per-request and file-count limits while the body
+    is still being read, so an oversized upload never reaches the view.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.file_count = 0
+        self.request_size = 0
+        self.file_size = 0
+        self.too_large = False
+        if request is not None:
+            request.upload_errors = []
+
+    def error(self, message):
+        if self.request is not None:
+            self.request.upload_errors.append(message)
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file_count += 1
+        self.file_size = 0
+        if self.file_count > settings.UPLOAD_MAX_FILES:
+            self.error(f"'{self.file_name}' was skipped, at most {settings.UPLOAD_MAX_FILES} images can be uploaded at once.")
+            raise SkipFile()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file_size += len(raw_data)
+        self.request_size += len(raw_data)
+        if self.request_size > settings.UPLOAD_MAX_REQUEST_SIZE:
+            if not self.too_large:
+                self.too_large = True
+                self.error(f"Upload is too large, the limit is {filesizeformat(settings.UPLOAD_MAX_REQUEST_SIZE)} per request.")
+            raise StopUpload()
+        if self.file_size > settings.UPLOAD_MAX_FILE_SIZE:
+            self.error(f"'{self.file_name}' is larger than {filesizeformat(settings.UPLOAD_MAX_FILE_SIZE)}.")
+            raise SkipFile()
+        self.file.write(raw_data)
+
+
+def upload_errors(request):
+    return list(getattr(request, 'upload_errors', []))
+
+
+def inspect_image(uploaded_file):
+    """Return (format, width, height) read from the image header only."""
+    uploaded_file.seek(0)
+    try:
+        with PILImage.open(uploaded_file) as img:
+            return img.format, img.width, img.height
+    except (UnidentifiedImageError, PILImage.DecompressionBombError, OSError):
+        raise ValidationError(f"'{uploaded_file.name}' is not a valid image.")
+
+
+def process_image(uploaded_file):
+    """
+    Validate an uploaded image and re-encode it without EXIF metadata.
+
+    The pixel budget is checked from the header before anything is decoded.
+    JPEGs are then decoded at 1/2, 1/4 or 1/8 scale through the draft mode
+    and other formats are cut down with an integer reduce. Both may go down
+    to MIN_SCALE of UPLOAD_MAX_DIMENSION, so anything 1.5 times that size or
+    more is reduced. Rotation and the final resize only touch the reduced
+    copy. A JPEG never needs a full size decode; other formats need one plus
+    the reduced copy and are bounded by UPLOAD_MAX_PIXELS.
+    """
+    image_format, width, height = inspect_image(uploaded_file)
+    if image_format not in ALLOWED_FORMATS:
+        raise ValidationError(f"'{uploaded_file.name}' is not a supported image type.")
+    if width * height > settings.UPLOAD_MAX_PIXELS:
+        raise ValidationError(f"'{uploaded_file.name}' is too large ({width}x{height} pixels).")
+
+    max_dimension = settings.UPLOAD_MAX_DIMENSION
+    scale = min(1, max_dimension / max(width, height))
+    target = (max(1, round(width * scale)), max(1, round(height * scale)))
+    uploaded_file.seek(0)
+    try:
+        img = PILImage.open(uploaded_file)
+        img.draft('RGB', (max(1, int(target[0] * MIN_SCALE)), max(1, int(target[1] * MIN_SCALE))))
+        factor = int(max(img.size) / (max_dimension * MIN_SCALE))
+        if factor > 1 and img.mode not in UNREDUCIBLE_MODES:
+            # Rebinding img drops the full size decode before any other copy.
+            img = img.reduce(factor)
+        img.thumbnail(target)
+        img = ImageOps.exif_transpose(img)
+
+        has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        mode = 'RGBA' if has_alpha else 'RGB'
+        if img.mode != mode:
+            img = img.convert(mode)
+
+        output = tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR)
+        if has_alpha:
+            img.save(output, format='PNG')
+            extension = 'png'
+        else:
+            img.save(output, format='JPEG', quality=settings.UPLOAD_JPEG_QUALITY)
+            extension = 'jpg'
+    except (UnidentifiedImageError, PILImage.DecompressionBombError, OSError):
+        raise ValidationError(f"'{uploaded_file.name}' could not be processed.")
+
+    output.seek(0)
+    name = os.path.splitext(os.path.basename(uploaded_file.name))[0] or 'image'
+    return File(output, name=f"{name}.{extension}")
+
+
+def describe_image(fileobj):
+    """
+    Return {width, height, placeholder, color} for an image as browsers will
+    show it (EXIF rotation applied): its size, a PLACEHOLDER_SIZE px WebP as
+    a data URI and its dominant colour. None when it can't be read.
+    """
+    fileobj.seek(0)
+    try:
+        with PILImage.open(fileobj) as img:
+            width, height = img.size
+            if img.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+                width, height = height, width
+            # JPEGs decode straight at 1/8 scale or less, so this stays cheap for big photos.
+            img.draft('RGB', (PLACEHOLDER_SIZE * 2, PLACEHOLDER_SIZE * 2))
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGBA')
+                background = PILImage.new('RGB', img.size, 'white')
+                background.paste(img, mask=img.getchannel('A'))
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+
+            quantized = img.quantize(colors=4)
+            count, index = max(quantized.getcolors())
+            color = '#{:02x}{:02x}{:02x}'.format(*quantized.getpalette()[index * 3:index * 3 + 3])
+
+            output = io.BytesIO()
+            img.save(output, format='WEBP', quality=40)
+    except (UnidentifiedImageError, PILImage.DecompressionBombError, OSError, ValueError):
+        return None
+    finally:
+        fileobj.seek(0)
+    return {
+        'width': width,
+        'height': height,
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(output.getvalue()).decode('ascii'),
+        'color': color,
+    }
+
+
+def process_uploads(request, field):
+    """
+    Run process_image over every file posted under `field`.
+
+    Returns (files, errors); `errors` also carries anything the upload
+    handler rejected while the request body was streamed in.
+    """
+    uploaded_files = request.FILES.getlist(field)
+    errors = upload_errors(request)
+    processed = []
+    for uploaded_file in uploaded_files:
+        try:
+            processed.append(process_image(uploaded_file))
+        except ValidationError as e:
+            errors.extend(e.messages)
+    return processed, errors
@@ -8,6 +8,7 @@ urlpatterns = [
     path("sign-out", views.sign_out, name='sign_out'),
     path("add-product", views.add_product, name='add_product'),
     path("item/<int:id>", views.item_detail, name='item_detail'),
+    path("item/<int:id>/contact", views.contact_seller, name='contact_seller'),
     path('my-listings/', views.my_listings, name='my_listings'),
     path("delete-item/<int:id>/", views.delete_item, name='delete_item'),
     path("edit-item/<int:id>", views.edit_item, name="edit_item"),
@@ -15,7 +16,19 @@ urlpatterns = [
     path("marksold/<int:id>", views.marksold, name = "marksold"),
     path("about-us", views.about_us, name='about_us'),
     path("categories", views.categories, name='categories'),
+    path("search/suggest", views.search_suggest, name='search_suggest'),
+    path("changes", views.changes, name='changes'),
     path("repost/<int:id>", views.repost, name="repost"),
     path("bulk-action/<str:action>/", views.bulk_action, name="bulk_action"),
+    path("saved-searches", views.saved_search_list, name="saved_searches"),
+    path("saved-searches/save", views.save_search, name="save_search"),
+    path("saved-searches/delete/<int:id>", views.delete_saved_search, name="delete_saved_search"),
+    path("import-items", views.import_items, name="import_items"),
+    path("export-items", views.export_items, name="export_items"),
+    path("sitemap.xml", views.sitemap_index, name="sitemap_index"),
+    path("sitemap-<str:section>.xml", views.sitemap_section, name="sitemap_section"),
+    path("healthz", views.healthz, name="healthz"),
+    path("readyz", views.readyz, name="readyz"),
+    path("loadtest/sign-in", views.loadtest_sign_in, name="loadtest_sign_in"),
 #    path("bypass", views.bypass, name='bypass'),
 ]
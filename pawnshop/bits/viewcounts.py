@@ -0,0 +1,111 @@
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# Per-worker buffers. A crash loses at most one flush interval of views,
+# which is fine for a "how many people looked at this" number.
+_lock = threading.Lock()
+_pending = defaultdict(int)
+_recent = OrderedDict()
+_last_flush = time.monotonic()
+_failing = False
+
+
+def visitor_key(request):
+    user_data = request.session.get('user_data')
+    if user_data and user_data.get('id'):
+        return f"person:{user_data['id']}"
+    if request.session.session_key:
+        return f"session:{request.session.session_key}"
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}:{request.META.get('HTTP_USER_AGENT', '')[:100]}"
+
+
+def record(request, item_id, field='view_count'):
+    """
+    Add one to the counter `field` of item_id, view_count or contact_count,
+    unless this visitor was already counted for it within VIEW_DEDUPE_SECONDS.
+    """
+    key = (visitor_key(request), field, item_id)
+    now = time.monotonic()
+    with _lock:
+        seen_at = _recent.get(key)
+        if seen_at is not None and now - seen_at < settings.VIEW_DEDUPE_SECONDS:
+            return False
+        _recent[key] = now
+        _recent.move_to_end(key)
+        while len(_recent) > settings.VIEW_DEDUPE_MAX:
+            _recent.popitem(last=False)
+        _pending[field, item_id] += 1
+    return True
+
+
+def flush_due():
+    return _pending and (len(_pending) >= settings.VIEW_COUNT_FLUSH_SIZE
+                         or time.monotonic() - _last_flush >= settings.VIEW_COUNT_FLUSH_SECONDS)
+
+
+def flush():
+    """
+    Write the buffered counts with one UPDATE per distinct increment. When the
+    database refuses them they go back into the buffer for the next flush.
+    """
+    global _last_flush, _failing
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not pending:
+        return 0
+
+    from .models import Item
+
+    by_increment = defaultdict(list)
+    for (field, item_id), n in pending.items():
+        by_increment[field, n].append(item_id)
+    try:
+        with transaction.atomic():
+            for (field, n), item_ids in by_increment.items():
+                Item.objects.filter(id__in=item_ids).update(**{field: F(field) + n})
+    except DatabaseError:
+        # Never let bookkeeping break a request. One log line per outage.
+        if not _failing:
+            logger.exception("Could not flush view counts, keeping them for the next flush")
+        _failing = True
+        with _lock:
+            for key, n in pending.items():
+                if key in _pending or len(_pending) < settings.VIEW_COUNT_PENDING_MAX:
+                    _pending[key] += n
+        return 0
+    _failing = False
+    return sum(pending.values())
+
+
+def flush_if_due(**kwargs):
+    if flush_due():
+        flush()
+
+
+# request_finished runs after the response has gone out and outside the
+# replica routing context, so flushing never pins a visitor to the primary.
+request_finished.connect(flush_if_due, dispatch_uid='bits.viewcounts.flush_if_due')
+atexit.register(flush)
+
+
+def count_view(view):
+    """Record a view for successful and not-modified responses of an item view taking `id`."""
+    @wraps(view)
+    def wrapped(request, id, *args, **kwargs):
+        response = view(request, id, *args, **kwargs)
+        if request.method == 'GET' and response.status_code in (200, 304):
+            record(request, id)
+        return response
+    return wrapped
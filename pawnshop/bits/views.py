@@ -1,11 +1,22 @@
 import os
+import copy
+import logging
+import hashlib
+import hmac
 import json
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+import sys
+import zipfile
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
 from django.shortcuts import render, redirect, get_object_or_404
-from django.utils import timezone
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control, never_cache
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+from django.contrib.sitemaps.views import x_robots_tag
+from django.utils.http import http_date
 from google.oauth2 import id_token
 from google.auth.transport import requests
 from django.contrib import messages
@@ -13,25 +24,53 @@ from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from .models import *
 from .forms import *
 from . import helper
+from . import uploads
+from . import counts
+from . import facets
+from . import saved_searches
+from . import bulk
+from . import lookups
+from . import warmup
+from .ratelimit import ratelimit
+from . import viewcounts
+from . import typeahead
+from . import changefeed
+from . import sitemaps
+from . import assets
+from .viewcounts import count_view
+from .management.commands.loadtest import EMAIL_PREFIX as LOADTEST_EMAIL_PREFIX
+from django.conf import settings
+from django.db import OperationalError, connection
 from django.db.models import Q
 
+logger = logging.getLogger(__name__)
+
 banned_list = []
 
+def current_person(request):
+    """The signed-in Person, or None. One primary key lookup."""
+    user_data = request.session.get('user_data')
+    if not user_data:
+        return None
+    return Person.objects.filter(id=user_data.get('id')).first()
+
 @csrf_exempt
 def sign_in(request):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
+    if current_person(request):
         return HttpResponseRedirect(reverse('home'))
     else:
         return render(request, 'bits/sign-in.html')
 
 @csrf_exempt
+@ratelimit('sign_in')
 def auth_receiver(request):
     token = request.POST['credential']
     user_data = id_token.verify_oauth2_token(token, requests.Request(), os.environ['GOOGLE_OAUTH_CLIENT_ID'], clock_skew_in_seconds = 10)
-    request.session['user_data'] = user_data
-    if not Person.objects.filter(email=user_data['email']).exists():
+    person = Person.objects.filter(email=user_data['email']).first()
+    if not person:
         person = Person(email=user_data['email'], name=user_data['name'])
         person.save()
+    request.session['user_data'] = {'id': person.id, 'email': person.email}
     if user_data['email'] in banned_list:
         messages.error(request, "YOU'RE BANNED, CONTACT ADMIN TO RESOLVE!!")
         return render(request, 'bits/sign-in.html')
@@ -41,13 +80,23 @@ def sign_out(request):
     del request.session['user_data']
     return HttpResponseRedirect(reverse('sign_in'))
 
+@ratelimit('add_product')
 def add_product(request):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
-        person = Person.objects.get(email=request.session.get('user_data')['email'])
+    person = current_person(request)
+    if person:
 
         if request.method == 'POST':
             form = ItemForm(request.POST, request.FILES, user=person)
 
+            images, upload_errors = uploads.process_uploads(request, 'images')
+            if not images and 'image' in request.FILES:
+                images, upload_errors = uploads.process_uploads(request, 'image')
+
+            if upload_errors:
+                for error in upload_errors:
+                    messages.error(request, error)
+                return render(request, 'bits/add_product.html', {'form': form})
+
             if form.is_valid():
                 item = form.save(commit=False)
                 item.seller = person
@@ -69,7 +118,6 @@ def add_product(request):
 
                 item.save()
 
-                images = request.FILES.getlist('images')
                 image_order = []
                 if 'image_order' in request.POST and request.POST['image_order']:
                     try:
@@ -90,11 +138,6 @@ def add_product(request):
                             image_instance.save()
                         except IndexError:
                             print(f"IndexError: Invalid index in image_order for uploaded images.")
-                
-                elif 'image' in request.FILES:
-                    image_file = request.FILES['image']
-                    image_instance = Image(item=item, image=image_file, display_order=0)
-                    image_instance.save()
                 messages.success(request, "Product added successfully!")
                 return redirect('my_listings')
             else:
@@ -110,17 +153,40 @@ def add_product(request):
         return HttpResponseRedirect(reverse('sign_in'))
     
 def home(request):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
-        current_user = Person.objects.get(email=request.session.get('user_data')['email'])
+    current_user = current_person(request)
+    if current_user:
         
         category = request.GET.get('c')
         query = request.GET.get('q')
         selected_campus = request.GET.get('campus')
+        min_price = helper.parse_price(request.GET.get('min_price'))
+        max_price = helper.parse_price(request.GET.get('max_price'))
+        sort = request.GET.get('sort')
+        if sort not in helper.FEED_ORDERINGS:
+            sort = 'relevance'
         
-        items_query = Item.objects.all()
+        items_query = Item.objects.filter(is_archived=False)
         
         if category:
             items_query = items_query.filter(Q(category__id=category))
+
+        if min_price is not None:
+            items_query = items_query.filter(price__gte=min_price)
+
+        if max_price is not None:
+            items_query = items_query.filter(price__lte=max_price)
+
+        hostel = request.GET.get('hostel')
+        if hostel:
+            items_query = items_query.filter(hostel_id=hostel)
+
+        price_bucket = request.GET.get('pb')
+        if price_bucket in facets.PRICE_BUCKET_KEYS:
+            items_query = facets.filter_price_bucket(items_query, price_bucket)
+
+        status = request.GET.get('status')
+        if status in ('available', 'sold'):
+            items_query = items_query.filter(is_sold=(status == 'sold'))
         
         if query:
             items_query = items_query.filter(
@@ -141,10 +207,11 @@ def home(request):
             else:
                 selected_campus = 'ALL'
         
-        items = helper.items_sort(items_query)
+        feed_facets = facets.facet_links(request.GET, facets.feed_facets(items_query))
+        items = items_query.select_related('seller', 'hostel').prefetch_related('images').order_by(*helper.FEED_ORDERINGS[sort])
         
         items_per_page = 16
-        paginator = Paginator(list(items), items_per_page)
+        paginator = Paginator(items, items_per_page)
         page = request.GET.get('page')
         
         try:
@@ -153,6 +220,9 @@ def home(request):
             paginated_items = paginator.page(1)
         except EmptyPage:
             paginated_items = paginator.page(paginator.num_pages)
+
+        query_params = request.GET.copy()
+        query_params.pop('page', None)
             
         return render(request, "bits/home.html", {
             'user': current_user,
@@ -160,16 +230,55 @@ def home(request):
             'is_paginated': True,
             'page_obj': paginated_items,
             'paginator': paginator,
-            'selected_campus': selected_campus
+            'selected_campus': selected_campus,
+            'min_price': min_price,
+            'max_price': max_price,
+            'sort': sort,
+            'facets': feed_facets,
+            'query_string': query_params.urlencode(),
+            'new_matches_count': SavedSearchMatch.objects.filter(person=current_user, is_seen=False).count(),
         })
     else:
         return HttpResponseRedirect(reverse('sign_in'))
 
+def item_detail_state(request, id):
+    """
+    (etag, last modified) of an item page from the versions of the item and of
+    the similar items it lists, or (None, None) when the page can't be reused.
+    Seller and category changes bump the versions of their items; the deploy
+    and the signed-in viewer are part of the ETag too.
+    """
+    if not hasattr(request, '_item_detail_state'):
+        request._item_detail_state = (None, None)
+        item = Item.objects.filter(id=id).values('version', 'updated_at', 'hostel_id').first()
+        if item and not len(messages.get_messages(request)):
+            similar = list(Item.objects.filter(
+                hostel_id=item['hostel_id'],
+                is_archived=False
+            ).exclude(
+                id=id
+            ).order_by('-added_at').values_list('id', 'version', 'updated_at')[:5])
+            versions = ",".join(f"{similar_id}:{version}" for similar_id, version, updated_at in similar)
+            viewer = (request.session.get('user_data') or {}).get('id')
+            salt = f"{settings.DEPLOY_ID}:{assets.static_version()}:{viewer}"
+            etag = hashlib.md5(f"{salt}|{id}:{item['version']}|{versions}".encode()).hexdigest()
+            last_modified = max([item['updated_at']] + [updated_at for similar_id, version, updated_at in similar])
+            request._item_detail_state = (etag, last_modified)
+    return request._item_detail_state
+
+@count_view
+@cache_control(private=True, no_cache=True)
+@vary_on_cookie
+@condition(
+    etag_func=lambda request, id: item_detail_state(request, id)[0],
+    last_modified_func=lambda request, id: item_detail_state(request, id)[1],
+)
 def item_detail(request, id):
     item = get_object_or_404(Item, id=id)
     
     similar_items = Item.objects.filter(
-        hostel=item.hostel
+        hostel=item.hostel,
+        is_archived=False
     ).exclude(
         id=item.id
     ).order_by('-added_at')[:5]
@@ -181,18 +290,61 @@ def item_detail(request, id):
     
     return render(request, 'bits/item_detail.html', context)
 
+@csrf_exempt
+def loadtest_sign_in(request):
+    """
+    Sign in as one of the loadtest command's own users without Google. Only
+    exists while LOADTEST_AUTH_TOKEN is set, and the token must come with the
+    request. Any email without the loadtest prefix is refused, so the token
+    can't be used to take over a real account.
+    """
+    token = request.headers.get('X-Loadtest-Token', '')
+    if not settings.LOADTEST_AUTH_TOKEN or not hmac.compare_digest(token, settings.LOADTEST_AUTH_TOKEN):
+        return custom_page_not_found(request, None)
+    if request.method != 'POST':
+        return HttpResponse(status=405)
+    email = request.POST.get('email', '')
+    if not email.startswith(LOADTEST_EMAIL_PREFIX) or '@' not in email:
+        return HttpResponse(status=403)
+    person = Person.objects.filter(email=email).first()
+    if not person:
+        person = Person(email=email, name=email.split('@')[0])
+        person.save()
+    if not person.hostel or not person.phone:
+        person.hostel = person.hostel or Hostel.objects.filter(campus=person.campus).first() or Hostel.objects.first()
+        person.phone = person.phone or '9000000000'
+        person.save()
+    request.session.cycle_key()
+    request.session['user_data'] = {'id': person.id, 'email': person.email}
+    return HttpResponse(status=204)
+
+@csrf_exempt
+def contact_seller(request, id):
+    """
+    Count a contact click before sending the visitor on to WhatsApp. The
+    "Show Contact Info" button posts here with navigator.sendBeacon instead.
+    """
+    item = get_object_or_404(Item.objects.only('whatsapp'), id=id)
+    viewcounts.record(request, id, 'contact_count')
+    if request.method == 'POST':
+        return HttpResponse(status=204)
+    if not item.whatsapp:
+        return redirect('item_detail', id=id)
+    return HttpResponseRedirect(item.whatsapp)
+
 def my_listings(request):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
-        person = Person.objects.get(email=request.session.get('user_data')['email'])
-        listings = helper.items_sort(Item.objects.filter(seller=person))
+    person = current_person(request)
+    if person:
+        listings = Item.objects.filter(seller=person).order_by(*helper.FEED_ORDERINGS['relevance'])
         return render(request, 'bits/listings.html', {'listings': listings})
     else:
         return HttpResponseRedirect(reverse('sign_in'))
 
 def delete_item(request, id):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
+    person = current_person(request)
+    if person:
         item = get_object_or_404(Item, id=id)
-        if item.seller.email == request.session.get('user_data')['email']:
+        if item.seller_id == person.id:
             images = Image.objects.filter(item=item)
             for image in images:
                 image.image.delete(save=False)
@@ -206,8 +358,8 @@ def edit_item(request, id):
     try:
         item = Item.objects.get(id=id)
         
-        if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
-            person = Person.objects.get(email=request.session.get('user_data')['email'])
+        person = current_person(request)
+        if person:
             
             if item.seller != person:
                 messages.error(request, "You can only edit your own items.")
@@ -225,7 +377,17 @@ def edit_item(request, id):
             
             if request.method == 'POST':
                 form = ItemForm(request.POST, request.FILES, instance=item, user=person)
-                
+                new_images, upload_errors = uploads.process_uploads(request, 'images')
+
+                if upload_errors:
+                    for error in upload_errors:
+                        messages.error(request, error)
+                    return render(request, 'bits/add_product.html', {
+                        'form': form,
+                        'item': item,
+                        'existing_images_json': existing_images_json
+                    })
+
                 if form.is_valid():
                     updated_item = form.save(commit=False)
                     
@@ -241,7 +403,7 @@ def edit_item(request, id):
                         person.save()
                     
                     updated_item.hostel = person.hostel
-                    updated_item.save()
+                    updated_item.save(change_time=False)
                     
                     try:
                         image_order_raw = request.POST.get('image_order', '{}')
@@ -258,7 +420,6 @@ def edit_item(request, id):
                                 img.image.delete(save=False)
                                 img.delete()
                             
-                            new_images = request.FILES.getlist('images')
                             new_image_order = image_order_data.get('new', list(range(len(new_images))))
                             
                             final_order = []
@@ -306,7 +467,6 @@ def edit_item(request, id):
                             for img in existing_images:
                                 img.image.delete(save=False)
                                 img.delete()
-                            new_images = request.FILES.getlist('images')
                             for idx, img in enumerate(new_images):
                                 Image.objects.create(
                                     item=item,
@@ -340,47 +500,24 @@ def edit_item(request, id):
         messages.error(request, "Item not found.")
         return redirect('home')
 
+@ratelimit('feedback')
 def feedback(request):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
-        person = Person.objects.get(email=request.session.get('user_data')['email'])
+    person = current_person(request)
+    if person:
         
         if request.method == 'POST':
             form = FeedbackForm(request.POST)
             
-            if form.is_valid():
-                feedback = form.save(commit=False)
-                feedback.person = person
-                feedback.save()
-                
-                images = request.FILES.getlist('images')
-                for image in images:
-                    FeedbackImage.objects.create(
-                        feedback=feedback,
-                        image=image
-                    )
+            images, upload_errors = uploads.process_uploads(request, 'images')
 
-                messages.success(request, "Thank you for your feedback!")
-                return redirect('home')
-        else:
-            form = FeedbackForm()
-            
-        return render(request, 'bits/feedback.html', {'form': form})
-    else:
-        return redirect('sign_in')
-
-def feedback(request):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
-        person = Person.objects.get(email=request.session.get('user_data')['email'])
-        
-        if request.method == 'POST':
-            form = FeedbackForm(request.POST)
-            
-            if form.is_valid():
+            if upload_errors:
+                for error in upload_errors:
+                    messages.error(request, error)
+            elif form.is_valid():
                 feedback = form.save(commit=False)
                 feedback.person = person
                 feedback.save()
                 
-                images = request.FILES.getlist('images')
                 for image in images:
                     FeedbackImage.objects.create(
                         feedback=feedback,
@@ -397,11 +534,11 @@ def feedback(request):
         return redirect('sign_in')
 
 def marksold(request, id):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
+    if current_person(request):
         if Item.objects.filter(id=id).exists():
             item = Item.objects.get(id=id)
             item.is_sold = True
-            item.save()
+            item.save(change_time=False)
         return redirect('my_listings')
     else:
         return redirect("sign_in")
@@ -410,47 +547,136 @@ def about_us(request):
     return render(request, 'bits/about.html')
 
 def categories(request):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
-        return render(request, 'bits/categories.html', {'categories': Category.objects.all()})
+    person = current_person(request)
+    if person:
+        live_counts = counts.campus_counts(person.campus)
+        categories = [copy.copy(category) for category in lookups.categories()]
+        for category in categories:
+            category.live_count = live_counts.get(category.id, 0)
+        return render(request, 'bits/categories.html', {'categories': categories})
     else:
         return redirect('sign_in')
 
+def requested_campus(request, user_data):
+    campus = request.GET.get('campus')
+    if campus not in ['GOA', 'HYD', 'PIL', 'ALL']:
+        campus = Person.objects.filter(id=user_data.get('id')).values_list('campus', flat=True).first()
+        if campus not in ['GOA', 'HYD', 'PIL']:
+            campus = 'ALL'
+    return campus
+
+@cache_control(private=True, max_age=60)
+def search_suggest(request):
+    user_data = request.session.get('user_data')
+    if not user_data:
+        return JsonResponse({'suggestions': []}, status=403)
+    campus = requested_campus(request, user_data)
+    query = request.GET.get('q', '')[:100]
+    return JsonResponse({'query': query, 'campus': campus, 'suggestions': typeahead.suggest(query, campus)})
+
+@never_cache
+def changes(request):
+    """
+    Listings changed since ?token=, for the service worker's offline copy of
+    the feed. Call again with the returned token, right away while 'more' is
+    set; a 'reset' means the client's copy is too old and must be replaced.
+    """
+    user_data = request.session.get('user_data')
+    if not user_data:
+        return JsonResponse({'error': 'Sign in first.'}, status=403)
+    campus = requested_campus(request, user_data)
+    try:
+        feed = changefeed.changes_since(request.GET.get('token', ''), campus)
+    except ValueError:
+        return JsonResponse({'error': 'Bad sync token.'}, status=400)
+    feed['campus'] = campus
+    return JsonResponse(feed)
+
 def bypass(request):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
+    if current_person(request):
         return redirect('home')
     else:
         user = authenticate(request, username='test', password='some1234')
         login(request, user, backend='django.contrib.auth.backends.ModelBackend')
-        if not Person.objects.filter(email='vishrut172@gmail.com').exists():
-            Person.objects.create(
-                email='vishrut172@gmail.com',
-                name='Vishrut',
-            )
+        person, created = Person.objects.get_or_create(
+            email='vishrut172@gmail.com',
+            defaults={'name': 'Vishrut'},
+        )
         request.session['user_data'] = {
-            'email': 'vishrut172@gmail.com',
-            'name': 'Vishrut'
+            'id': person.id,
+            'email': person.email
         }
         return HttpResponseRedirect(reverse('home'))
 
+def save_search(request):
+    person = current_person(request)
+    if person:
+        if request.method == 'POST':
+            if person.saved_searches.count() >= settings.SAVED_SEARCH_LIMIT:
+                messages.error(request, f"You can keep at most {settings.SAVED_SEARCH_LIMIT} saved searches.")
+                return redirect('saved_searches')
+
+            category_id = request.POST.get('c')
+            campus = request.POST.get('campus')
+            SavedSearch.objects.create(
+                person=person,
+                query=(request.POST.get('q') or '').strip()[:100],
+                category=Category.objects.filter(id=category_id).first() if category_id and category_id.isdigit() else None,
+                campus=campus if campus in ['GOA', 'HYD', 'PIL'] else None,
+                min_price=helper.parse_price(request.POST.get('min_price')),
+                max_price=helper.parse_price(request.POST.get('max_price')),
+                last_item_id=saved_searches.latest_item_id(),
+            )
+            messages.success(request, "Search saved! New listings that match it will show up here.")
+        return redirect('saved_searches')
+    else:
+        return redirect('sign_in')
+
+def saved_search_list(request):
+    person = current_person(request)
+    if person:
+        searches = person.saved_searches.select_related('category').order_by('-added_at')
+        matches = list(
+            SavedSearchMatch.objects.filter(person=person)
+            .select_related('item', 'item__hostel', 'saved_search')
+            .order_by('is_seen', '-added_at')[:50]
+        )
+        response = render(request, 'bits/saved_searches.html', {'searches': searches, 'matches': matches})
+        SavedSearchMatch.objects.filter(person=person, is_seen=False).update(is_seen=True)
+        return response
+    else:
+        return redirect('sign_in')
+
+def delete_saved_search(request, id):
+    person = current_person(request)
+    if person:
+        SavedSearch.objects.filter(id=id, person=person).delete()
+        return redirect('saved_searches')
+    else:
+        return redirect('sign_in')
+
 def custom_page_not_found(request, exception):
     return render(request, 'bits/404.html', status=404)
 
 def custom_server_error(request):
-    return render(request, 'bits/500.html', status=500)
+    response = render(request, 'bits/500.html', status=500)
+    if settings.LOADTEST_AUTH_TOKEN:
+        # Let the load test tell lock contention apart from other failures.
+        error = sys.exc_info()[1]
+        if isinstance(error, OperationalError) and 'locked' in str(error):
+            response['X-Error-Kind'] = 'database-locked'
+    return response
 
 def repost(request, id):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
-        person = Person.objects.get(email=request.session.get('user_data')['email'])
+    person = current_person(request)
+    if person:
         item = get_object_or_404(Item, id=id)
         
         if item.seller != person:
             messages.error(request, "You can only repost your own items.")
             return redirect('home')
 
-        item.added_at = timezone.now()
-        item.is_sold = False
-        item.hostel = person.hostel
-        item.save()
+        item.repost(person.hostel)
         source = request.GET.get('source')
         messages.success(request, f"'{item.name}' has been reposted successfully!")
         print(source)
@@ -462,10 +688,11 @@ def repost(request, id):
         return redirect('sign_in')
 
 @csrf_exempt
+@ratelimit('bulk_action')
 def bulk_action(request, action):
-    if request.session.get('user_data') and Person.objects.filter(email=request.session.get('user_data')['email']).exists():
+    person = current_person(request)
+    if person:
         if request.method == 'POST':
-            person = Person.objects.get(email=request.session.get('user_data')['email'])
             selected_items = request.POST.get('selected_items', '').split(',')
             
             items = Item.objects.filter(id__in=selected_items, seller=person)
@@ -477,9 +704,7 @@ def bulk_action(request, action):
             if action == 'repost':
                 count = 0
                 for item in items:
-                    item.is_sold = False
-                    item.hostel = person.hostel
-                    item.save()
+                    item.repost(person.hostel)
                     count += 1
                 messages.success(request, f"Successfully reposted {count} item(s).")
                 
@@ -504,4 +729,92 @@ def bulk_action(request, action):
             
             return redirect('my_listings')
     else:
-        return redirect('sign_in')
\ No newline at end of file
+        return redirect('sign_in')
+
+@ratelimit('import_items')
+def import_items(request):
+    person = current_person(request)
+    if person:
+
+        if request.method == 'POST':
+            items_file = request.FILES.get('items')
+            images_file = request.FILES.get('images')
+            errors = uploads.upload_errors(request)
+            if not items_file and not errors:
+                errors.append("Choose a CSV or JSON-lines file to import.")
+            if errors:
+                for error in errors:
+                    messages.error(request, error)
+                return render(request, 'bits/import_items.html')
+
+            try:
+                archive = zipfile.ZipFile(images_file) if images_file else None
+            except zipfile.BadZipFile:
+                messages.error(request, "The image archive is not a valid zip file.")
+                return render(request, 'bits/import_items.html')
+
+            rows = bulk.read_rows(items_file, bulk.guess_format(items_file.name))
+            try:
+                created, errors = bulk.import_items(rows, person, archive=archive, max_rows=settings.IMPORT_MAX_ROWS)
+            finally:
+                if archive:
+                    archive.close()
+
+            for error in errors:
+                messages.error(request, error)
+            if created:
+                messages.success(request, f"Imported {created} item(s).")
+                return redirect('my_listings')
+        return render(request, 'bits/import_items.html')
+    else:
+        return redirect('sign_in')
+
+@staff_member_required
+def export_items(request):
+    fmt = 'jsonl' if request.GET.get('format') == 'jsonl' else 'csv'
+    items = Item.objects.all()
+    if request.GET.get('seller'):
+        items = items.filter(seller__email=request.GET['seller'])
+    response = StreamingHttpResponse(
+        bulk.export_lines(items, fmt),
+        content_type='application/x-ndjson' if fmt == 'jsonl' else 'text/csv',
+    )
+    response['Content-Disposition'] = f'attachment; filename="items.{fmt}"'
+    return response
+
+@x_robots_tag
+def sitemap_index(request):
+    base_url = f"{request.scheme}://{request.get_host()}"
+    return HttpResponse(sitemaps.render_index(base_url), content_type='application/xml')
+
+@x_robots_tag
+def sitemap_section(request, section):
+    base_url = f"{request.scheme}://{request.get_host()}"
+    try:
+        content, lastmod = sitemaps.render_section(base_url, section, request.GET.get('p', 1))
+    except (KeyError, EmptyPage, PageNotAnInteger):
+        return custom_page_not_found(request, None)
+    response = HttpResponse(content, content_type='application/xml')
+    if lastmod:
+        response['Last-Modified'] = http_date(lastmod.timestamp())
+    return response
+
+@never_cache
+def healthz(request):
+    return HttpResponse("ok", content_type='text/plain')
+
+@never_cache
+def readyz(request):
+    # Gunicorn warms each worker before it takes traffic (see gunicorn.conf.py),
+    # under runserver the first probe does it. The warm-up runs outside the
+    # request threads, so the database is checked here, on this thread's own
+    # connection.
+    try:
+        if not warmup.is_ready():
+            warmup.warm_up()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    except Exception:
+        logger.exception("Readiness check failed")
+        return JsonResponse({'status': 'unavailable'}, status=503)
+    return JsonResponse({'status': 'ready'})
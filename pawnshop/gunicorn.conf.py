@@ -0,0 +1,64 @@
+"""
+Gunicorn settings, picked up automatically when gunicorn is started from
+this directory:
+
+    gunicorn pawnshop.wsgi
+
+Every value can be overridden with the GUNICORN_* environment variables below.
+"""
+import multiprocessing
+import os
+
+
+def cpu_count():
+    try:
+        # The CPUs this process may actually run on, which is what a container limit changes.
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+wsgi_app = 'pawnshop.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', 8000)}")
+
+# Requests mostly wait on SQLite and image I/O, so a few threads per process
+# go further than more processes. Plain sync workers get the classic 2n+1.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1))
+workers = int(os.environ.get('GUNICORN_WORKERS', cpu_count() + 1 if worker_class == 'gthread' else 2 * cpu_count() + 1))
+
+# Import Django once in the master so workers fork with the code already loaded
+# and shared copy-on-write.
+preload_app = True
+
+# Recycle workers now and then to cap slow leaks, with jitter so they don't all
+# restart at the same moment.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+if os.path.isdir('/dev/shm'):
+    # The worker heartbeat file, kept off a possibly slow or disk-backed /tmp.
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = os.environ.get('GUNICORN_ERROR_LOG', '-')
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def pre_fork(server, worker):
+    # SQLite connections must never cross a fork, close anything the master opened.
+    from django.db import connections
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Runs before the worker accepts its first request. A failure is not fatal,
+    # /readyz keeps reporting 503 and retries the warm-up.
+    from bits import warmup
+    try:
+        warmup.warm_up()
+    except Exception:
+        worker.log.exception("Warm-up failed")
@@ -72,13 +72,23 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'bits.middleware.ReplicaRoutingMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bits.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    # Bundles each page's CSS/JS during collectstatic on top of WhiteNoise's
+    # hashed, pre-compressed files (see bits/assets.py).
+    'staticfiles': {'BACKEND': os.environ.get('STATICFILES_BACKEND', 'bits.assets.BundledStaticFilesStorage')},
+}
+STATIC_BUNDLES = os.environ.get('STATIC_BUNDLES', 'True') == 'True'
+# Set per release, so ETags of rendered pages change with the templates and code too.
+DEPLOY_ID = os.environ.get('DEPLOY_ID', '')
 
 ROOT_URLCONF = 'pawnshop.urls'
 
@@ -111,6 +121,35 @@ DATABASES = {
     }
 }
 
+# Optional read replica. Locally a SQLite copy kept fresh by
+# `manage.py sync_replica` works, in production point it at a streaming
+# Postgres standby.
+if os.environ.get('DATABASE_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': os.environ.get('DATABASE_REPLICA_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.environ['DATABASE_REPLICA_NAME'],
+        'HOST': os.environ.get('DATABASE_REPLICA_HOST', ''),
+        'PORT': os.environ.get('DATABASE_REPLICA_PORT', ''),
+        'USER': os.environ.get('DATABASE_REPLICA_USER', ''),
+        'PASSWORD': os.environ.get('DATABASE_REPLICA_PASSWORD', ''),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['bits.routers.PrimaryReplicaRouter']
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', 10))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.django_cache')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 20000))},
+    }
+}
+
+# Sessions only hold the person's id and email, so they fit in a signed cookie
+# ('django.contrib.sessions.backends.signed_cookies') as well as in the cache.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_COOKIE_AGE = int(os.environ.get('SESSION_COOKIE_AGE', 60 * 60 * 24 * 30))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -240,6 +279,83 @@ PWA_APP_DEBUG_MODE = DEBUG
 MEDIA_ROOT = BASE_DIR/'media'
 MEDIA_URL = '/media/'
 FILE_UPLOAD_HANDLERS = [
-    'django.core.files.uploadhandler.MemoryFileUploadHandler',
-    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+    'bits.uploads.LimitedUploadHandler',
 ]
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR')
+UPLOAD_MAX_FILES = int(os.environ.get('UPLOAD_MAX_FILES', 10))
+UPLOAD_MAX_FILE_SIZE = int(os.environ.get('UPLOAD_MAX_FILE_SIZE', 15 * 1024 * 1024))
+UPLOAD_MAX_REQUEST_SIZE = int(os.environ.get('UPLOAD_MAX_REQUEST_SIZE', 60 * 1024 * 1024))
+UPLOAD_MAX_PIXELS = int(os.environ.get('UPLOAD_MAX_PIXELS', 40_000_000))
+UPLOAD_MAX_DIMENSION = int(os.environ.get('UPLOAD_MAX_DIMENSION', 2048))
+UPLOAD_JPEG_QUALITY = int(os.environ.get('UPLOAD_JPEG_QUALITY', 85))
+
+ARCHIVE_SOLD_AFTER_DAYS = int(os.environ.get('ARCHIVE_SOLD_AFTER_DAYS', 30))
+ARCHIVE_INACTIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_INACTIVE_AFTER_DAYS', 120))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+
+FEED_FACET_CACHE_SECONDS = int(os.environ.get('FEED_FACET_CACHE_SECONDS', 60))
+
+# LogNotifier writes matches to the bits.notifications logger, LocalNotifier is the in-memory one for tests.
+SAVED_SEARCH_NOTIFIER = os.environ.get('SAVED_SEARCH_NOTIFIER', 'bits.notifications.LogNotifier')
+SAVED_SEARCH_LIMIT = int(os.environ.get('SAVED_SEARCH_LIMIT', 10))
+SAVED_SEARCH_BATCH_SIZE = int(os.environ.get('SAVED_SEARCH_BATCH_SIZE', 500))
+
+ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get('ADMIN_EXACT_COUNT_LIMIT', 10000))
+
+RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'True') == 'True'
+RATELIMIT_STORE = os.environ.get('RATELIMIT_STORE', str(BASE_DIR / '.django_cache' / 'ratelimit.sqlite3'))
+RATELIMIT_IDLE_SECONDS = int(os.environ.get('RATELIMIT_IDLE_SECONDS', 60 * 60 * 24))
+RATELIMIT_TRUST_X_FORWARDED_FOR = os.environ.get('RATELIMIT_TRUST_X_FORWARDED_FOR', 'False') == 'True'
+RATELIMITS = {
+    'sign_in': os.environ.get('RATELIMIT_SIGN_IN', '10/m'),
+    'add_product': os.environ.get('RATELIMIT_ADD_PRODUCT', '20/h'),
+    'feedback': os.environ.get('RATELIMIT_FEEDBACK', '5/h'),
+    'bulk_action': os.environ.get('RATELIMIT_BULK_ACTION', '30/m'),
+    'import_items': os.environ.get('RATELIMIT_IMPORT_ITEMS', '10/h'),
+}
+
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 200))
+IMPORT_MAX_ROWS = int(os.environ.get('IMPORT_MAX_ROWS', 200))
+
+BACKUP_DIR = os.environ.get('BACKUP_DIR', str(BASE_DIR / 'backups'))
+BACKUP_PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', 256))
+BACKUP_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP', 0.05))
+# Past either bound a backup that keeps restarting is redone in one step.
+BACKUP_MAX_RESTARTS = int(os.environ.get('BACKUP_MAX_RESTARTS', 3))
+BACKUP_MAX_SECONDS = float(os.environ.get('BACKUP_MAX_SECONDS', 300))
+
+VIEW_COUNT_FLUSH_SECONDS = int(os.environ.get('VIEW_COUNT_FLUSH_SECONDS', 30))
+VIEW_COUNT_FLUSH_SIZE = int(os.environ.get('VIEW_COUNT_FLUSH_SIZE', 500))
+VIEW_DEDUPE_SECONDS = int(os.environ.get('VIEW_DEDUPE_SECONDS', 30 * 60))
+VIEW_DEDUPE_MAX = int(os.environ.get('VIEW_DEDUPE_MAX', 50000))
+# Counts kept for a retry while the database refuses the flush, past this new views are dropped.
+VIEW_COUNT_PENDING_MAX = int(os.environ.get('VIEW_COUNT_PENDING_MAX', 20000))
+
+RANKING_HALF_LIFE_HOURS = float(os.environ.get('RANKING_HALF_LIFE_HOURS', 72))
+RANKING_ENGAGEMENT_WEIGHT = float(os.environ.get('RANKING_ENGAGEMENT_WEIGHT', 0.5))
+RANKING_CONTACT_WEIGHT = float(os.environ.get('RANKING_CONTACT_WEIGHT', 5))
+RANKING_REPOST_WINDOW_HOURS = int(os.environ.get('RANKING_REPOST_WINDOW_HOURS', 24))
+RANKING_REPOST_ALLOWANCE = int(os.environ.get('RANKING_REPOST_ALLOWANCE', 5))
+RANKING_REPOST_PENALTY = float(os.environ.get('RANKING_REPOST_PENALTY', 0.5))
+RANKING_BATCH_SIZE = int(os.environ.get('RANKING_BATCH_SIZE', 2000))
+
+LOOKUP_CACHE_SECONDS = int(os.environ.get('LOOKUP_CACHE_SECONDS', 300))
+
+TYPEAHEAD_LIMIT = int(os.environ.get('TYPEAHEAD_LIMIT', 8))
+TYPEAHEAD_SYNC_SECONDS = int(os.environ.get('TYPEAHEAD_SYNC_SECONDS', 30))
+TYPEAHEAD_REBUILD_SECONDS = int(os.environ.get('TYPEAHEAD_REBUILD_SECONDS', 15 * 60))
+
+CHANGEFEED_PAGE_SIZE = int(os.environ.get('CHANGEFEED_PAGE_SIZE', 200))
+CHANGEFEED_SETTLE_SECONDS = int(os.environ.get('CHANGEFEED_SETTLE_SECONDS', 2))
+CHANGEFEED_TOMBSTONE_DAYS = int(os.environ.get('CHANGEFEED_TOMBSTONE_DAYS', 30))
+
+SITEMAP_PAGE_SIZE = int(os.environ.get('SITEMAP_PAGE_SIZE', 10000))
+SITEMAP_CACHE_SECONDS = int(os.environ.get('SITEMAP_CACHE_SECONDS', 60 * 60 * 6))
+
+# Enables /loadtest/sign-in for the loadtest command. Never set this in production.
+LOADTEST_AUTH_TOKEN = os.environ.get('LOADTEST_AUTH_TOKEN', '')
+
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+
+# Queries slower than this are recorded as SlowQuery rows (see bits/slowqueries.py), 0 turns it off.
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
@@ -75,6 +75,12 @@ self.addEventListener('fetch', event => {
         return;
     }
 
+    // Live data, never served from the cache
+    const path = new URL(event.request.url).pathname;
+    if (path === '/changes' || path.startsWith('/search/')) {
+        return;
+    }
+
     // For HTML page navigation
     if (event.request.mode === 'navigate') {
         event.respondWith(
@@ -128,3 +134,90 @@ self.addEventListener('fetch', event => {
             })
     );
 });
+
+// Offline copy of the campus feed in IndexedDB, kept current from /changes
+const FEED_DB = 'pawnshop-feed';
+
+function openFeedDb() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(FEED_DB, 1);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore('items', { keyPath: 'id' });
+            request.result.createObjectStore('meta');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function idbRequest(request) {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+let feedSync = null;
+
+async function syncFeed(campus) {
+    const db = await openFeedDb();
+    let state = await idbRequest(db.transaction('meta').objectStore('meta').get('state'));
+    // A different campus is a different feed, start it from scratch. Pages
+    // without a campus filter keep whichever feed is stored.
+    if (!state || (campus && state.campus !== campus)) {
+        state = { campus: campus, token: '' };
+    }
+    for (;;) {
+        const params = new URLSearchParams({ token: state.token });
+        if (state.campus) {
+            params.set('campus', state.campus);
+        }
+        const response = await fetch('/changes?' + params, { credentials: 'same-origin' });
+        if (!response.ok) {
+            return;
+        }
+        const feed = await response.json();
+        const tx = db.transaction(['items', 'meta'], 'readwrite');
+        const items = tx.objectStore('items');
+        if (!state.token || feed.reset) {
+            items.clear();
+        }
+        feed.items.forEach(item => items.put(item));
+        feed.deleted.forEach(id => items.delete(id));
+        state = { campus: feed.campus, token: feed.token };
+        tx.objectStore('meta').put(state, 'state');
+        await new Promise((resolve, reject) => {
+            tx.oncomplete = resolve;
+            tx.onerror = () => reject(tx.error);
+        });
+        if (!feed.more) {
+            return;
+        }
+    }
+}
+
+function runFeedSync(campus) {
+    // One sync at a time, pages open in several tabs all ask for one
+    if (!feedSync) {
+        feedSync = syncFeed(campus)
+            .catch(error => console.error('Feed sync failed:', error))
+            .finally(() => { feedSync = null; });
+    }
+    return feedSync;
+}
+
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === 'sync-feed') {
+        event.waitUntil(runFeedSync(event.data.campus || ''));
+    }
+});
+
+self.addEventListener('periodicsync', event => {
+    if (event.tag === 'sync-feed') {
+        event.waitUntil(
+            openFeedDb()
+                .then(db => idbRequest(db.transaction('meta').objectStore('meta').get('state')))
+                .then(state => runFeedSync(state ? state.campus : ''))
+        );
+    }
+});